@@ -0,0 +1,38 @@
+"""
+Add the quiz_questions and quiz_results columns used for sampling and analytics to existing tables
+"""
+
+from app.database import engine
+from sqlalchemy import text, inspect
+
+COLUMNS = [
+    ("quiz_questions", "topic", "VARCHAR"),
+    ("quiz_questions", "revision", "INTEGER NOT NULL DEFAULT 0"),
+    ("quiz_results", "question_ids", "JSON"),
+    ("quiz_results", "outcomes", "VARCHAR"),
+    ("quiz_results", "percentage", "FLOAT"),
+    ("quiz_results", "awareness_level", "VARCHAR"),
+]
+
+
+def add_quiz_columns():
+    """Add any missing quiz columns"""
+    try:
+        inspector = inspect(engine)
+        with engine.connect() as conn:
+            for table, column, column_type in COLUMNS:
+                existing = [col['name'] for col in inspector.get_columns(table)]
+                if column in existing:
+                    print(f"✅ Column '{table}.{column}' already exists!")
+                    continue
+                
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+                print(f"✅ Column '{table}.{column}' added successfully!")
+            conn.commit()
+        print("   Re-run seed_quiz.py to tag existing questions with topics")
+    except Exception as e:
+        print(f"❌ Error adding columns: {e}")
+        raise
+
+if __name__ == "__main__":
+    add_quiz_columns()
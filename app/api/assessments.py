@@ -1,14 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import Response
-from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
+from fastapi.responses import Response, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.database import get_async_db, AsyncSessionLocal
 from app import models, schemas
 from app.services.feature_engineering import FeatureEngineer
 from app.services.risk_detection import PCOSRiskDetector
 from app.services.explainable_ai import ExplainableAI
 from app.services.remedy_engine import RemedyEngine
 from app.services.report_generator import ReportGenerator
+from app.services.report_cache import report_cache
+from app.services import report_renderer
+from app.services.report_renderer import ReportJob, ReportJobService, RenderQueueFull
+from app.services.report_export import ReportExportService
+from app.services.health_score_engine import HealthScoreEngine
 import json
 
 router = APIRouter()
@@ -18,12 +25,11 @@ feature_engineer = FeatureEngineer()
 risk_detector = PCOSRiskDetector()
 explainable_ai = ExplainableAI()
 remedy_engine = RemedyEngine()
-report_generator = ReportGenerator()
 
 @router.post("/analyze", response_model=schemas.AssessmentResponse)
 async def analyze_assessment(
     assessment_input: schemas.AssessmentInput,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Main endpoint for PCOS risk assessment
@@ -77,10 +83,13 @@ async def analyze_assessment(
                 shap_values={"explanation": explanation}
             )
             db.add(db_assessment)
-            db.commit()
-            db.refresh(db_assessment)
+            if db_assessment.user_id:
+                await db.flush()
+                await HealthScoreEngine.refresh_snapshot(db, db_assessment.user_id)
+            await db.commit()
+            await db.refresh(db_assessment)
         except Exception as db_error:
-            db.rollback()
+            await db.rollback()
             error_msg = str(db_error)
             if "taken_birth_control_pills" in error_msg or "column" in error_msg.lower() or "no such column" in error_msg.lower():
                 detail = "Database schema error: The 'taken_birth_control_pills' column is missing. Please run 'python init_db.py' to update the database tables."
@@ -104,7 +113,7 @@ async def analyze_assessment(
         )
         
         return response
-        
+    
     except HTTPException:
         # Re-raise HTTP exceptions as-is
         raise
@@ -125,12 +134,139 @@ async def analyze_assessment(
             detail=detail
         )
 
+@router.post("/analyze-batch", response_model=schemas.AssessmentBatchResponse)
+async def analyze_assessment_batch(
+    batch_input: schemas.AssessmentBatchInput,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Bulk PCOS risk assessment for clinic uploads
+    Valid rows are scored together and saved with a single bulk insert;
+    invalid rows are reported per index without failing the batch
+    """
+    # Step 0: Validate each row independently
+    valid_rows = []
+    valid_indices = []
+    errors = []
+    for index, raw_row in enumerate(batch_input.assessments):
+        try:
+            valid_rows.append(schemas.AssessmentInput(**raw_row).dict())
+            valid_indices.append(index)
+        except ValidationError as e:
+            errors.append(schemas.AssessmentBatchError(
+                index=index,
+                errors=[
+                    f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}"
+                    for err in e.errors()
+                ]
+            ))
+    
+    if not valid_rows:
+        return schemas.AssessmentBatchResponse(
+            results=[], errors=errors, processed=0, failed=len(errors)
+        )
+    
+    try:
+        # Step 1: Feature Engineering (vectorized)
+        columns = {key: [row[key] for row in valid_rows] for key in valid_rows[0]}
+        feature_frame = feature_engineer.engineer_features_frame(columns)
+        feature_rows = feature_frame.to_dict('records')
+        
+        # Step 2: Risk Detection (vectorized)
+        risk_batch = risk_detector.detect_risk_batch(
+            feature_frame[FeatureEngineer.MODEL_FEATURES].to_numpy(dtype=float),
+            taken_birth_control=columns['taken_birth_control_pills']
+        )
+        risk_levels = risk_batch['risk_level'].tolist()
+        phenotypes = risk_batch['phenotype'].tolist()
+        confidences = risk_batch['confidence_score'].tolist()
+        risk_scores = risk_batch['risk_score'].tolist()
+        
+        # Steps 3-6: Explanations per row, remedies once per (phenotype, risk level)
+        guidance = {}
+        db_rows = []
+        for i, input_dict in enumerate(valid_rows):
+            features = feature_rows[i]
+            key_drivers = explainable_ai.calculate_feature_importance(
+                features, risk_scores[i], phenotypes[i]
+            )
+            explanation = explainable_ai.generate_explanation(
+                features, risk_levels[i], phenotypes[i], risk_scores[i], confidences[i]
+            )
+            if (phenotypes[i], risk_levels[i]) not in guidance:
+                guidance[(phenotypes[i], risk_levels[i])] = (
+                    remedy_engine.get_combined_remedies_list(phenotypes[i], risk_levels[i]),
+                    remedy_engine.get_clinical_next_steps(risk_levels[i])
+                )
+            db_rows.append({
+                **input_dict,
+                'risk_level': risk_levels[i],
+                'phenotype': phenotypes[i],
+                'confidence_score': confidences[i],
+                'risk_score': risk_scores[i],
+                'key_drivers': key_drivers,
+                'feature_values': features,
+                'shap_values': {"explanation": explanation}
+            })
+    except Exception as e:
+        import traceback
+        print(f"Error processing assessment batch: {traceback.format_exc()}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error processing assessment batch: {str(e)}"
+        )
+    
+    # Step 7: Save all rows with one bulk insert
+    try:
+        assessment_ids = (await db.scalars(
+            insert(models.Assessment).returning(models.Assessment.id, sort_by_parameter_order=True),
+            db_rows
+        )).all()
+        # Scores for the whole batch in a fixed number of statements
+        await HealthScoreEngine.refresh_snapshots(
+            db, list({row['user_id'] for row in db_rows if row['user_id']})
+        )
+        await db.commit()
+    except Exception as db_error:
+        await db.rollback()
+        error_msg = str(db_error)
+        if "taken_birth_control_pills" in error_msg or "column" in error_msg.lower():
+            detail = "Database schema error: The 'taken_birth_control_pills' column is missing. Please run 'python init_db.py' to update the database tables."
+        else:
+            detail = f"Database error: {error_msg}. Please check server logs."
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=detail
+        )
+    
+    results = []
+    for i, db_row in enumerate(db_rows):
+        remedies_list, next_steps = guidance[(db_row['phenotype'], db_row['risk_level'])]
+        results.append(schemas.AssessmentBatchItem(
+            index=valid_indices[i],
+            risk_level=db_row['risk_level'],
+            phenotype=db_row['phenotype'],
+            confidence=f"{db_row['confidence_score'] * 100:.0f}%",
+            risk_score=db_row['risk_score'],
+            key_drivers=db_row['key_drivers'],
+            remedies=remedies_list,
+            next_steps=next_steps,
+            assessment_id=assessment_ids[i]
+        ))
+    
+    return schemas.AssessmentBatchResponse(
+        results=results,
+        errors=errors,
+        processed=len(results),
+        failed=len(errors)
+    )
+
 @router.get("/{assessment_id}", response_model=schemas.AssessmentResult)
-async def get_assessment(assessment_id: int, db: Session = Depends(get_db)):
+async def get_assessment(assessment_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Retrieve a saved assessment by ID
     """
-    assessment = db.query(models.Assessment).filter(models.Assessment.id == assessment_id).first()
+    assessment = await db.get(models.Assessment, assessment_id)
     
     if not assessment:
         raise HTTPException(
@@ -158,54 +294,175 @@ async def get_assessment(assessment_id: int, db: Session = Depends(get_db)):
         disclaimer="This is not a medical diagnosis. Please consult a doctor for confirmation."
     )
 
+def build_report_data(assessment: models.Assessment) -> dict:
+    """Everything the PDF template shows for an assessment"""
+    return {
+        'risk_level': assessment.risk_level,
+        'phenotype': assessment.phenotype,
+        'confidence_score': assessment.confidence_score,
+        'risk_score': assessment.risk_score,
+        'key_drivers': assessment.key_drivers or [],
+        'remedies': remedy_engine.get_remedies(assessment.phenotype, assessment.risk_level),
+        'next_steps': remedy_engine.get_clinical_next_steps(assessment.risk_level),
+        'explanation': assessment.shap_values.get('explanation', '') if assessment.shap_values else '',
+        'assessment_date': assessment.created_at
+    }
+
+def pdf_response(pdf_bytes: bytes, assessment_id: int) -> Response:
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"attachment; filename=ovasense_report_{assessment_id}.pdf"
+        }
+    )
+
+def cached_report_response(assessment_id: int) -> Optional[Response]:
+    """Cached PDF for an assessment (memory, then disk), or None to render it"""
+    pdf_bytes = report_cache.read((assessment_id, ReportGenerator.TEMPLATE_VERSION))
+    if pdf_bytes is not None:
+        return pdf_response(pdf_bytes, assessment_id)
+    return None
+
+async def get_report_data(db: AsyncSession, assessment_id: int) -> dict:
+    assessment = await db.get(models.Assessment, assessment_id)
+    
+    if not assessment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Assessment not found"
+        )
+    
+    return build_report_data(assessment)
+
 @router.get("/{assessment_id}/report")
-async def download_report(assessment_id: int, db: Session = Depends(get_db)):
+async def download_report(assessment_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Generate and download PDF report for an assessment
+    
+    Assessments are immutable, so repeat downloads are served from the PDF
+    cache (memory, then disk) without touching the database. First renders
+    run on the report process pool, off the event loop.
     """
-    assessment = db.query(models.Assessment).filter(models.Assessment.id == assessment_id).first()
+    cached = cached_report_response(assessment_id)
+    if cached is not None:
+        return cached
     
-    if not assessment:
+    report_data = await get_report_data(db, assessment_id)
+    pdf_bytes = await report_renderer.render_cached(assessment_id, report_data)
+    return pdf_response(pdf_bytes, assessment_id)
+
+def job_response(job: ReportJob) -> schemas.ReportJobResponse:
+    download_url = None
+    if job.status == "done":
+        download_url = f"/api/v1/assessments/{job.assessment_id}/report-jobs/{job.job_id}/download"
+    return schemas.ReportJobResponse(**job.to_dict(), download_url=download_url)
+
+@router.post("/{assessment_id}/report-jobs", response_model=schemas.ReportJobResponse,
+             status_code=status.HTTP_202_ACCEPTED)
+async def create_report_job(assessment_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Start rendering an assessment's PDF in the background
+    
+    Poll the returned job, then download it once its status is "done".
+    Returns 503 when too many report jobs are already pending.
+    """
+    if report_cache.get_path((assessment_id, ReportGenerator.TEMPLATE_VERSION)) is not None:
+        return job_response(ReportJobService.done_job(assessment_id))
+    
+    report_data = await get_report_data(db, assessment_id)
+    try:
+        job = ReportJobService.submit(assessment_id, report_data)
+    except RenderQueueFull as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    return job_response(job)
+
+def find_report_job(assessment_id: int, job_id: str) -> ReportJob:
+    """
+    Job tracked by this worker, or a finished stand-in when the PDF is
+    already cached (the job may have run on another worker)
+    """
+    job = ReportJobService.get(job_id)
+    if job is not None and job.assessment_id == assessment_id:
+        return job
+    
+    if report_cache.get_path((assessment_id, ReportGenerator.TEMPLATE_VERSION)) is not None:
+        job = ReportJob(assessment_id)
+        job.job_id = job_id
+        job.status = "done"
+        return job
+    
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Report job not found"
+    )
+
+@router.get("/{assessment_id}/report-jobs/{job_id}", response_model=schemas.ReportJobResponse)
+async def get_report_job(assessment_id: int, job_id: str):
+    """Status of a background report render"""
+    return job_response(find_report_job(assessment_id, job_id))
+
+@router.get("/{assessment_id}/report-jobs/{job_id}/download")
+async def download_report_job(assessment_id: int, job_id: str):
+    """Download the PDF of a finished report job"""
+    job = find_report_job(assessment_id, job_id)
+    if job.status == "failed":
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=job.error)
+    
+    cached = cached_report_response(assessment_id) if job.status == "done" else None
+    if cached is None:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Assessment not found"
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Report job is {job.status}"
         )
+    return cached
+
+@router.post("/reports/export")
+async def export_reports(export_request: schemas.ReportExportRequest):
+    """
+    Download the PDF reports of many assessments as one ZIP archive
     
-    # Get remedies and next steps
-    remedies_dict = remedy_engine.get_remedies(assessment.phenotype, assessment.risk_level)
-    next_steps = remedy_engine.get_clinical_next_steps(assessment.risk_level)
+    The archive is streamed while reports render, so the first bytes arrive
+    right away and memory stays flat however many reports are requested
+    """
+    if not export_request.assessment_ids and not export_request.user_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide assessment_ids or user_id"
+        )
     
-    # Prepare report data
-    report_data = {
-        'risk_level': assessment.risk_level,
-        'phenotype': assessment.phenotype,
-        'confidence_score': assessment.confidence_score,
-        'risk_score': assessment.risk_score,
-        'key_drivers': assessment.key_drivers or [],
-        'remedies': remedies_dict,
-        'next_steps': next_steps,
-        'explanation': assessment.shap_values.get('explanation', '') if assessment.shap_values else ''
-    }
+    query = ReportExportService.export_query(
+        export_request.assessment_ids,
+        export_request.user_id,
+        export_request.from_date,
+        export_request.to_date
+    )
     
-    # Generate PDF
-    pdf_bytes = report_generator.generate_pdf(report_data)
+    async def archive():
+        # Own session: the stream outlives the request's dependencies
+        async with AsyncSessionLocal() as db:
+            async for chunk in ReportExportService.stream_zip(db, query, build_report_data):
+                if chunk:
+                    yield chunk
     
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
+    return StreamingResponse(
+        archive(),
+        media_type="application/zip",
         headers={
-            "Content-Disposition": f"attachment; filename=ovasense_report_{assessment_id}.pdf"
+            "Content-Disposition": "attachment; filename=ovasense_reports.zip"
         }
     )
 
 @router.get("/user/{user_id}/history")
-async def get_user_history(user_id: str, db: Session = Depends(get_db)):
+async def get_user_history(user_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     Get assessment history for a user
     """
-    assessments = db.query(models.Assessment).filter(
-        models.Assessment.user_id == user_id
-    ).order_by(models.Assessment.created_at.desc()).all()
+    assessments = (await db.scalars(
+        select(models.Assessment).where(
+            models.Assessment.user_id == user_id
+        ).order_by(models.Assessment.created_at.desc())
+    )).all()
     
     results = []
     for assessment in assessments:
@@ -1,9 +1,10 @@
 """
 Diet Plan API Routes
+Personalized diet plans with an optimized weekly meal plan
 """
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.schemas import DietPlanResponse
 from app.services.diet_personalizer import DietPersonalizerService
 
@@ -11,18 +12,22 @@ router = APIRouter()
 
 
 @router.get("/{user_id}", response_model=DietPlanResponse)
-async def get_diet_plan(user_id: str, db: Session = Depends(get_db)):
+async def get_diet_plan(user_id: str, db: AsyncSession = Depends(get_async_db)):
     """
-    Get personalized diet plan based on PCOS phenotype and BMI
+    Get personalized diet plan based on PCOS phenotype, BMI and diet type
     
     Returns:
     - Foods to eat
     - Foods to avoid
-    - Weekly meal plan
+    - Weekly meal plan built to the user's calorie, protein, fiber and
+      glycemic-load targets
+    - Daily nutrition targets and the plan's daily averages
     - Nutritional tips
+    
+    Serialized plans are memoized per (phenotype, BMI category, target bucket)
     """
     try:
-        diet_plan = DietPersonalizerService.generate_diet_plan(db, user_id)
-        return diet_plan
+        payload = await DietPersonalizerService.get_diet_plan_payload(db, user_id)
+        return Response(content=payload, media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -2,8 +2,8 @@
 Health Score API Routes
 """
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.schemas import HealthScoreResponse
 from app.services.health_score_engine import HealthScoreEngine
 
@@ -11,7 +11,7 @@ router = APIRouter()
 
 
 @router.get("/{user_id}", response_model=HealthScoreResponse)
-async def get_health_score(user_id: str, db: Session = Depends(get_db)):
+async def get_health_score(user_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     Get health score for a user
     
@@ -22,9 +22,12 @@ async def get_health_score(user_id: str, db: Session = Depends(get_db)):
     - Sleep hours (15%)
     - Exercise frequency (15%)
     - Symptom severity (15%)
+    
+    Served from the latest stored snapshot, which is refreshed whenever
+    the user logs a period, a mental health entry or an assessment.
     """
     try:
-        result = HealthScoreEngine.calculate_health_score(db, user_id)
+        result = await HealthScoreEngine.get_health_score(db, user_id)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,27 +1,33 @@
 """
 Mental Health Tracker API Routes
 """
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import date, timedelta
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.schemas import (
     MentalHealthLogInput,
     MentalHealthLogResponse,
     MentalHealthHistoryResponse,
+    MentalHealthSeriesResponse,
+    CyclePhaseProfileResponse,
     MentalHealthInsightsResponse
 )
 from app.services.mental_health_tracker import MentalHealthTrackerService
+from app.services.mental_health_rollups import MentalHealthRollupService
+from app.services.cycle_phase import CyclePhaseEngine
 
 router = APIRouter()
 
 
 @router.post("/add", response_model=MentalHealthLogResponse)
-async def add_mental_health_log(log_data: MentalHealthLogInput, db: Session = Depends(get_db)):
+async def add_mental_health_log(log_data: MentalHealthLogInput, db: AsyncSession = Depends(get_async_db)):
     """
     Add a new mental health log entry
     """
     try:
-        log = MentalHealthTrackerService.add_mental_health_log(
+        log = await MentalHealthTrackerService.add_mental_health_log(
             db=db,
             user_id=log_data.user_id,
             stress_level=log_data.stress_level,
@@ -35,13 +41,14 @@ async def add_mental_health_log(log_data: MentalHealthLogInput, db: Session = De
 
 
 @router.get("/history/{user_id}", response_model=MentalHealthHistoryResponse)
-async def get_mental_health_history(user_id: str, db: Session = Depends(get_db)):
+async def get_mental_health_history(user_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     Get mental health history for a user
+    Averages are aggregated in SQL rather than over the returned logs
     """
     try:
-        logs = MentalHealthTrackerService.get_mental_health_history(db, user_id)
-        averages = MentalHealthTrackerService.calculate_averages(db, user_id)
+        logs = await MentalHealthTrackerService.get_mental_health_history(db, user_id)
+        averages = await MentalHealthTrackerService.calculate_averages(db, user_id)
         
         return {
             "logs": logs,
@@ -51,13 +58,46 @@ async def get_mental_health_history(user_id: str, db: Session = Depends(get_db))
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/history/{user_id}/series", response_model=MentalHealthSeriesResponse)
+async def get_mental_health_series(
+    user_id: str,
+    from_date: Optional[date] = Query(None, alias="from", description="First day (default: 30 days ago)"),
+    to_date: Optional[date] = Query(None, alias="to", description="Last day (default: today)"),
+    resolution: str = Query("auto", description="auto, daily or weekly"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get mental health history over any date range
+    Served from daily or weekly rollups; "auto" picks the level from the range
+    """
+    to_date = to_date or date.today()
+    from_date = from_date or to_date - timedelta(days=30)
+    try:
+        return await MentalHealthRollupService.get_series(db, user_id, from_date, to_date, resolution)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/insights/{user_id}", response_model=MentalHealthInsightsResponse)
-async def get_mental_health_insights(user_id: str, db: Session = Depends(get_db)):
+async def get_mental_health_insights(user_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     Get personalized mental health insights
     """
     try:
-        insights = MentalHealthTrackerService.generate_insights(db, user_id)
+        insights = await MentalHealthTrackerService.generate_insights(db, user_id)
         return insights
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/cycle-phases/{user_id}", response_model=CyclePhaseProfileResponse)
+async def get_cycle_phase_profile(user_id: str, db: AsyncSession = Depends(get_async_db)):
+    """
+    Get average stress, sleep and energy in each cycle phase
+    """
+    try:
+        return await CyclePhaseEngine.get_phase_profile(db, user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
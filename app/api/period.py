@@ -1,9 +1,10 @@
 """
 Period Tracker API Routes
 """
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.schemas import (
     PeriodLogInput, 
     PeriodLogResponse, 
@@ -16,12 +17,12 @@ router = APIRouter()
 
 
 @router.post("/add", response_model=PeriodLogResponse)
-async def add_period_log(period_data: PeriodLogInput, db: Session = Depends(get_db)):
+async def add_period_log(period_data: PeriodLogInput, db: AsyncSession = Depends(get_async_db)):
     """
     Add a new period log entry
     """
     try:
-        log = PeriodTrackerService.add_period_log(
+        log = await PeriodTrackerService.add_period_log(
             db=db,
             user_id=period_data.user_id,
             start_date=period_data.start_date,
@@ -36,31 +37,40 @@ async def add_period_log(period_data: PeriodLogInput, db: Session = Depends(get_
 
 
 @router.get("/history/{user_id}", response_model=PeriodHistoryResponse)
-async def get_period_history(user_id: str, db: Session = Depends(get_db)):
+async def get_period_history(user_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     Get period history for a user
     """
     try:
-        logs = PeriodTrackerService.get_period_history(db, user_id)
-        avg_cycle = PeriodTrackerService.calculate_average_cycle_length(db, user_id)
-        stability = PeriodTrackerService.calculate_cycle_stability_score(db, user_id)
+        stats = await PeriodTrackerService.get_cycle_statistics(db, user_id)
         
         return {
-            "logs": logs,
-            "average_cycle_length": avg_cycle,
-            "cycle_stability_score": stability
+            "logs": stats.recent_logs,
+            "average_cycle_length": stats.average_cycle_length,
+            "cycle_stability_score": stats.stability_score,
+            "cycle_std_dev": stats.std_dev
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/prediction/{user_id}", response_model=PeriodPredictionResponse)
-async def get_period_prediction(user_id: str, db: Session = Depends(get_db)):
+async def get_period_prediction(
+    user_id: str,
+    cycles: int = Query(1, ge=1, le=6, description="Number of upcoming periods to forecast"),
+    strategy: Optional[str] = Query(None, description="mean, recency, exponential or median"),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     Get next period prediction for a user
+    Each forecast comes with an earliest/latest day range
     """
     try:
-        prediction = PeriodTrackerService.predict_next_period(db, user_id)
+        prediction = await PeriodTrackerService.predict_next_period(
+            db, user_id, horizon=cycles, strategy=strategy
+        )
         return prediction
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,39 +1,42 @@
 """
 PCOS Awareness Quiz API Routes
 """
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
-from app.schemas import QuizQuestionResponse, QuizSubmission, QuizResultResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.database import get_async_db
+from app.schemas import (
+    QuizQuestionResponse,
+    QuizSubmission,
+    QuizResultResponse,
+    QuizQuestionAnalytics,
+    QuizHistoryResponse
+)
 from app.services.quiz_engine import QuizEngineService
 
 router = APIRouter()
 
 
 @router.get("/questions", response_model=List[QuizQuestionResponse])
-async def get_quiz_questions(db: Session = Depends(get_db)):
+async def get_quiz_questions(
+    count: int = Query(10, ge=1, le=50),
+    topic: Optional[List[str]] = Query(None, description="Limit to one or more topics"),
+    user_id: Optional[str] = Query(None, description="Avoid questions from this user's recent quizzes"),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Get PCOS awareness quiz questions
+    Get a random set of PCOS awareness quiz questions
+    Questions come from the cached bank, pre-serialized (no correct answers)
     """
     try:
-        questions = QuizEngineService.get_quiz_questions(db)
-        
-        # Remove correct_answer from response
-        return [
-            {
-                "id": q.id,
-                "question": q.question,
-                "options": q.options
-            }
-            for q in questions
-        ]
+        payload = await QuizEngineService.sample_questions_payload(db, count, topic, user_id)
+        return Response(content=payload, media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/submit", response_model=QuizResultResponse)
-async def submit_quiz(submission: QuizSubmission, db: Session = Depends(get_db)):
+async def submit_quiz(submission: QuizSubmission, db: AsyncSession = Depends(get_async_db)):
     """
     Submit quiz answers and get results
     
@@ -43,7 +46,7 @@ async def submit_quiz(submission: QuizSubmission, db: Session = Depends(get_db))
     - Personalized health tips
     """
     try:
-        result = QuizEngineService.submit_quiz(
+        result = await QuizEngineService.submit_quiz(
             db=db,
             user_id=submission.user_id,
             answers=submission.answers
@@ -51,3 +54,29 @@ async def submit_quiz(submission: QuizSubmission, db: Session = Depends(get_db))
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/analytics", response_model=List[QuizQuestionAnalytics])
+async def get_quiz_analytics(
+    question_id: Optional[int] = Query(None, description="Only this question"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get per-question difficulty and discrimination
+    Served from running counters, never from raw quiz results
+    """
+    try:
+        return await QuizEngineService.get_question_analytics(db, question_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/history/{user_id}", response_model=QuizHistoryResponse)
+async def get_quiz_history(user_id: str, db: AsyncSession = Depends(get_async_db)):
+    """
+    Get a user's awareness history
+    """
+    try:
+        return await QuizEngineService.get_user_history(db, user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
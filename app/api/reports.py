@@ -2,16 +2,16 @@
 Monthly Progress Report API Routes
 """
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.schemas import MonthlyProgressReport
-from app.services.report_progress import ProgressReportService
+from app.services.report_progress import MonthlyReportStore
 
 router = APIRouter()
 
 
 @router.get("/monthly/{user_id}", response_model=MonthlyProgressReport)
-async def get_monthly_report(user_id: str, db: Session = Depends(get_db)):
+async def get_monthly_report(user_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     Get comprehensive monthly progress report
     
@@ -22,9 +22,12 @@ async def get_monthly_report(user_id: str, db: Session = Depends(get_db)):
     - Weight trend
     - Key achievements
     - Personalized recommendations
+    
+    Served from the stored report (see generate_monthly_reports.py) unless
+    newer logs exist
     """
     try:
-        report = ProgressReportService.generate_monthly_report(db, user_id)
+        report = await MonthlyReportStore.get_report(db, user_id)
         return report
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
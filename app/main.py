@@ -1,7 +1,10 @@
+import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import router
-from app.database import engine, Base
+from app.database import engine, Base, AsyncSessionLocal
+from app.services.quiz_bank import get_quiz_bank
+from app.services.report_renderer import shutdown_executor
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -23,6 +26,35 @@ app.add_middleware(
 
 app.include_router(router, prefix="/api/v1")
 
+@app.on_event("startup")
+async def warmup_ml_stack():
+    """
+    Optionally load NumPy/pandas, the phenotype model and the meal planner's
+    food table before serving.
+    Off by default so workers start fast; set ML_WARMUP=true to pay the
+    cost at boot instead of on the first assessment or diet plan request.
+    """
+    if os.getenv("ML_WARMUP", "false").lower() == "true":
+        from app.api.assessments import feature_engineer, risk_detector
+        from app.services.meal_planner import food_table
+        feature_engineer.warmup()
+        risk_detector.warmup()
+        food_table()
+
+@app.on_event("startup")
+async def load_quiz_bank():
+    """Load the quiz question bank once so the first quiz request doesn't pay for it"""
+    try:
+        async with AsyncSessionLocal() as db:
+            await get_quiz_bank(db)
+    except Exception as e:
+        print(f"Could not preload quiz bank: {e}")
+
+@app.on_event("shutdown")
+async def stop_report_renderer():
+    """Stop the PDF rendering process pool"""
+    shutdown_executor()
+
 @app.get("/")
 async def root():
     return {
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, JSON, Date, ForeignKey
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, JSON, Date, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func, literal_column
 from app.database import Base
 
 class Assessment(Base):
@@ -83,7 +83,10 @@ class QuizQuestion(Base):
     question = Column(Text, nullable=False)
     options = Column(JSON, nullable=False)  # List of options
     correct_answer = Column(String, nullable=False)
+    topic = Column(String, nullable=True, index=True)  # basics, symptoms, diagnosis, management, health_risks
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped by every UPDATE through SQLAlchemy, so edits change the quiz bank's version stamp
+    revision = Column(Integer, nullable=False, default=0, server_default="0", onupdate=literal_column("revision + 1"))
 
 
 class QuizResult(Base):
@@ -93,5 +96,110 @@ class QuizResult(Base):
     user_id = Column(String, nullable=False, index=True)
     score = Column(Integer, nullable=False)
     total_questions = Column(Integer, nullable=False)
+    question_ids = Column(JSON)  # Answered question ids, for recently-seen exclusion
+    outcomes = Column(String)  # "1"/"0" per entry of question_ids (correct/incorrect)
+    percentage = Column(Float)
+    awareness_level = Column(String)  # Beginner, Intermediate, Advanced, Expert
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+
+
+class HealthScoreSnapshot(Base):
+    __tablename__ = "health_score_snapshots"
+    __table_args__ = (
+        UniqueConstraint('user_id', 'snapshot_date', name='uq_health_score_snapshots_user_date'),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, nullable=False, index=True)
+    snapshot_date = Column(Date, nullable=False)  # One row per user per day
+    health_score = Column(Integer, nullable=False)
+    status = Column(String)
+    message = Column(String)
+    breakdown = Column(JSON)  # Component scores
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class UserCycleStats(Base):
+    __tablename__ = "user_cycle_stats"
+    
+    user_id = Column(String, primary_key=True)
+    log_count = Column(Integer, nullable=False, default=0)
+    last_start_date = Column(Date, nullable=True)
+    cycle_count = Column(Integer, nullable=False, default=0)  # Positive gaps between distinct start dates
+    cycle_mean = Column(Float, nullable=False, default=0.0)  # Running mean (Welford)
+    cycle_m2 = Column(Float, nullable=False, default=0.0)  # Running sum of squared deviations (Welford)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class MentalHealthRollupColumns:
+    """Shared columns for the daily and weekly mental health rollups"""
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, nullable=False, index=True)
+    period_start = Column(Date, nullable=False)  # Day, or Monday of the week
+    log_count = Column(Integer, nullable=False, default=0)
+    stress_sum = Column(Float, nullable=False, default=0.0)
+    stress_min = Column(Integer)
+    stress_max = Column(Integer)
+    sleep_sum = Column(Float, nullable=False, default=0.0)
+    sleep_min = Column(Float)
+    sleep_max = Column(Float)
+    energy_sum = Column(Float, nullable=False, default=0.0)
+    energy_min = Column(Integer)
+    energy_max = Column(Integer)
+    mood_counts = Column(JSON)  # {mood_type: count}
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class MentalHealthDailyRollup(MentalHealthRollupColumns, Base):
+    __tablename__ = "mental_health_daily_rollups"
+    __table_args__ = (
+        UniqueConstraint('user_id', 'period_start', name='uq_mental_health_daily_rollups_user_day'),
+    )
+
+
+class MentalHealthWeeklyRollup(MentalHealthRollupColumns, Base):
+    __tablename__ = "mental_health_weekly_rollups"
+    __table_args__ = (
+        UniqueConstraint('user_id', 'period_start', name='uq_mental_health_weekly_rollups_user_week'),
+    )
+
+
+class QuizQuestionStats(Base):
+    __tablename__ = "quiz_question_stats"
+    
+    question_id = Column(Integer, ForeignKey("quiz_questions.id", ondelete="CASCADE"), primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    # Running sums of the rest-of-quiz score (0-1, excluding this question) for discrimination
+    rest_score_sum = Column(Float, nullable=False, default=0.0)
+    rest_score_sq_sum = Column(Float, nullable=False, default=0.0)
+    rest_score_correct_sum = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class UserQuizStats(Base):
+    __tablename__ = "user_quiz_stats"
+    
+    user_id = Column(String, primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    first_percentage = Column(Float)
+    best_percentage = Column(Float)
+    latest_percentage = Column(Float)
+    latest_awareness_level = Column(String)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class MonthlyReport(Base):
+    __tablename__ = "monthly_reports"
+    __table_args__ = (
+        UniqueConstraint('user_id', 'month', name='uq_monthly_reports_user_month'),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, nullable=False, index=True)
+    month = Column(Date, nullable=False)  # First day of the report month
+    report = Column(JSON, nullable=False)  # MonthlyProgressReport payload
+    source_stamp = Column(JSON, nullable=False)  # Latest id and count of assessments, period and mental health logs
+    generated_at = Column(DateTime(timezone=True), nullable=False)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Any
 from datetime import datetime, date
 
 class AssessmentInput(BaseModel):
@@ -64,6 +64,40 @@ class AssessmentResponse(BaseModel):
     disclaimer: str = "This is not a medical diagnosis. Please consult a doctor for confirmation."
     assessment_id: Optional[int] = None
 
+class AssessmentBatchInput(BaseModel):
+    # Rows are validated one by one so a bad row doesn't reject the whole upload
+    assessments: List[Dict[str, Any]] = Field(..., min_length=1, max_length=1000,
+                                              description="Raw assessment inputs")
+
+class AssessmentBatchItem(AssessmentResponse):
+    index: int  # Position in the submitted list
+
+class AssessmentBatchError(BaseModel):
+    index: int
+    errors: List[str]
+
+class AssessmentBatchResponse(BaseModel):
+    results: List[AssessmentBatchItem]
+    errors: List[AssessmentBatchError]
+    processed: int
+    failed: int
+
+class ReportJobResponse(BaseModel):
+    job_id: str
+    assessment_id: int
+    status: str  # queued, running, done, failed
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    download_url: Optional[str] = None
+
+class ReportExportRequest(BaseModel):
+    # Either explicit ids or a user (optionally narrowed by assessment date)
+    assessment_ids: Optional[List[int]] = Field(None, min_length=1, max_length=10000)
+    user_id: Optional[str] = None
+    from_date: Optional[date] = None
+    to_date: Optional[date] = None
+
 
 # ===== HEALTH SCORE SCHEMAS =====
 class HealthScoreResponse(BaseModel):
@@ -105,12 +139,23 @@ class PeriodHistoryResponse(BaseModel):
     logs: List[PeriodLogResponse]
     average_cycle_length: Optional[float]
     cycle_stability_score: Optional[float]
+    cycle_std_dev: Optional[float] = None
+
+class PeriodForecast(BaseModel):
+    cycle: int  # 1 = next period, 2 = the one after, ...
+    predicted_date: date
+    earliest: date
+    latest: date
 
 class PeriodPredictionResponse(BaseModel):
     next_period_date: Optional[date]
     confidence: str
     average_cycle_length: Optional[float]
     message: str
+    earliest_date: Optional[date] = None
+    latest_date: Optional[date] = None
+    strategy: Optional[str] = None
+    upcoming: List[PeriodForecast] = []
 
 
 # ===== MENTAL HEALTH SCHEMAS =====
@@ -139,6 +184,39 @@ class MentalHealthHistoryResponse(BaseModel):
     average_sleep: Optional[float]
     average_energy: Optional[float]
 
+class MentalHealthSeriesPoint(BaseModel):
+    period_start: date  # Day, or Monday of the week
+    log_count: int
+    average_stress: float
+    min_stress: int
+    max_stress: int
+    average_sleep: float
+    min_sleep: float
+    max_sleep: float
+    average_energy: float
+    min_energy: int
+    max_energy: int
+    mood_counts: Dict[str, int]
+
+class MentalHealthSeriesResponse(BaseModel):
+    user_id: str
+    resolution: str  # daily, weekly
+    from_date: date
+    to_date: date
+    points: List[MentalHealthSeriesPoint]
+
+class CyclePhaseAverages(BaseModel):
+    log_count: int
+    average_stress: Optional[float]
+    average_sleep: Optional[float]
+    average_energy: Optional[float]
+
+class CyclePhaseProfileResponse(BaseModel):
+    phases: Dict[str, CyclePhaseAverages]  # menstrual, follicular, luteal, pre-menstrual
+    labelled_logs: int
+    periods_logged: int
+    expected_cycle_length: float
+
 class MentalHealthInsightsResponse(BaseModel):
     insights: List[str]
     stress_trend: str  # increasing, decreasing, stable
@@ -154,6 +232,8 @@ class DietPlanResponse(BaseModel):
     foods_to_avoid: List[str]
     weekly_meal_plan: Dict[str, List[str]]
     nutritional_tips: List[str]
+    nutrition_targets: Optional[Dict[str, float]] = None  # Daily calories, protein, fiber, glycemic load cap
+    daily_averages: Optional[Dict[str, float]] = None  # What the weekly plan actually delivers
 
 
 # ===== QUIZ SCHEMAS =====
@@ -177,12 +257,38 @@ class QuizResultResponse(BaseModel):
     health_tips: List[str]
     quiz_id: int
 
+class QuizQuestionAnalytics(BaseModel):
+    question_id: int
+    question: str
+    topic: Optional[str]
+    attempts: int
+    correct: int
+    difficulty: Optional[float]  # Share answered correctly (0-1)
+    discrimination: Optional[float]  # Point-biserial vs rest-of-quiz score (-1 to 1)
+
+class QuizHistoryEntry(BaseModel):
+    quiz_id: int
+    created_at: Optional[datetime]
+    score: int
+    total_questions: int
+    percentage: Optional[float]
+    awareness_level: Optional[str]
+
+class QuizHistoryResponse(BaseModel):
+    user_id: str
+    attempts: int
+    first_percentage: Optional[float]
+    best_percentage: Optional[float]
+    latest_percentage: Optional[float]
+    latest_awareness_level: Optional[str]
+    history: List[QuizHistoryEntry]
+
 
 # ===== PROGRESS REPORT SCHEMAS =====
 class MonthlyProgressReport(BaseModel):
     user_id: str
     period: str  # e.g., "January 2026"
-    health_score_trend: Dict[str, float]
+    health_score_trend: Dict[str, Any]  # current, start, change, data_points, trend
     cycle_regularity_change: Optional[str]
     stress_trend: Optional[str]
     weight_trend: Optional[str]
@@ -0,0 +1,173 @@
+"""
+Cycle Phase Engine
+Labels mental health data with cycle day and phase, and computes
+phase-conditioned stress, sleep and energy averages
+"""
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import PeriodLog, MentalHealthLog, MentalHealthDailyRollup
+from app.services.cycle_forecaster import CycleForecaster
+from datetime import date
+
+
+class CyclePhaseEngine:
+    """Phase labelling and phase-conditioned averages over a user's whole history"""
+    
+    PHASES = ("menstrual", "follicular", "luteal", "pre-menstrual")
+    
+    MENSTRUAL_DAYS = 5  # Cycle days 1-5
+    PREMENSTRUAL_DAYS = 5  # Last 5 days before the next period
+    LUTEAL_DAYS = 14  # Ovulation is ~14 days before the next period
+    OPEN_CYCLE_TOLERANCE_DAYS = 7  # Late days still labelled before the open cycle is treated as unknown
+    
+    CACHE_SIZE = 4096
+    
+    # user_id -> (data stamp, profile); process-level, least recently used evicted first
+    _cache: "OrderedDict[str, Tuple[Tuple, Dict]]" = OrderedDict()
+    
+    @classmethod
+    def phase_for(cls, cycle_day: int, days_until_next: int) -> str:
+        """Phase of a day from its position in the cycle"""
+        if cycle_day <= cls.MENSTRUAL_DAYS:
+            return "menstrual"
+        elif days_until_next <= cls.PREMENSTRUAL_DAYS:
+            return "pre-menstrual"
+        elif days_until_next <= cls.LUTEAL_DAYS:
+            return "luteal"
+        else:
+            return "follicular"
+    
+    @classmethod
+    def label_days(cls, start_dates: List[date], days: List[date],
+                   expected_cycle_days: float) -> List[Optional[Tuple[int, str]]]:
+        """
+        (cycle day, phase) for each day, or None when the phase is unknown:
+        before the first logged period, or in the open cycle after the last one
+        once it runs past the expected length (plus a tolerance), since the
+        next period was probably just not logged
+        `start_dates` must be sorted ascending; each day is located with a
+        binary search, so labelling is O(m log n) rather than a nested scan
+        """
+        labels = []
+        for day in days:
+            index = bisect_right(start_dates, day) - 1
+            if index < 0:
+                labels.append(None)
+                continue
+            
+            cycle_day = (day - start_dates[index]).days + 1
+            if index + 1 < len(start_dates):
+                days_until_next = (start_dates[index + 1] - day).days
+            else:
+                # Open cycle: assume the expected length
+                expected_length = round(expected_cycle_days)
+                if cycle_day > expected_length + cls.OPEN_CYCLE_TOLERANCE_DAYS:
+                    labels.append(None)
+                    continue
+                days_until_next = max(expected_length - cycle_day + 1, 1)
+            labels.append((cycle_day, cls.phase_for(cycle_day, days_until_next)))
+        return labels
+    
+    @classmethod
+    def phase_profile(cls, start_dates: List[date], rollups: List[Tuple[date, int, float, float, float]]) -> Dict:
+        """
+        Phase-conditioned averages from daily rollups
+        Each rollup is (day, log_count, stress_sum, sleep_sum, energy_sum); every
+        log on a day shares its label, so summing per day is exact
+        """
+        start_dates = sorted(set(start_dates))
+        lengths = CycleForecaster.cycle_lengths(start_dates)
+        expected = sum(lengths) / len(lengths) if lengths else CycleForecaster.DEFAULT_CYCLE_DAYS
+        
+        totals = {phase: [0, 0.0, 0.0, 0.0] for phase in cls.PHASES}
+        labels = cls.label_days(start_dates, [rollup[0] for rollup in rollups], expected)
+        for label, (_, count, stress_sum, sleep_sum, energy_sum) in zip(labels, rollups):
+            if label is None:
+                continue
+            total = totals[label[1]]
+            total[0] += count
+            total[1] += stress_sum
+            total[2] += sleep_sum
+            total[3] += energy_sum
+        
+        phases = {}
+        for phase, (count, stress_sum, sleep_sum, energy_sum) in totals.items():
+            phases[phase] = {
+                "log_count": count,
+                "average_stress": round(stress_sum / count, 1) if count else None,
+                "average_sleep": round(sleep_sum / count, 1) if count else None,
+                "average_energy": round(energy_sum / count, 1) if count else None
+            }
+        
+        return {
+            "phases": phases,
+            "labelled_logs": sum(total[0] for total in totals.values()),
+            "periods_logged": len(start_dates),
+            "expected_cycle_length": round(expected, 1)
+        }
+    
+    @staticmethod
+    async def data_stamp(db: AsyncSession, user_id: str) -> Tuple:
+        """Latest log ids and counts; changes whenever a new log arrives"""
+        stamp = (
+            select(func.max(MentalHealthLog.id)).where(MentalHealthLog.user_id == user_id),
+            select(func.count()).select_from(MentalHealthLog).where(MentalHealthLog.user_id == user_id),
+            select(func.max(PeriodLog.id)).where(PeriodLog.user_id == user_id),
+            select(func.count()).select_from(PeriodLog).where(PeriodLog.user_id == user_id)
+        )
+        return tuple((await db.execute(select(*(query.scalar_subquery() for query in stamp)))).one())
+    
+    @classmethod
+    def premenstrual_stress_elevated(cls, profile: Dict, min_logs: int = 3) -> bool:
+        """Whether stress in the pre-menstrual phase stands out from the rest of the cycle"""
+        phases = profile["phases"]
+        premenstrual = phases["pre-menstrual"]
+        if premenstrual["log_count"] < min_logs:
+            return False
+        
+        others = [phases[phase] for phase in cls.PHASES if phase != "pre-menstrual" and phases[phase]["log_count"]]
+        other_count = sum(phase["log_count"] for phase in others)
+        if other_count < min_logs:
+            return premenstrual["average_stress"] >= 7
+        
+        other_stress = sum(phase["average_stress"] * phase["log_count"] for phase in others) / other_count
+        return premenstrual["average_stress"] >= 7 or premenstrual["average_stress"] - other_stress >= 1.5
+    
+    @classmethod
+    async def get_phase_profile(cls, db: AsyncSession, user_id: str) -> Dict:
+        """
+        Phase-conditioned averages for the user's whole history
+        Served from the process cache until a new period or mental health log arrives
+        """
+        stamp = await cls.data_stamp(db, user_id)
+        cached = cls._cache.get(user_id)
+        if cached is not None and cached[0] == stamp:
+            cls._cache.move_to_end(user_id)
+            return cached[1]
+        
+        start_dates = (await db.scalars(
+            select(PeriodLog.start_date).where(
+                PeriodLog.user_id == user_id
+            ).order_by(PeriodLog.start_date)
+        )).all()
+        rollups = (await db.execute(
+            select(
+                MentalHealthDailyRollup.period_start,
+                MentalHealthDailyRollup.log_count,
+                MentalHealthDailyRollup.stress_sum,
+                MentalHealthDailyRollup.sleep_sum,
+                MentalHealthDailyRollup.energy_sum
+            ).where(
+                MentalHealthDailyRollup.user_id == user_id
+            ).order_by(MentalHealthDailyRollup.period_start)
+        )).all()
+        
+        profile = cls.phase_profile(start_dates, rollups)
+        cls._cache[user_id] = (stamp, profile)
+        cls._cache.move_to_end(user_id)
+        if len(cls._cache) > cls.CACHE_SIZE:
+            cls._cache.popitem(last=False)
+        return profile
@@ -2,17 +2,21 @@
 AI Diet Personalizer Service
 Generates personalized diet plans based on PCOS phenotype, BMI, and symptoms
 """
-from typing import Dict, List
-from sqlalchemy.orm import Session
+import json
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models import Assessment
+from app.services.meal_planner import MealTargets, build_weekly_plan, calculate_targets
 
 
 class DietPersonalizerService:
     """Service for generating personalized diet recommendations"""
     
-    # Diet recommendations by phenotype
+    # Diet recommendations by phenotype (names as produced by the risk detector)
     PHENOTYPE_DIETS = {
-        "Insulin-Resistant PCOS": {
+        "Insulin-resistant PCOS": {
             "foods_to_eat": [
                 "Leafy greens (spinach, kale, lettuce)",
                 "Whole grains (quinoa, brown rice, oats)",
@@ -134,100 +138,36 @@ class DietPersonalizerService:
         else:
             return "Obese"
     
-    @staticmethod
-    def generate_weekly_meal_plan(phenotype: str, bmi_category: str) -> Dict[str, List[str]]:
-        """Generate a sample weekly meal plan"""
-        
-        # Base meal structure
-        if phenotype == "Insulin-Resistant PCOS":
-            return {
-                "Monday": [
-                    "Breakfast: Oatmeal with berries and chia seeds",
-                    "Lunch: Grilled chicken salad with olive oil dressing",
-                    "Dinner: Baked salmon with quinoa and steamed broccoli",
-                    "Snacks: Almonds, Greek yogurt"
-                ],
-                "Tuesday": [
-                    "Breakfast: Scrambled eggs with spinach and whole grain toast",
-                    "Lunch: Lentil soup with mixed vegetables",
-                    "Dinner: Stir-fried tofu with brown rice and vegetables",
-                    "Snacks: Apple slices with almond butter"
-                ],
-                "Wednesday": [
-                    "Breakfast: Greek yogurt with flaxseeds and berries",
-                    "Lunch: Quinoa bowl with chickpeas and roasted vegetables",
-                    "Dinner: Grilled fish with sweet potato and green beans",
-                    "Snacks: Carrot sticks with hummus"
-                ],
-                "Remaining Days": [
-                    "Continue rotating similar low-GI, high-protein meals",
-                    "Focus on portion control and meal timing",
-                    "Stay hydrated with water and herbal teas"
-                ]
-            }
-        elif phenotype == "Inflammatory PCOS":
-            return {
-                "Monday": [
-                    "Breakfast: Smoothie with berries, spinach, and flaxseeds",
-                    "Lunch: Salmon salad with mixed greens and olive oil",
-                    "Dinner: Turmeric chicken with roasted vegetables",
-                    "Snacks: Walnuts, green tea"
-                ],
-                "Tuesday": [
-                    "Breakfast: Chia pudding with berries",
-                    "Lunch: Quinoa bowl with grilled vegetables and tahini",
-                    "Dinner: Baked mackerel with sweet potato",
-                    "Snacks: Anti-inflammatory smoothie"
-                ],
-                "Remaining Days": [
-                    "Focus on omega-3 rich foods",
-                    "Include turmeric and ginger in meals",
-                    "Drink green tea regularly"
-                ]
-            }
-        else:
-            return {
-                "General Plan": [
-                    "Breakfast: Protein-rich options with vegetables",
-                    "Lunch: Balanced meals with lean protein and complex carbs",
-                    "Dinner: Light, nutrient-dense meals",
-                    "Snacks: Nuts, seeds, fruits"
-                ]
-            }
+    DEFAULT_PHENOTYPE = "Insulin-resistant PCOS"
+    BMI_CATEGORIES = ("Underweight", "Normal", "Overweight", "Obese")
     
-    @staticmethod
-    def generate_diet_plan(db: Session, user_id: str) -> Dict:
-        """Generate personalized diet plan"""
-        
-        # Get latest assessment
-        assessment = db.query(Assessment).filter(
-            Assessment.user_id == user_id
-        ).order_by(Assessment.created_at.desc()).first()
-        
-        if not assessment:
-            return {
-                "phenotype": "Unknown",
-                "bmi_category": "Unknown",
-                "foods_to_eat": ["Complete an assessment first to get personalized recommendations"],
-                "foods_to_avoid": [],
-                "weekly_meal_plan": {},
-                "nutritional_tips": ["Take the PCOS assessment to receive a customized diet plan"]
-            }
-        
-        # Calculate BMI
-        bmi = DietPersonalizerService.calculate_bmi(assessment.height_cm, assessment.weight_kg)
-        bmi_category = DietPersonalizerService.get_bmi_category(bmi)
-        
-        phenotype = assessment.phenotype or "Insulin-Resistant PCOS"
-        
-        # Get diet recommendations for phenotype
-        diet_data = DietPersonalizerService.PHENOTYPE_DIETS.get(
-            phenotype,
-            DietPersonalizerService.PHENOTYPE_DIETS["Insulin-Resistant PCOS"]
-        )
+    NO_ASSESSMENT_PLAN = {
+        "phenotype": "Unknown",
+        "bmi_category": "Unknown",
+        "foods_to_eat": ["Complete an assessment first to get personalized recommendations"],
+        "foods_to_avoid": [],
+        "weekly_meal_plan": {},
+        "nutritional_tips": ["Take the PCOS assessment to receive a customized diet plan"]
+    }
+    
+    @classmethod
+    def normalize_phenotype(cls, phenotype: Optional[str]) -> str:
+        """
+        Canonical phenotype key for the diet tables
+        Matching ignores case and spacing, so "Insulin-Resistant PCOS" and
+        "Insulin-resistant PCOS" resolve to the same plan
+        """
+        if not phenotype:
+            return cls.DEFAULT_PHENOTYPE
+        return PHENOTYPE_KEYS.get(" ".join(phenotype.split()).casefold(), cls.DEFAULT_PHENOTYPE)
+    
+    @classmethod
+    def build_diet_plan(cls, phenotype: str, bmi_category: str, targets: MealTargets) -> Dict:
+        """Build the plan for a canonical phenotype, BMI category and target bucket (no queries)"""
+        diet_data = cls.PHENOTYPE_DIETS[phenotype]
         
-        # Generate meal plan
-        meal_plan = DietPersonalizerService.generate_weekly_meal_plan(phenotype, bmi_category)
+        # Optimized meal plan, memoized per target bucket
+        meal_plan, daily_averages = build_weekly_plan(targets)
         
         # Add BMI-specific tips
         additional_tips = []
@@ -250,5 +190,56 @@ class DietPersonalizerService:
             "foods_to_eat": diet_data["foods_to_eat"],
             "foods_to_avoid": diet_data["foods_to_avoid"],
             "weekly_meal_plan": meal_plan,
-            "nutritional_tips": diet_data["tips"] + additional_tips
+            "nutritional_tips": diet_data["tips"] + additional_tips,
+            "nutrition_targets": {
+                "calories": targets.calories,
+                "protein_g": targets.protein_g,
+                "fiber_g": targets.fiber_g,
+                "max_glycemic_load": targets.max_glycemic_load
+            },
+            "daily_averages": daily_averages
         }
+    
+    @staticmethod
+    async def get_plan_key(db: AsyncSession, user_id: str) -> Optional[Tuple[str, str, MealTargets]]:
+        """(phenotype, BMI category, nutrient targets) of the latest assessment, from a narrow column query"""
+        row = (await db.execute(
+            select(
+                Assessment.phenotype, Assessment.height_cm, Assessment.weight_kg,
+                Assessment.age, Assessment.exercise_days_per_week, Assessment.diet_type
+            ).where(
+                Assessment.user_id == user_id
+            ).order_by(Assessment.created_at.desc()).limit(1)
+        )).first()
+        
+        if row is None:
+            return None
+        
+        bmi = DietPersonalizerService.calculate_bmi(row.height_cm, row.weight_kg)
+        bmi_category = DietPersonalizerService.get_bmi_category(bmi)
+        phenotype = DietPersonalizerService.normalize_phenotype(row.phenotype)
+        targets = calculate_targets(
+            row.age, row.height_cm, row.weight_kg, row.exercise_days_per_week,
+            bmi_category, phenotype, row.diet_type
+        )
+        return phenotype, bmi_category, targets
+    
+    @staticmethod
+    async def get_diet_plan_payload(db: AsyncSession, user_id: str) -> bytes:
+        """Serialized diet plan response for the user's latest assessment"""
+        key = await DietPersonalizerService.get_plan_key(db, user_id)
+        if key is None:
+            return NO_ASSESSMENT_PAYLOAD
+        return plan_payload(*key)
+
+
+# Case- and spacing-insensitive lookup of phenotype names
+PHENOTYPE_KEYS = {name.casefold(): name for name in DietPersonalizerService.PHENOTYPE_DIETS}
+
+NO_ASSESSMENT_PAYLOAD = json.dumps(DietPersonalizerService.NO_ASSESSMENT_PLAN).encode("utf-8")
+
+
+@lru_cache(maxsize=2048)
+def plan_payload(phenotype: str, bmi_category: str, targets: MealTargets) -> bytes:
+    """Plans depend only on (phenotype, BMI category, target bucket): serialize each once"""
+    return json.dumps(DietPersonalizerService.build_diet_plan(phenotype, bmi_category, targets)).encode("utf-8")
@@ -1,4 +1,3 @@
-import numpy as np
 from typing import Dict, List, Tuple
 from app.services.feature_engineering import FeatureEngineer
 
@@ -1,10 +1,32 @@
-import numpy as np
-import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, Mapping, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
 
 class FeatureEngineer:
     """Engineers medically meaningful features from raw input data"""
     
+    # Features consumed by the risk model, in model column order
+    MODEL_FEATURES = [
+        'bmi', 'cycle_irregularity', 'ovulation_risk', 'hyperandrogenism',
+        'metabolic_risk', 'lifestyle_risk', 'cycle_length_norm',
+        'family_history', 'age_norm', 'cycles_completeness', 'missed_periods_norm'
+    ]
+    
+    # All engineered features, in the same order as engineer_features()
+    ALL_FEATURES = [
+        'bmi', 'bmi_raw', 'cycle_irregularity', 'ovulation_risk', 'hyperandrogenism',
+        'metabolic_risk', 'lifestyle_risk', 'cycle_length_norm', 'family_history',
+        'age_norm', 'cycles_completeness', 'missed_periods_norm'
+    ]
+    
+    @staticmethod
+    def warmup() -> None:
+        """Import the NumPy/pandas stack used by the batch path ahead of first use"""
+        import numpy
+        import pandas
+    
     @staticmethod
     def calculate_bmi(weight_kg: float, height_cm: float) -> float:
         """Calculate Body Mass Index"""
@@ -219,3 +241,123 @@ class FeatureEngineer:
             'missed_periods_norm': min(data['missed_period_frequency'] / 12.0, 1.0)
         }
 
+    
+    @staticmethod
+    def engineer_features_frame(data: Union['pd.DataFrame', Mapping[str, Any]]) -> 'pd.DataFrame':
+        """
+        Vectorized version of engineer_features for a whole cohort
+        Accepts a DataFrame or a mapping of column name -> array of raw inputs
+        Returns a DataFrame with one row per sample and ALL_FEATURES columns
+        """
+        import numpy as np
+        import pandas as pd
+        
+        frame = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+        
+        def column(name: str) -> 'np.ndarray':
+            return frame[name].to_numpy(dtype=float)
+        
+        def flag(name: str) -> 'np.ndarray':
+            return frame[name].to_numpy(dtype=bool)
+        
+        cycle_length_avg = column('cycle_length_avg')
+        cycles_last_12_months = column('cycles_last_12_months')
+        missed_period_frequency = column('missed_period_frequency')
+        sleep_hours = column('sleep_hours')
+        exercise_days = column('exercise_days_per_week')
+        
+        # BMI
+        height_m = column('height_cm') / 100
+        bmi = column('weight_kg') / (height_m ** 2)
+        
+        # Shared cycle terms
+        missed_period_score = np.minimum(missed_period_frequency / 12, 1.0)
+        
+        # Cycle irregularity
+        cycle_deviation = np.abs(cycle_length_avg - 28) / 28
+        missing_cycle_score = 1 - cycles_last_12_months / 12
+        cycle_irregularity = np.minimum(
+            cycle_deviation * 0.3 + missing_cycle_score * 0.4 + missed_period_score * 0.3,
+            1.0
+        )
+        
+        # Ovulation risk
+        cycle_risk = np.select(
+            [
+                (cycle_length_avg < 21) | (cycle_length_avg > 35),
+                (cycle_length_avg < 24) | (cycle_length_avg > 32)
+            ],
+            [0.8, 0.5],
+            default=0.2
+        )
+        missing_risk = np.minimum((12 - cycles_last_12_months) / 12, 1.0)
+        ovulation_risk = np.minimum(
+            cycle_risk * 0.4 + missing_risk * 0.3 + missed_period_score * 0.3,
+            1.0
+        )
+        
+        # Hyperandrogenism
+        hyperandrogenism = np.minimum(
+            column('acne_severity') / 5.0 * 0.3 +
+            column('facial_hair_growth') / 5.0 * 0.3 +
+            column('hair_thinning') / 5.0 * 0.2 +
+            np.where(flag('dark_patches_skin'), 1.0, 0.0) * 0.2,
+            1.0
+        )
+        
+        # Metabolic risk
+        bmi_risk = np.select(
+            [bmi < 18.5, bmi < 25, bmi < 30],
+            [0.2, 0.3, 0.6],
+            default=0.9
+        )
+        metabolic_risk = np.minimum(
+            bmi_risk * 0.4 +
+            column('fatigue_level') / 5.0 * 0.2 +
+            column('sugar_cravings') / 5.0 * 0.2 +
+            np.where(flag('sudden_weight_gain'), 1.0, 0.0) * 0.2,
+            1.0
+        )
+        
+        # Lifestyle risk
+        sleep_risk = np.select(
+            [
+                (sleep_hours >= 7) & (sleep_hours <= 9),
+                ((sleep_hours >= 6) & (sleep_hours < 7)) | ((sleep_hours > 9) & (sleep_hours <= 10))
+            ],
+            [0.2, 0.5],
+            default=0.8
+        )
+        exercise_risk = np.select(
+            [exercise_days >= 3, exercise_days >= 1],
+            [0.2, 0.5],
+            default=0.8
+        )
+        lifestyle_risk = np.minimum(
+            column('stress_level') / 10.0 * 0.4 + sleep_risk * 0.3 + exercise_risk * 0.3,
+            1.0
+        )
+        
+        return pd.DataFrame({
+            'bmi': np.minimum(bmi / 50.0, 1.0),
+            'bmi_raw': bmi,
+            'cycle_irregularity': cycle_irregularity,
+            'ovulation_risk': ovulation_risk,
+            'hyperandrogenism': hyperandrogenism,
+            'metabolic_risk': metabolic_risk,
+            'lifestyle_risk': lifestyle_risk,
+            'cycle_length_norm': np.minimum(cycle_length_avg / 50.0, 1.0),
+            'family_history': np.where(flag('family_history_pcos'), 1.0, 0.0),
+            'age_norm': (column('age') - 13) / (50 - 13),
+            'cycles_completeness': cycles_last_12_months / 12.0,
+            'missed_periods_norm': missed_period_score
+        }, index=frame.index, columns=FeatureEngineer.ALL_FEATURES)
+    
+    @staticmethod
+    def engineer_features_batch(data: Union['pd.DataFrame', Mapping[str, Any]]) -> 'np.ndarray':
+        """
+        Engineer features for many samples at once
+        Returns an (N, 11) float matrix with columns in MODEL_FEATURES order
+        """
+        frame = FeatureEngineer.engineer_features_frame(data)
+        return frame[FeatureEngineer.MODEL_FEATURES].to_numpy(dtype=float)
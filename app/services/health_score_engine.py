@@ -2,10 +2,77 @@
 Health Score Engine Service
 Calculates a comprehensive health score (0-100) based on multiple factors
 """
-from typing import Dict, Optional
-from sqlalchemy.orm import Session
-from app.models import Assessment, PeriodLog, MentalHealthLog
-from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from app.database import dialect_insert
+from app.models import Assessment, PeriodLog, MentalHealthLog, HealthScoreSnapshot
+from datetime import datetime, date, timedelta
+
+
+class UserHealthContext:
+    """Snapshot of everything a health score needs, loaded once per request"""
+    
+    PERIOD_WINDOW_DAYS = 180
+    MENTAL_WINDOW_DAYS = 30
+    
+    def __init__(self, assessment: Optional[Assessment], period_logs: List[PeriodLog],
+                 average_stress: Optional[float] = None, average_sleep: Optional[float] = None):
+        self.assessment = assessment
+        self.period_logs = period_logs  # Last 6 months, ordered by start_date
+        # Means over the last 30 days of mental health logs; None when there are none
+        self.average_stress = average_stress
+        self.average_sleep = average_sleep
+    
+    @classmethod
+    def period_logs_statement(cls, user_ids: List[str], now: datetime):
+        return select(PeriodLog).where(
+            PeriodLog.user_id.in_(user_ids),
+            PeriodLog.created_at >= now - timedelta(days=cls.PERIOD_WINDOW_DAYS)
+        ).order_by(PeriodLog.start_date)
+    
+    @classmethod
+    def mental_averages_statement(cls, user_ids: List[str], now: datetime):
+        """(user_id, average stress, average sleep) per user with logs in the window"""
+        return select(
+            MentalHealthLog.user_id,
+            func.avg(MentalHealthLog.stress_level),
+            func.avg(MentalHealthLog.sleep_hours)
+        ).where(
+            MentalHealthLog.user_id.in_(user_ids),
+            MentalHealthLog.created_at >= now - timedelta(days=cls.MENTAL_WINDOW_DAYS)
+        ).group_by(MentalHealthLog.user_id)
+    
+    @classmethod
+    async def load_many(cls, db: AsyncSession, user_ids: List[str]) -> Dict[str, "UserHealthContext"]:
+        """Fetch latest assessments, period logs and mental health averages for many users (3 queries)"""
+        now = datetime.now()
+        
+        latest = aliased(Assessment)
+        latest_assessment_id = select(latest.id).where(
+            latest.user_id == Assessment.user_id
+        ).order_by(latest.created_at.desc(), latest.id.desc()).limit(1).correlate(Assessment).scalar_subquery()
+        
+        contexts = {user_id: cls(None, []) for user_id in user_ids}
+        for assessment in await db.scalars(
+            select(Assessment).where(
+                Assessment.user_id.in_(user_ids),
+                Assessment.id == latest_assessment_id
+            )
+        ):
+            contexts[assessment.user_id].assessment = assessment
+        for log in await db.scalars(cls.period_logs_statement(user_ids, now)):
+            contexts[log.user_id].period_logs.append(log)
+        for user_id, average_stress, average_sleep in await db.execute(cls.mental_averages_statement(user_ids, now)):
+            contexts[user_id].average_stress = float(average_stress)
+            contexts[user_id].average_sleep = float(average_sleep)
+        return contexts
+    
+    @classmethod
+    async def load(cls, db: AsyncSession, user_id: str) -> "UserHealthContext":
+        """Fetch the latest assessment, period logs and mental health averages (3 queries)"""
+        return (await cls.load_many(db, [user_id]))[user_id]
 
 
 class HealthScoreEngine:
@@ -28,21 +95,10 @@ class HealthScoreEngine:
         return weight_kg / (height_m ** 2)
     
     @staticmethod
-    def score_cycle_regularity(db: Session, user_id: str) -> float:
-        """Score cycle regularity (0-100) based on period logs"""
-        # Get recent period logs (last 6 months)
-        six_months_ago = datetime.now() - timedelta(days=180)
-        logs = db.query(PeriodLog).filter(
-            PeriodLog.user_id == user_id,
-            PeriodLog.created_at >= six_months_ago
-        ).order_by(PeriodLog.start_date).all()
-        
+    def score_cycle_regularity(logs: List[PeriodLog], assessment: Optional[Assessment]) -> float:
+        """Score cycle regularity (0-100) based on period logs ordered by start_date"""
         if len(logs) < 2:
             # Not enough data, check assessment
-            assessment = db.query(Assessment).filter(
-                Assessment.user_id == user_id
-            ).order_by(Assessment.created_at.desc()).first()
-            
             if assessment:
                 # Use cycles_last_12_months as indicator
                 if assessment.cycles_last_12_months >= 11:
@@ -94,54 +150,32 @@ class HealthScoreEngine:
             return 20.0
     
     @staticmethod
-    def score_stress(db: Session, user_id: str) -> float:
-        """Score stress level (0-100) based on recent mental health logs"""
-        # Get recent logs (last 30 days)
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        logs = db.query(MentalHealthLog).filter(
-            MentalHealthLog.user_id == user_id,
-            MentalHealthLog.created_at >= thirty_days_ago
-        ).all()
-        
-        if not logs:
+    def score_stress(average_stress: Optional[float], assessment: Optional[Assessment]) -> float:
+        """Score stress level (0-100) based on the recent mental health log average"""
+        if average_stress is None:
             # Check assessment
-            assessment = db.query(Assessment).filter(
-                Assessment.user_id == user_id
-            ).order_by(Assessment.created_at.desc()).first()
-            
             if assessment:
                 stress_level = assessment.stress_level
             else:
                 return 50.0  # Default
         else:
-            stress_level = sum(log.stress_level for log in logs) / len(logs)
+            stress_level = average_stress
         
         # Convert stress (1-10) to score (100-0)
         # Lower stress = higher score
         return max(0, 100 - (stress_level * 10))
     
     @staticmethod
-    def score_sleep(db: Session, user_id: str) -> float:
-        """Score sleep hours (0-100)"""
-        # Get recent logs
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        logs = db.query(MentalHealthLog).filter(
-            MentalHealthLog.user_id == user_id,
-            MentalHealthLog.created_at >= thirty_days_ago
-        ).all()
-        
-        if not logs:
+    def score_sleep(average_sleep: Optional[float], assessment: Optional[Assessment]) -> float:
+        """Score sleep hours (0-100) based on the recent mental health log average"""
+        if average_sleep is None:
             # Check assessment
-            assessment = db.query(Assessment).filter(
-                Assessment.user_id == user_id
-            ).order_by(Assessment.created_at.desc()).first()
-            
             if assessment:
                 sleep_hours = assessment.sleep_hours
             else:
                 return 50.0
         else:
-            sleep_hours = sum(log.sleep_hours for log in logs) / len(logs)
+            sleep_hours = average_sleep
         
         # Optimal sleep: 7-9 hours
         if 7 <= sleep_hours <= 9:
@@ -154,12 +188,8 @@ class HealthScoreEngine:
             return 25.0
     
     @staticmethod
-    def score_exercise(db: Session, user_id: str) -> float:
+    def score_exercise(assessment: Optional[Assessment]) -> float:
         """Score exercise frequency (0-100)"""
-        assessment = db.query(Assessment).filter(
-            Assessment.user_id == user_id
-        ).order_by(Assessment.created_at.desc()).first()
-        
         if not assessment:
             return 50.0
         
@@ -178,12 +208,8 @@ class HealthScoreEngine:
             return 20.0
     
     @staticmethod
-    def score_symptoms(db: Session, user_id: str) -> float:
+    def score_symptoms(assessment: Optional[Assessment]) -> float:
         """Score based on symptom severity (0-100)"""
-        assessment = db.query(Assessment).filter(
-            Assessment.user_id == user_id
-        ).order_by(Assessment.created_at.desc()).first()
-        
         if not assessment:
             return 50.0
         
@@ -200,14 +226,151 @@ class HealthScoreEngine:
         symptom_percentage = (total_symptoms / 25) * 100
         return max(0, 100 - symptom_percentage)
     
+    @staticmethod
+    def snapshot_to_dict(snapshot: HealthScoreSnapshot) -> Dict:
+        """Convert a stored snapshot to the health score response shape"""
+        return {
+            "health_score": snapshot.health_score,
+            "status": snapshot.status,
+            "message": snapshot.message,
+            "breakdown": snapshot.breakdown or {}
+        }
+    
     @classmethod
-    def calculate_health_score(cls, db: Session, user_id: str) -> Dict:
-        """Calculate overall health score with breakdown"""
+    async def get_health_score(cls, db: AsyncSession, user_id: str) -> Dict:
+        """
+        Serve the latest stored snapshot
+        Recomputes only when nothing has been stored today, since the
+        30-day log window moves even without new writes
+        """
+        snapshot = await db.scalar(
+            select(HealthScoreSnapshot).where(
+                HealthScoreSnapshot.user_id == user_id
+            ).order_by(HealthScoreSnapshot.snapshot_date.desc()).limit(1)
+        )
         
-        # Get latest assessment for BMI calculation
-        assessment = db.query(Assessment).filter(
-            Assessment.user_id == user_id
-        ).order_by(Assessment.created_at.desc()).first()
+        if snapshot and snapshot.snapshot_date == date.today():
+            return cls.snapshot_to_dict(snapshot)
+        
+        result = await cls.refresh_snapshot(db, user_id)
+        await db.commit()
+        return result
+    
+    @classmethod
+    async def refresh_snapshot(cls, db: AsyncSession, user_id: str, changed: Optional[str] = None) -> Dict:
+        """
+        Bring today's snapshot up to date after a write
+        A new period or mental health log (`changed` = "period" or "mental")
+        only moves the components that log type feeds, so just those are
+        recomputed on top of today's stored breakdown. Assessments feed every
+        other component, so they (and days without a snapshot yet) get a full
+        recompute. The caller flushes pending rows first and commits afterwards
+        """
+        if changed is not None:
+            result = await cls.update_components(db, user_id, changed)
+            if result is not None:
+                return result
+        
+        result = await cls.calculate_health_score(db, user_id)
+        await cls.upsert_snapshots(db, {user_id: result})
+        return result
+    
+    @classmethod
+    async def update_components(cls, db: AsyncSession, user_id: str, changed: str) -> Optional[Dict]:
+        """
+        Rescore the components fed by one log type in today's snapshot
+        Returns None when a full recompute is needed instead: no snapshot
+        today, or the component still falls back to the assessment
+        """
+        # Locked so concurrent period and mental health writes can't overwrite each other's component
+        snapshot = await db.scalar(
+            select(HealthScoreSnapshot).where(
+                HealthScoreSnapshot.user_id == user_id,
+                HealthScoreSnapshot.snapshot_date == date.today()
+            ).with_for_update().execution_options(populate_existing=True)
+        )
+        if snapshot is None or not snapshot.breakdown:
+            return None
+        
+        now = datetime.now()
+        scores = dict(snapshot.breakdown)
+        if changed == "mental":
+            averages = (await db.execute(UserHealthContext.mental_averages_statement([user_id], now))).first()
+            if averages is None:
+                return None
+            scores["stress"] = cls.score_stress(float(averages[1]), None)
+            scores["sleep"] = cls.score_sleep(float(averages[2]), None)
+        elif changed == "period":
+            period_logs = (await db.scalars(UserHealthContext.period_logs_statement([user_id], now))).all()
+            if len(period_logs) < 2:
+                return None
+            scores["cycle_regularity"] = cls.score_cycle_regularity(period_logs, None)
+        else:
+            raise ValueError(f"Unknown component source '{changed}'")
+        
+        result = cls.summarize_scores(scores)
+        snapshot.health_score = result["health_score"]
+        snapshot.status = result["status"]
+        snapshot.message = result["message"]
+        snapshot.breakdown = result["breakdown"]
+        return result
+    
+    @classmethod
+    async def refresh_snapshots(cls, db: AsyncSession, user_ids: List[str]) -> None:
+        """
+        Recompute and upsert today's snapshot for many users (bulk writes)
+        Three IN queries and one multi-row upsert, whatever the number of
+        users; the caller commits
+        """
+        if not user_ids:
+            return
+        contexts = await UserHealthContext.load_many(db, user_ids)
+        await cls.upsert_snapshots(db, {
+            user_id: cls.score_context(context) for user_id, context in contexts.items()
+        })
+    
+    @staticmethod
+    async def upsert_snapshots(db: AsyncSession, results: Dict[str, Dict]) -> None:
+        """Store today's score for each user in one statement; users without an assessment are skipped"""
+        today = date.today()
+        rows = [
+            {
+                "user_id": user_id,
+                "snapshot_date": today,
+                "health_score": result["health_score"],
+                "status": result["status"],
+                "message": result["message"],
+                "breakdown": result["breakdown"]
+            }
+            for user_id, result in results.items() if result["status"] != "No Data"
+        ]
+        if not rows:
+            return
+        
+        # Upsert on (user_id, snapshot_date), so concurrent writes for the
+        # same user and day can't collide on the unique constraint
+        statement = dialect_insert(db)(HealthScoreSnapshot).values(rows)
+        await db.execute(statement.on_conflict_do_update(
+            index_elements=[HealthScoreSnapshot.user_id, HealthScoreSnapshot.snapshot_date],
+            set_={
+                "health_score": statement.excluded.health_score,
+                "status": statement.excluded.status,
+                "message": statement.excluded.message,
+                "breakdown": statement.excluded.breakdown,
+                "updated_at": func.now()
+            }
+        ))
+    
+    @classmethod
+    async def calculate_health_score(cls, db: AsyncSession, user_id: str) -> Dict:
+        """Calculate overall health score with breakdown"""
+        context = await UserHealthContext.load(db, user_id)
+        return cls.score_context(context)
+    
+    @classmethod
+    def score_context(cls, context: UserHealthContext) -> Dict:
+        """Calculate the health score from an already-loaded snapshot (no queries)"""
+        assessment = context.assessment
         
         if not assessment:
             return {
@@ -222,14 +385,19 @@ class HealthScoreEngine:
         
         # Calculate component scores
         scores = {
-            'cycle_regularity': cls.score_cycle_regularity(db, user_id),
+            'cycle_regularity': cls.score_cycle_regularity(context.period_logs, assessment),
             'bmi': cls.score_bmi(bmi),
-            'stress': cls.score_stress(db, user_id),
-            'sleep': cls.score_sleep(db, user_id),
-            'exercise': cls.score_exercise(db, user_id),
-            'symptoms': cls.score_symptoms(db, user_id)
+            'stress': cls.score_stress(context.average_stress, assessment),
+            'sleep': cls.score_sleep(context.average_sleep, assessment),
+            'exercise': cls.score_exercise(assessment),
+            'symptoms': cls.score_symptoms(assessment)
         }
         
+        return cls.summarize_scores(scores)
+    
+    @classmethod
+    def summarize_scores(cls, scores: Dict[str, float]) -> Dict:
+        """Weighted total, status and breakdown from the component scores"""
         # Calculate weighted total
         total_score = sum(scores[key] * cls.WEIGHTS[key] for key in scores)
         total_score = round(total_score)
@@ -0,0 +1,224 @@
+"""
+Meal Plan Optimizer
+Builds 7-day meal plans that meet calorie, glycemic-load, protein and fiber
+targets from a small food composition table
+"""
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# NumPy is imported on first use so the API starts without it
+
+
+# What a food contains; diets exclude foods by these tags
+MEAT, FISH, EGG, DAIRY = "M", "F", "E", "D"
+CONTENTS = (MEAT, FISH, EGG, DAIRY)
+
+# Tags each diet excludes. "vegetarian" is lacto-ovo; "eggetarian" is vegetarian with eggs.
+DIET_EXCLUSIONS = {
+    "vegan": MEAT + FISH + EGG + DAIRY,
+    "vegetarian": MEAT + FISH,
+    "lacto-ovo-vegetarian": MEAT + FISH,
+    "lacto-vegetarian": MEAT + FISH + EGG,
+    "ovo-vegetarian": MEAT + FISH + DAIRY,
+    "eggetarian": MEAT + FISH,
+    "pescatarian": MEAT,
+    "non-vegetarian": "",
+    "omnivore": "",
+}
+# Missing, "other" or unrecognised diets get the most restrictive plan
+DEFAULT_EXCLUSIONS = DIET_EXCLUSIONS["vegan"]
+
+SLOTS = ("Breakfast", "Lunch", "Dinner", "Snacks")
+SLOT_SHARES = (0.25, 0.35, 0.30, 0.10)  # Share of the day's targets per slot
+PORTIONS = (0.5, 1.0, 1.5, 2.0)  # Serving multiples the solver may choose
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+# name, slots (B/L/D/S), contents (M/F/E/D), kcal, protein g, fiber g, glycemic load (per serving)
+FOODS = [
+    ("Oatmeal with berries and chia seeds", "B", "", 320, 10, 9, 13),
+    ("Tofu scramble with spinach", "B", "", 250, 20, 4, 2),
+    ("Chia pudding with almond milk and berries", "BS", "", 230, 7, 11, 5),
+    ("Whole grain toast with avocado", "B", "", 290, 8, 9, 10),
+    ("Besan chilla with mint chutney", "B", "", 260, 13, 6, 9),
+    ("Vegetable poha with peanuts", "B", "", 300, 8, 5, 18),
+    ("Smoothie with berries, spinach and flaxseeds", "BS", "", 220, 6, 8, 7),
+    ("Greek yogurt with flaxseeds and berries", "BS", DAIRY, 210, 17, 5, 5),
+    ("Scrambled eggs with spinach and whole grain toast", "B", EGG, 330, 21, 5, 8),
+    ("Vegetable omelette", "B", EGG, 260, 18, 3, 1),
+    ("Paneer and vegetable stuffed whole wheat paratha", "B", DAIRY, 380, 17, 6, 17),
+    ("Lentil soup with mixed vegetables", "LD", "", 300, 18, 14, 9),
+    ("Quinoa bowl with chickpeas and roasted vegetables", "LD", "", 450, 17, 13, 16),
+    ("Stir-fried tofu with brown rice and vegetables", "LD", "", 460, 22, 7, 20),
+    ("Rajma with brown rice", "LD", "", 480, 18, 15, 22),
+    ("Chana masala with whole wheat roti", "LD", "", 430, 16, 13, 19),
+    ("Black bean and vegetable burrito bowl", "LD", "", 470, 19, 16, 18),
+    ("Tempeh salad with olive oil dressing", "L", "", 380, 24, 8, 4),
+    ("Moong dal khichdi with vegetables", "LD", "", 400, 15, 9, 21),
+    ("Palak paneer with whole wheat roti", "LD", DAIRY, 450, 22, 7, 14),
+    ("Greek salad with feta and chickpeas", "L", DAIRY, 360, 15, 9, 6),
+    ("Egg curry with millet roti", "LD", EGG, 420, 20, 6, 15),
+    ("Cottage cheese and vegetable wrap", "L", DAIRY, 390, 24, 7, 13),
+    ("Grilled chicken salad with olive oil dressing", "L", MEAT, 380, 35, 6, 3),
+    ("Baked salmon with quinoa and steamed broccoli", "D", FISH, 520, 38, 7, 12),
+    ("Grilled fish with sweet potato and green beans", "D", FISH, 450, 34, 8, 14),
+    ("Turmeric chicken with roasted vegetables", "D", MEAT, 430, 36, 6, 5),
+    ("Baked mackerel with sweet potato", "D", FISH, 480, 30, 5, 13),
+    ("Chicken and vegetable stir-fry with brown rice", "LD", MEAT, 500, 35, 6, 20),
+    ("Turkey and avocado whole grain sandwich", "L", MEAT, 420, 30, 7, 14),
+    ("Almonds", "S", "", 170, 6, 4, 0),
+    ("Walnuts and green tea", "S", "", 190, 4, 2, 0),
+    ("Apple slices with almond butter", "S", "", 200, 5, 5, 6),
+    ("Carrot sticks with hummus", "S", "", 150, 5, 6, 3),
+    ("Roasted chickpeas", "S", "", 160, 8, 7, 6),
+    ("Pumpkin seeds", "S", "", 160, 9, 2, 0),
+    ("Berries with a handful of nuts", "S", "", 180, 4, 6, 4),
+    ("Boiled eggs", "S", EGG, 140, 12, 0, 0),
+    ("Cottage cheese with cucumber", "S", DAIRY, 130, 14, 1, 1),
+]
+
+
+class MealTargets(NamedTuple):
+    """Daily nutrient targets, rounded into buckets so plans can be reused"""
+    calories: int
+    protein_g: int
+    fiber_g: int
+    max_glycemic_load: int
+    excluded: str  # Content tags the user's diet excludes
+
+
+class FoodTable:
+    """Column arrays over FOODS, built once per process"""
+    
+    def __init__(self):
+        import numpy as np
+        self.names = [food[0] for food in FOODS]
+        self.slot_mask = np.array([[slot[0] in food[1] for slot in SLOTS] for food in FOODS])
+        self.contents = np.array([[tag in food[2] for tag in CONTENTS] for food in FOODS])
+        # (foods x nutrients): kcal, protein, fiber, glycemic load
+        self.nutrients = np.array([food[3:7] for food in FOODS], dtype=float)
+        self.portions = np.array(PORTIONS)
+    
+    def allowed(self, excluded: str) -> 'np.ndarray':
+        """Foods containing none of the excluded tags"""
+        mask = [tag in excluded for tag in CONTENTS]
+        return ~self.contents[:, mask].any(axis=1)
+
+
+@lru_cache(maxsize=1)
+def food_table() -> FoodTable:
+    return FoodTable()
+
+
+def diet_exclusions(diet_type: Optional[str]) -> str:
+    """Content tags excluded by Assessment.diet_type (unknown types exclude everything but plants)"""
+    if not diet_type:
+        return DEFAULT_EXCLUSIONS
+    return DIET_EXCLUSIONS.get(diet_type.strip().lower().replace(" ", "-"), DEFAULT_EXCLUSIONS)
+
+
+def calculate_targets(age: int, height_cm: float, weight_kg: float, exercise_days: int,
+                      bmi_category: str, phenotype: str, diet_type: Optional[str]) -> MealTargets:
+    """
+    Daily targets from Mifflin-St Jeor energy needs, BMI and phenotype
+    Values are rounded (calories to 100, protein to 10 g) so similar users share a plan
+    """
+    bmr = 10 * weight_kg + 6.25 * height_cm - 5 * age - 161
+    calories = bmr * min(1.2 + 0.05 * (exercise_days or 0), 1.55)
+    if bmi_category in ("Overweight", "Obese"):
+        calories *= 0.85  # Moderate deficit
+    elif bmi_category == "Underweight":
+        calories *= 1.1
+    calories = int(round(min(max(calories, 1400), 2800) / 100) * 100)
+    
+    insulin_resistant = phenotype.casefold().startswith("insulin")
+    protein = weight_kg * (1.2 if insulin_resistant else 1.0)
+    protein = int(round(min(max(protein, 50), 130) / 10) * 10)
+    
+    return MealTargets(
+        calories=calories,
+        protein_g=protein,
+        fiber_g=35 if insulin_resistant else 30,
+        max_glycemic_load=80 if insulin_resistant else 100,
+        excluded=diet_exclusions(diet_type)
+    )
+
+
+def choose_meal(table: FoodTable, slot: int, share: float, targets: MealTargets,
+                remaining: 'np.ndarray', recent: 'np.ndarray') -> Tuple[int, float]:
+    """
+    Pick (food, portion) for one slot by scoring every allowed food at every
+    portion size at once: stay near the slot's calorie share, cover protein and
+    fiber, stay under the remaining glycemic-load budget, and avoid repeats
+    """
+    import numpy as np
+    allowed = table.slot_mask[:, slot] & table.allowed(targets.excluded)
+    
+    # (foods x portions x nutrients)
+    options = table.nutrients[:, None, :] * table.portions[None, :, None]
+    kcal, protein, fiber, glycemic_load = np.moveaxis(options, 2, 0)
+    
+    kcal_goal = max(remaining[0] * share, 50.0)
+    cost = ((kcal - kcal_goal) / (0.15 * kcal_goal)) ** 2
+    cost -= 2.0 * np.minimum(protein, max(remaining[1], 0) * share) / max(targets.protein_g * share, 1)
+    cost -= 1.5 * np.minimum(fiber, max(remaining[2], 0) * share) / max(targets.fiber_g * share, 1)
+    cost += 4.0 * np.maximum(glycemic_load - remaining[3] * share, 0) / max(targets.max_glycemic_load * share, 1)
+    cost += 3.0 * recent[:, None]
+    cost[~allowed] = np.inf
+    
+    food, portion = np.unravel_index(np.argmin(cost), cost.shape)
+    return int(food), float(table.portions[portion])
+
+
+@lru_cache(maxsize=512)
+def build_weekly_plan(targets: MealTargets) -> Tuple[Dict[str, List[str]], Dict[str, float]]:
+    """
+    Greedy 7-day plan for a target bucket, memoized per bucket
+    Each slot takes its share of whatever the day still needs, so later
+    meals correct for earlier ones. Returns (plan, average daily totals).
+    """
+    import numpy as np
+    table = food_table()
+    goals = np.array([targets.calories, targets.protein_g, targets.fiber_g, targets.max_glycemic_load], dtype=float)
+    
+    last_served = np.full(len(FOODS), -10)  # Day each food was last used
+    plan = {}
+    week_totals = np.zeros(4)
+    
+    for day, day_name in enumerate(DAYS):
+        remaining = goals.copy()
+        totals = np.zeros(4)
+        meals = []
+        served_today = np.zeros(len(FOODS), dtype=bool)
+        
+        for slot, slot_name in enumerate(SLOTS):
+            # Share of what is left, so the last slot absorbs the error
+            share = SLOT_SHARES[slot] / sum(SLOT_SHARES[slot:])
+            recent = (day - last_served <= 2).astype(float) + served_today
+            food, portion = choose_meal(table, slot, share, targets, remaining, recent)
+            
+            amount = table.nutrients[food] * portion
+            remaining -= amount
+            totals += amount
+            last_served[food] = day
+            served_today[food] = True
+            
+            servings = "1 serving" if portion == 1 else f"{portion:g} servings"
+            meals.append(f"{slot_name}: {table.names[food]} ({servings})")
+        
+        meals.append(
+            f"Daily totals: {totals[0]:.0f} kcal, {totals[1]:.0f} g protein, "
+            f"{totals[2]:.0f} g fiber, glycemic load {totals[3]:.0f}"
+        )
+        plan[day_name] = meals
+        week_totals += totals
+    
+    average = week_totals / len(DAYS)
+    return plan, {
+        "calories": round(float(average[0])),
+        "protein_g": round(float(average[1])),
+        "fiber_g": round(float(average[2])),
+        "glycemic_load": round(float(average[3]))
+    }
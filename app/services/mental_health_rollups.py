@@ -0,0 +1,153 @@
+"""
+Mental Health Rollup Service
+Maintains daily and weekly mental health aggregates and serves time series
+over arbitrary ranges without reading raw logs
+"""
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import MentalHealthLog, MentalHealthDailyRollup, MentalHealthWeeklyRollup
+from datetime import date, timedelta
+
+
+class MentalHealthRollupService:
+    """Service for mental health rollups and range history"""
+    
+    ROLLUPS = {
+        "daily": MentalHealthDailyRollup,
+        "weekly": MentalHealthWeeklyRollup
+    }
+    
+    # Finest resolution is used as long as the series stays under this many points
+    MAX_POINTS = 120
+    
+    @staticmethod
+    def period_start(day: date, resolution: str) -> date:
+        """Start of the rollup bucket containing `day` (weeks start on Monday)"""
+        if resolution == "weekly":
+            return day - timedelta(days=day.weekday())
+        return day
+    
+    @classmethod
+    def choose_resolution(cls, from_date: date, to_date: date) -> str:
+        """Cheapest rollup level that still gives a useful number of points"""
+        if (to_date - from_date).days + 1 <= cls.MAX_POINTS:
+            return "daily"
+        return "weekly"
+    
+    @staticmethod
+    def new_rollup(model, user_id: str, period_start: date):
+        """Empty rollup row"""
+        return model(
+            user_id=user_id,
+            period_start=period_start,
+            log_count=0,
+            stress_sum=0.0,
+            sleep_sum=0.0,
+            energy_sum=0.0,
+            mood_counts={}
+        )
+    
+    @staticmethod
+    def add_log(rollup, log: MentalHealthLog) -> None:
+        """Fold one log into a rollup row"""
+        rollup.log_count += 1
+        rollup.stress_sum += log.stress_level
+        rollup.sleep_sum += log.sleep_hours
+        rollup.energy_sum += log.energy_level
+        
+        rollup.stress_min = log.stress_level if rollup.stress_min is None else min(rollup.stress_min, log.stress_level)
+        rollup.stress_max = log.stress_level if rollup.stress_max is None else max(rollup.stress_max, log.stress_level)
+        rollup.sleep_min = log.sleep_hours if rollup.sleep_min is None else min(rollup.sleep_min, log.sleep_hours)
+        rollup.sleep_max = log.sleep_hours if rollup.sleep_max is None else max(rollup.sleep_max, log.sleep_hours)
+        rollup.energy_min = log.energy_level if rollup.energy_min is None else min(rollup.energy_min, log.energy_level)
+        rollup.energy_max = log.energy_level if rollup.energy_max is None else max(rollup.energy_max, log.energy_level)
+        
+        # Reassign so the JSON column is marked dirty
+        mood_counts = dict(rollup.mood_counts or {})
+        mood_counts[log.mood_type] = mood_counts.get(log.mood_type, 0) + 1
+        rollup.mood_counts = mood_counts
+    
+    @classmethod
+    async def update_rollups(cls, db: AsyncSession, log: MentalHealthLog) -> None:
+        """
+        Fold a new log into its daily and weekly rollups
+        The log's created_at must be set; the caller commits
+        """
+        day = log.created_at.date()
+        for resolution, model in cls.ROLLUPS.items():
+            start = cls.period_start(day, resolution)
+            rollup = await db.scalar(
+                select(model).where(
+                    model.user_id == log.user_id,
+                    model.period_start == start
+                ).with_for_update()
+            )
+            if rollup is None:
+                rollup = cls.new_rollup(model, log.user_id, start)
+                db.add(rollup)
+            cls.add_log(rollup, log)
+    
+    @classmethod
+    def accumulate(cls, user_id: str, logs: Iterable[MentalHealthLog]) -> List:
+        """Build all daily and weekly rollups for one user's logs (used by the rebuild script)"""
+        rollups = {}
+        for log in logs:
+            day = log.created_at.date()
+            for resolution, model in cls.ROLLUPS.items():
+                key = (resolution, cls.period_start(day, resolution))
+                if key not in rollups:
+                    rollups[key] = cls.new_rollup(model, user_id, key[1])
+                cls.add_log(rollups[key], log)
+        return list(rollups.values())
+    
+    @staticmethod
+    def rollup_to_point(rollup) -> Dict:
+        """Convert a rollup row to a series point"""
+        count = rollup.log_count
+        return {
+            "period_start": rollup.period_start,
+            "log_count": count,
+            "average_stress": round(rollup.stress_sum / count, 1),
+            "min_stress": rollup.stress_min,
+            "max_stress": rollup.stress_max,
+            "average_sleep": round(rollup.sleep_sum / count, 1),
+            "min_sleep": rollup.sleep_min,
+            "max_sleep": rollup.sleep_max,
+            "average_energy": round(rollup.energy_sum / count, 1),
+            "min_energy": rollup.energy_min,
+            "max_energy": rollup.energy_max,
+            "mood_counts": rollup.mood_counts or {}
+        }
+    
+    @classmethod
+    async def get_series(cls, db: AsyncSession, user_id: str, from_date: date, to_date: date,
+                         resolution: Optional[str] = None) -> Dict:
+        """
+        Mental health time series between two dates (inclusive)
+        Reads one rollup row per bucket; `resolution` of None or "auto"
+        picks the level from the span
+        """
+        if from_date > to_date:
+            raise ValueError("'from' must be on or before 'to'")
+        if resolution in (None, "auto"):
+            resolution = cls.choose_resolution(from_date, to_date)
+        if resolution not in cls.ROLLUPS:
+            raise ValueError(f"Unknown resolution '{resolution}'. Choose from: auto, {', '.join(cls.ROLLUPS)}")
+        
+        model = cls.ROLLUPS[resolution]
+        rollups = (await db.scalars(
+            select(model).where(
+                model.user_id == user_id,
+                model.period_start >= cls.period_start(from_date, resolution),
+                model.period_start <= to_date
+            ).order_by(model.period_start)
+        )).all()
+        
+        return {
+            "user_id": user_id,
+            "resolution": resolution,
+            "from_date": from_date,
+            "to_date": to_date,
+            "points": [cls.rollup_to_point(rollup) for rollup in rollups if rollup.log_count]
+        }
@@ -2,10 +2,13 @@
 Mental Health Tracker Service
 Manages mental health logging and insights generation
 """
-from typing import List, Dict
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.models import MentalHealthLog, PeriodLog
+from typing import List, Dict, Optional, Tuple
+from sqlalchemy import select, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import MentalHealthLog
+from app.services.health_score_engine import HealthScoreEngine
+from app.services.mental_health_rollups import MentalHealthRollupService
+from app.services.cycle_phase import CyclePhaseEngine
 from datetime import datetime, timedelta
 
 
@@ -13,7 +16,7 @@ class MentalHealthTrackerService:
     """Service for mental health tracking and insights"""
     
     @staticmethod
-    def add_mental_health_log(db: Session, user_id: str, stress_level: int,
+    async def add_mental_health_log(db: AsyncSession, user_id: str, stress_level: int,
                               mood_type: str, sleep_hours: float, 
                               energy_level: int) -> MentalHealthLog:
         """Add a new mental health log entry"""
@@ -22,28 +25,100 @@ class MentalHealthTrackerService:
             stress_level=stress_level,
             mood_type=mood_type,
             sleep_hours=sleep_hours,
-            energy_level=energy_level
+            energy_level=energy_level,
+            created_at=datetime.now()  # Set here so the rollup bucket is known before insert
         )
+        await MentalHealthRollupService.update_rollups(db, log)
         db.add(log)
-        db.commit()
-        db.refresh(log)
+        await db.flush()
+        await HealthScoreEngine.refresh_snapshot(db, user_id, changed="mental")
+        await db.commit()
+        await db.refresh(log)
         return log
     
     @staticmethod
-    def get_mental_health_history(db: Session, user_id: str, days: int = 30) -> List[MentalHealthLog]:
+    async def get_mental_health_history(db: AsyncSession, user_id: str, days: int = 30) -> List[MentalHealthLog]:
         """Get mental health history for a user"""
         cutoff_date = datetime.now() - timedelta(days=days)
-        return db.query(MentalHealthLog).filter(
+        return (await db.scalars(
+            select(MentalHealthLog).where(
+                MentalHealthLog.user_id == user_id,
+                MentalHealthLog.created_at >= cutoff_date
+            ).order_by(MentalHealthLog.created_at.desc())
+        )).all()
+    
+    @staticmethod
+    async def aggregate_window(db: AsyncSession, user_id: str, days: int = 30) -> Dict:
+        """
+        Count, averages and stress half-sums for the window as one aggregate row
+        The halves are the oldest and the newest floor(n/2) logs, which is
+        enough to rebuild either trend split without loading the logs
+        """
+        cutoff_date = datetime.now() - timedelta(days=days)
+        ranked = select(
+            MentalHealthLog.stress_level,
+            MentalHealthLog.sleep_hours,
+            MentalHealthLog.energy_level,
+            func.row_number().over(
+                order_by=(MentalHealthLog.created_at, MentalHealthLog.id)
+            ).label("position"),
+            func.count().over().label("total")
+        ).where(
             MentalHealthLog.user_id == user_id,
             MentalHealthLog.created_at >= cutoff_date
-        ).order_by(MentalHealthLog.created_at.desc()).all()
+        ).subquery()
+        half = ranked.c.total // 2
+        
+        row = (await db.execute(select(
+            func.count(),
+            func.avg(ranked.c.stress_level),
+            func.avg(ranked.c.sleep_hours),
+            func.avg(ranked.c.energy_level),
+            func.sum(ranked.c.stress_level),
+            func.sum(case((ranked.c.position <= half, ranked.c.stress_level), else_=0)),
+            func.sum(case((ranked.c.position > ranked.c.total - half, ranked.c.stress_level), else_=0))
+        ))).one()
+        
+        count, avg_stress, avg_sleep, avg_energy, stress_sum, older_sum, newer_sum = row
+        if not count:
+            return {"count": 0, "average_stress": None, "average_sleep": None, "average_energy": None}
+        
+        return {
+            "count": count,
+            "average_stress": float(avg_stress),
+            "average_sleep": float(avg_sleep),
+            "average_energy": float(avg_energy),
+            "stress_sum": float(stress_sum),
+            "older_half_stress_sum": float(older_sum),
+            "newer_half_stress_sum": float(newer_sum)
+        }
     
     @staticmethod
-    def calculate_averages(db: Session, user_id: str, days: int = 30) -> Dict:
-        """Calculate average mental health metrics"""
-        logs = MentalHealthTrackerService.get_mental_health_history(db, user_id, days)
-        
-        if not logs:
+    def stress_halves(aggregate: Dict, newest_first: bool) -> Tuple[float, float]:
+        """
+        Average stress of (first half, second half) of the window
+        With newest_first the first half is the newest floor(n/2) logs;
+        otherwise it is the oldest floor(n/2), matching a chronological split
+        """
+        count = aggregate["count"]
+        half = count // 2
+        half_sum = aggregate["newer_half_stress_sum" if newest_first else "older_half_stress_sum"]
+        return half_sum / half, (aggregate["stress_sum"] - half_sum) / (count - half)
+    
+    @staticmethod
+    def classify_stress_change(diff: float) -> str:
+        """Label the change between recent and older average stress"""
+        if diff > 1.5:
+            return "increasing"
+        elif diff < -1.5:
+            return "decreasing"
+        else:
+            return "stable"
+    
+    @staticmethod
+    def averages_from_aggregate(aggregate: Dict) -> Dict:
+        """Rounded averages from an `aggregate_window` row"""
+        if not aggregate["count"]:
             return {
                 "average_stress": None,
                 "average_sleep": None,
@@ -51,65 +126,56 @@ class MentalHealthTrackerService:
             }
         
         return {
-            "average_stress": round(sum(log.stress_level for log in logs) / len(logs), 1),
-            "average_sleep": round(sum(log.sleep_hours for log in logs) / len(logs), 1),
-            "average_energy": round(sum(log.energy_level for log in logs) / len(logs), 1)
+            "average_stress": round(aggregate["average_stress"], 1),
+            "average_sleep": round(aggregate["average_sleep"], 1),
+            "average_energy": round(aggregate["average_energy"], 1)
         }
     
     @staticmethod
-    def analyze_stress_trend(db: Session, user_id: str) -> str:
-        """Analyze stress trend over time"""
-        # Get last 30 days
-        recent_logs = MentalHealthTrackerService.get_mental_health_history(db, user_id, 30)
-        
-        if len(recent_logs) < 3:
+    def stress_trend_from_aggregate(aggregate: Dict) -> str:
+        """Compare the newest half of the window's logs with the older half"""
+        if aggregate["count"] < 3:
             return "stable"
         
-        # Split into two halves
-        mid_point = len(recent_logs) // 2
-        recent_half = recent_logs[:mid_point]
-        older_half = recent_logs[mid_point:]
-        
-        recent_avg = sum(log.stress_level for log in recent_half) / len(recent_half)
-        older_avg = sum(log.stress_level for log in older_half) / len(older_half)
-        
-        diff = recent_avg - older_avg
-        
-        if diff > 1.5:
-            return "increasing"
-        elif diff < -1.5:
-            return "decreasing"
-        else:
-            return "stable"
+        recent_avg, older_avg = MentalHealthTrackerService.stress_halves(aggregate, newest_first=True)
+        return MentalHealthTrackerService.classify_stress_change(recent_avg - older_avg)
     
     @staticmethod
-    def analyze_sleep_quality(db: Session, user_id: str) -> str:
-        """Analyze sleep quality"""
-        averages = MentalHealthTrackerService.calculate_averages(db, user_id)
-        
-        if averages["average_sleep"] is None:
+    def classify_sleep(average_sleep: Optional[float]) -> str:
+        """Classify an average nightly sleep duration"""
+        if average_sleep is None:
             return "unknown"
         
-        avg_sleep = averages["average_sleep"]
-        
-        if 7 <= avg_sleep <= 9:
+        if 7 <= average_sleep <= 9:
             return "excellent"
-        elif 6 <= avg_sleep < 7 or 9 < avg_sleep <= 10:
+        elif 6 <= average_sleep < 7 or 9 < average_sleep <= 10:
             return "good"
-        elif 5 <= avg_sleep < 6 or 10 < avg_sleep <= 11:
+        elif 5 <= average_sleep < 6 or 10 < average_sleep <= 11:
             return "fair"
         else:
             return "poor"
     
     @staticmethod
-    def generate_insights(db: Session, user_id: str) -> Dict:
-        """Generate personalized mental health insights"""
-        logs = MentalHealthTrackerService.get_mental_health_history(db, user_id, 30)
-        
-        insights = []
-        recommendations = []
-        
-        if not logs:
+    async def calculate_averages(db: AsyncSession, user_id: str, days: int = 30) -> Dict:
+        """Calculate average mental health metrics (aggregated in SQL)"""
+        aggregate = await MentalHealthTrackerService.aggregate_window(db, user_id, days)
+        return MentalHealthTrackerService.averages_from_aggregate(aggregate)
+    
+    @staticmethod
+    async def analyze_stress_trend(db: AsyncSession, user_id: str) -> str:
+        """Analyze stress trend over the last 30 days (aggregated in SQL)"""
+        aggregate = await MentalHealthTrackerService.aggregate_window(db, user_id, 30)
+        return MentalHealthTrackerService.stress_trend_from_aggregate(aggregate)
+    
+    @staticmethod
+    async def generate_insights(db: AsyncSession, user_id: str) -> Dict:
+        """
+        Generate personalized mental health insights
+        Every metric comes from one aggregate row over the 30-day window
+        """
+        aggregate = await MentalHealthTrackerService.aggregate_window(db, user_id, 30)
+        
+        if not aggregate["count"]:
             return {
                 "insights": ["Not enough data. Start logging your mental health to get insights."],
                 "stress_trend": "unknown",
@@ -117,10 +183,21 @@ class MentalHealthTrackerService:
                 "recommendations": ["Log your stress, mood, sleep, and energy levels daily."]
             }
         
+        # Cycle phase averages over the whole history (cached until a new log)
+        phase_profile = await CyclePhaseEngine.get_phase_profile(db, user_id)
+        
+        return MentalHealthTrackerService.build_insights(aggregate, phase_profile)
+    
+    @staticmethod
+    def build_insights(aggregate: Dict, phase_profile: Optional[Dict] = None) -> Dict:
+        """Derive insights from an `aggregate_window` row (no queries)"""
+        insights = []
+        recommendations = []
+        
         # Calculate metrics
-        averages = MentalHealthTrackerService.calculate_averages(db, user_id)
-        stress_trend = MentalHealthTrackerService.analyze_stress_trend(db, user_id)
-        sleep_quality = MentalHealthTrackerService.analyze_sleep_quality(db, user_id)
+        averages = MentalHealthTrackerService.averages_from_aggregate(aggregate)
+        stress_trend = MentalHealthTrackerService.stress_trend_from_aggregate(aggregate)
+        sleep_quality = MentalHealthTrackerService.classify_sleep(averages["average_sleep"])
         
         # Stress insights
         if averages["average_stress"] and averages["average_stress"] > 7:
@@ -149,28 +226,10 @@ class MentalHealthTrackerService:
             insights.append("Great progress! Your stress levels are decreasing.")
         
         # Check correlation with period cycle
-        period_logs = db.query(PeriodLog).filter(
-            PeriodLog.user_id == user_id
-        ).order_by(PeriodLog.start_date.desc()).limit(3).all()
-        
-        if period_logs and len(logs) >= 7:
-            # Check if high stress occurs before periods
-            high_stress_dates = [log.created_at.date() for log in logs if log.stress_level >= 7]
-            
-            for period in period_logs:
-                # Check 5 days before period
-                period_window_start = period.start_date - timedelta(days=5)
-                period_window_end = period.start_date
-                
-                stress_before_period = any(
-                    period_window_start <= stress_date <= period_window_end 
-                    for stress_date in high_stress_dates
-                )
-                
-                if stress_before_period:
-                    insights.append("High stress detected before irregular cycles. This is common with PCOS.")
-                    recommendations.append("Track your cycle and manage stress during pre-menstrual phase.")
-                    break
+        if phase_profile and CyclePhaseEngine.premenstrual_stress_elevated(phase_profile):
+            premenstrual_stress = phase_profile["phases"]["pre-menstrual"]["average_stress"]
+            insights.append(f"Your stress averages {premenstrual_stress}/10 in the days before your period. This is common with PCOS.")
+            recommendations.append("Track your cycle and manage stress during pre-menstrual phase.")
         
         if not insights:
             insights.append("Your mental health metrics are within normal range. Keep it up!")
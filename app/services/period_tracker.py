@@ -3,17 +3,23 @@ Period Tracker Service
 Manages period logging, cycle analysis, and predictions
 """
 from typing import List, Optional, Dict
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.models import PeriodLog
-from datetime import datetime, date, timedelta
+from sqlalchemy import select, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import dialect_insert
+from app.models import PeriodLog, UserCycleStats
+from app.services.health_score_engine import HealthScoreEngine
+from app.services.cycle_forecaster import CycleForecaster
+from datetime import datetime, date
+import os
+
+DEFAULT_FORECAST_STRATEGY = os.getenv("PERIOD_FORECAST_STRATEGY", "recency")
 
 
 class PeriodTrackerService:
     """Service for period tracking and predictions"""
     
     @staticmethod
-    def add_period_log(db: Session, user_id: str, start_date: date, 
+    async def add_period_log(db: AsyncSession, user_id: str, start_date: date, 
                        end_date: Optional[date], flow_type: str, 
                        pain_level: int, mood: str) -> PeriodLog:
         """Add a new period log entry"""
@@ -25,64 +31,136 @@ class PeriodTrackerService:
             pain_level=pain_level,
             mood=mood
         )
+        # Update running cycle stats before the new row is visible to the query
+        await PeriodTrackerService.update_cycle_stats(db, user_id, start_date)
         db.add(log)
-        db.commit()
-        db.refresh(log)
+        await db.flush()
+        await HealthScoreEngine.refresh_snapshot(db, user_id, changed="period")
+        await db.commit()
+        await db.refresh(log)
         return log
     
     @staticmethod
-    def get_period_history(db: Session, user_id: str, limit: int = 12) -> List[PeriodLog]:
+    async def get_period_history(db: AsyncSession, user_id: str, limit: int = 12) -> List[PeriodLog]:
         """Get period history for a user"""
-        return db.query(PeriodLog).filter(
-            PeriodLog.user_id == user_id
-        ).order_by(PeriodLog.start_date.desc()).limit(limit).all()
+        return (await db.scalars(
+            select(PeriodLog).where(
+                PeriodLog.user_id == user_id
+            ).order_by(PeriodLog.start_date.desc()).limit(limit)
+        )).all()
     
     @staticmethod
-    def calculate_average_cycle_length(db: Session, user_id: str) -> Optional[float]:
-        """Calculate average cycle length from historical data"""
-        logs = db.query(PeriodLog).filter(
-            PeriodLog.user_id == user_id
-        ).order_by(PeriodLog.start_date).all()
+    async def get_cycle_statistics(db: AsyncSession, user_id: str, limit: int = 12) -> "CycleStatistics":
+        """
+        Cycle statistics from the stored running stats row (O(1)) plus the
+        last `limit` logs; users without a stats row fall back to a full scan
+        """
+        stats = await db.get(UserCycleStats, user_id)
         
-        if len(logs) < 2:
-            return None
+        if stats is None:
+            logs = (await db.scalars(
+                select(PeriodLog).where(
+                    PeriodLog.user_id == user_id
+                ).order_by(PeriodLog.start_date.desc())
+            )).all()
+            return CycleStatistics(
+                CycleStatistics.accumulate(user_id, [log.start_date for log in reversed(logs)]),
+                logs[:limit]
+            )
         
-        cycle_lengths = []
-        for i in range(len(logs) - 1):
-            days_diff = (logs[i+1].start_date - logs[i].start_date).days
-            if days_diff > 0:  # Valid cycle
-                cycle_lengths.append(days_diff)
+        recent_logs = []
+        if limit > 0:
+            recent_logs = (await db.scalars(
+                select(PeriodLog).where(
+                    PeriodLog.user_id == user_id
+                ).order_by(PeriodLog.start_date.desc()).limit(limit)
+            )).all()
+        return CycleStatistics(stats, recent_logs)
+    
+    @staticmethod
+    async def rebuild_cycle_stats(db: AsyncSession, user_id: str) -> UserCycleStats:
+        """
+        Create a user's running stats from all of their logs and return the row locked
+        If a concurrent request creates the row first, its version is kept
+        """
+        start_dates = (await db.scalars(
+            select(PeriodLog.start_date).where(
+                PeriodLog.user_id == user_id
+            ).order_by(PeriodLog.start_date)
+        )).all()
+        stats = CycleStatistics.accumulate(user_id, start_dates)
+        await db.execute(dialect_insert(db)(UserCycleStats).values(
+            user_id=user_id,
+            log_count=stats.log_count,
+            last_start_date=stats.last_start_date,
+            cycle_count=stats.cycle_count,
+            cycle_mean=stats.cycle_mean,
+            cycle_m2=stats.cycle_m2
+        ).on_conflict_do_nothing(index_elements=[UserCycleStats.user_id]))
+        return await db.scalar(
+            select(UserCycleStats).where(
+                UserCycleStats.user_id == user_id
+            ).with_for_update().execution_options(populate_existing=True)
+        )
+    
+    @staticmethod
+    async def update_cycle_stats(db: AsyncSession, user_id: str, start_date: date) -> UserCycleStats:
+        """
+        Fold a new period start into the user's running stats (Welford)
+        Call before the new log is added to the session. Back-dated starts
+        split an existing cycle: its length is removed and the two new
+        gaps are added.
+        """
+        stats = await db.scalar(
+            select(UserCycleStats).where(
+                UserCycleStats.user_id == user_id
+            ).with_for_update()
+        )
+        if stats is None:
+            # Nothing to lock yet: create the row race-free, then lock it
+            stats = await PeriodTrackerService.rebuild_cycle_stats(db, user_id)
         
-        if not cycle_lengths:
-            return None
+        if stats.log_count == 0 or stats.last_start_date is None:
+            stats.last_start_date = start_date
+        elif start_date > stats.last_start_date:
+            CycleStatistics.add_cycle(stats, (start_date - stats.last_start_date).days)
+            stats.last_start_date = start_date
+        elif start_date < stats.last_start_date:
+            # Out-of-order insert: find the neighbouring start dates
+            previous_start, next_start, same_day = (await db.execute(
+                select(
+                    func.max(case((PeriodLog.start_date < start_date, PeriodLog.start_date))),
+                    func.min(case((PeriodLog.start_date > start_date, PeriodLog.start_date))),
+                    func.count(case((PeriodLog.start_date == start_date, 1)))
+                ).where(PeriodLog.user_id == user_id)
+            )).one()
+            
+            if not same_day:
+                if previous_start is not None:
+                    CycleStatistics.remove_cycle(stats, (next_start - previous_start).days)
+                    CycleStatistics.add_cycle(stats, (start_date - previous_start).days)
+                CycleStatistics.add_cycle(stats, (next_start - start_date).days)
+        # Same start date as an existing log adds no new cycle
         
-        return sum(cycle_lengths) / len(cycle_lengths)
+        stats.log_count += 1
+        return stats
+    
+    @staticmethod
+    async def calculate_average_cycle_length(db: AsyncSession, user_id: str) -> Optional[float]:
+        """Calculate average cycle length from historical data"""
+        stats = await PeriodTrackerService.get_cycle_statistics(db, user_id, limit=0)
+        return stats.average_cycle_length
     
     @staticmethod
-    def calculate_cycle_stability_score(db: Session, user_id: str) -> Optional[float]:
+    async def calculate_cycle_stability_score(db: AsyncSession, user_id: str) -> Optional[float]:
         """Calculate cycle stability score (0-100)"""
-        logs = db.query(PeriodLog).filter(
-            PeriodLog.user_id == user_id
-        ).order_by(PeriodLog.start_date).all()
-        
-        if len(logs) < 3:
-            return None
-        
-        cycle_lengths = []
-        for i in range(len(logs) - 1):
-            days_diff = (logs[i+1].start_date - logs[i].start_date).days
-            if days_diff > 0:
-                cycle_lengths.append(days_diff)
-        
-        if len(cycle_lengths) < 2:
-            return None
-        
-        # Calculate standard deviation
-        avg_length = sum(cycle_lengths) / len(cycle_lengths)
-        variance = sum((x - avg_length) ** 2 for x in cycle_lengths) / len(cycle_lengths)
-        std_dev = variance ** 0.5
-        
-        # Convert to score (lower std_dev = higher score)
+        stats = await PeriodTrackerService.get_cycle_statistics(db, user_id, limit=0)
+        return stats.stability_score
+    
+    @staticmethod
+    def stability_from_std_dev(std_dev: float) -> float:
+        """Convert cycle length standard deviation to a stability score (0-100)"""
+        # Lower std_dev = higher score
         if std_dev <= 2:
             return 100.0
         elif std_dev <= 5:
@@ -95,13 +173,13 @@ class PeriodTrackerService:
             return max(0, 40 - (std_dev - 10) * 2)
     
     @staticmethod
-    def predict_next_period(db: Session, user_id: str) -> Dict:
-        """Predict next period date based on historical data"""
-        logs = db.query(PeriodLog).filter(
-            PeriodLog.user_id == user_id
-        ).order_by(PeriodLog.start_date.desc()).all()
+    async def predict_next_period(db: AsyncSession, user_id: str, horizon: int = 1,
+                                  strategy: Optional[str] = None) -> Dict:
+        """Predict upcoming period dates with day-range intervals"""
+        forecaster = CycleForecaster(strategy or DEFAULT_FORECAST_STRATEGY)
+        stats = await PeriodTrackerService.get_cycle_statistics(db, user_id, limit=0)
         
-        if not logs:
+        if stats.log_count == 0:
             return {
                 "next_period_date": None,
                 "confidence": "No Data",
@@ -109,58 +187,109 @@ class PeriodTrackerService:
                 "message": "Please log at least one period to get predictions."
             }
         
-        if len(logs) < 2:
-            # Use typical cycle length (28 days)
-            last_period = logs[0].start_date
-            predicted_date = last_period + timedelta(days=28)
-            return {
-                "next_period_date": predicted_date,
-                "confidence": "Low",
-                "average_cycle_length": 28.0,
-                "message": "Prediction based on typical 28-day cycle. Log more periods for better accuracy."
-            }
-        
-        # Calculate average cycle length
-        cycle_lengths = []
-        for i in range(len(logs) - 1):
-            days_diff = (logs[i].start_date - logs[i+1].start_date).days
-            if days_diff > 0:
-                cycle_lengths.append(days_diff)
-        
-        if not cycle_lengths:
-            last_period = logs[0].start_date
-            predicted_date = last_period + timedelta(days=28)
-            return {
-                "next_period_date": predicted_date,
-                "confidence": "Low",
-                "average_cycle_length": 28.0,
-                "message": "Using default 28-day cycle."
-            }
-        
-        avg_cycle = sum(cycle_lengths) / len(cycle_lengths)
+        # Only the most recent cycles feed the forecast
+        start_dates = (await db.scalars(
+            select(PeriodLog.start_date).where(
+                PeriodLog.user_id == user_id
+            ).order_by(PeriodLog.start_date.desc()).limit(CycleForecaster.MAX_HISTORY_CYCLES + 1)
+        )).all()
+        forecasts = forecaster.forecast(list(reversed(start_dates)), horizon)
+        next_forecast = forecasts[0]
+        spread = next_forecast["spread_days"]
         
-        # Calculate standard deviation for confidence
-        variance = sum((x - avg_cycle) ** 2 for x in cycle_lengths) / len(cycle_lengths)
-        std_dev = variance ** 0.5
-        
-        # Determine confidence
-        if std_dev <= 3:
+        if stats.log_count < 2:
+            confidence = "Low"
+            message = "Prediction based on typical 28-day cycle. Log more periods for better accuracy."
+        elif stats.cycle_count == 0:
+            confidence = "Low"
+            message = "Using default 28-day cycle."
+        elif spread <= 3:
             confidence = "High"
             message = "Your cycles are very regular. This prediction is highly accurate."
-        elif std_dev <= 7:
+        elif spread <= 7:
             confidence = "Medium"
             message = "Your cycles show moderate regularity. Prediction may vary by a few days."
         else:
             confidence = "Low"
             message = "Your cycles are irregular. This is an approximate prediction."
         
-        # Predict next period
-        last_period = logs[0].start_date
-        predicted_date = last_period + timedelta(days=int(avg_cycle))
+        if stats.average_cycle_length is not None:
+            average_cycle_length = round(stats.average_cycle_length, 1)
+        else:
+            average_cycle_length = CycleForecaster.DEFAULT_CYCLE_DAYS
         
         return {
-            "next_period_date": predicted_date,
+            "next_period_date": next_forecast["predicted_date"],
+            "earliest_date": next_forecast["earliest"],
+            "latest_date": next_forecast["latest"],
             "confidence": confidence,
-            "average_cycle_length": round(avg_cycle, 1),
-            "message": message
+            "average_cycle_length": average_cycle_length,
+            "message": message,
+            "strategy": forecaster.strategy_name,
+            "upcoming": forecasts
         }
+
+
+class CycleStatistics:
+    """
+    Read-side view of a user's cycle statistics
+    Backed by a UserCycleStats row holding a running mean and M2 (Welford)
+    """
+    
+    def __init__(self, stats: UserCycleStats, recent_logs: List[PeriodLog]):
+        self.log_count = stats.log_count
+        self.cycle_count = stats.cycle_count
+        self.last_start_date = stats.last_start_date
+        self.recent_logs = list(recent_logs)
+        
+        if self.log_count >= 2 and self.cycle_count > 0:
+            self.average_cycle_length = stats.cycle_mean
+            self.std_dev = (max(stats.cycle_m2, 0.0) / self.cycle_count) ** 0.5
+        else:
+            self.average_cycle_length = None
+            self.std_dev = None
+        
+        if self.log_count >= 3 and self.cycle_count >= 2:
+            self.stability_score = PeriodTrackerService.stability_from_std_dev(self.std_dev)
+        else:
+            self.stability_score = None
+    
+    @staticmethod
+    def add_cycle(stats: UserCycleStats, length: int) -> None:
+        """Add one cycle length to the running mean/M2"""
+        if length <= 0:  # Not a valid cycle
+            return
+        stats.cycle_count += 1
+        delta = length - stats.cycle_mean
+        stats.cycle_mean += delta / stats.cycle_count
+        stats.cycle_m2 += delta * (length - stats.cycle_mean)
+    
+    @staticmethod
+    def remove_cycle(stats: UserCycleStats, length: int) -> None:
+        """Remove one previously added cycle length from the running mean/M2"""
+        if length <= 0 or stats.cycle_count == 0:
+            return
+        if stats.cycle_count == 1:
+            stats.cycle_count = 0
+            stats.cycle_mean = 0.0
+            stats.cycle_m2 = 0.0
+            return
+        stats.cycle_count -= 1
+        delta = length - stats.cycle_mean
+        stats.cycle_mean -= delta / stats.cycle_count
+        stats.cycle_m2 -= delta * (length - stats.cycle_mean)
+    
+    @staticmethod
+    def accumulate(user_id: str, start_dates: List[date]) -> UserCycleStats:
+        """Build running stats in one pass over start dates in ascending order"""
+        stats = UserCycleStats(
+            user_id=user_id,
+            log_count=len(start_dates),
+            last_start_date=start_dates[-1] if start_dates else None,
+            cycle_count=0,
+            cycle_mean=0.0,
+            cycle_m2=0.0
+        )
+        for older, newer in zip(start_dates, start_dates[1:]):
+            CycleStatistics.add_cycle(stats, (newer - older).days)
+        return stats
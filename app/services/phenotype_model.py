@@ -0,0 +1,231 @@
+"""
+Phenotype Clustering Model
+Trains, stores and serves the pretrained phenotype clustering artifact
+"""
+import os
+import json
+import pickle
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from app.models import Assessment
+from app.services.feature_engineering import FeatureEngineer
+
+DEFAULT_MODEL_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "artifacts", "phenotype_model"
+)
+MODEL_DIR = os.getenv("PHENOTYPE_MODEL_DIR", DEFAULT_MODEL_DIR)
+LATEST_FILE = "LATEST"
+
+
+class PhenotypeModel:
+    """
+    Pretrained phenotype clustering model
+    
+    Gaussian mixture parameters are memory-mapped, so forked workers share
+    the same pages. Soft membership is computed with NumPy directly, which
+    keeps a single prediction well under a millisecond. Outliers are samples
+    whose mixture log-likelihood falls below a cutoff fitted at training time
+    to HDBSCAN's noise rate, so serving never runs HDBSCAN itself.
+    """
+    
+    def __init__(self, path: str):
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        
+        self.version = self.manifest["version"]
+        self.feature_names = self.manifest["feature_names"]
+        self.phenotypes = self.manifest["phenotypes"]
+        
+        # Read-only memory maps, shared through the page cache
+        self.means = np.load(os.path.join(path, "means.npy"), mmap_mode='r')
+        self.precisions_cholesky = np.load(os.path.join(path, "precisions_cholesky.npy"), mmap_mode='r')
+        self.log_weights = np.log(np.load(os.path.join(path, "weights.npy")))
+        
+        # Per-component constants, computed once per worker
+        n_features = self.means.shape[1]
+        log_det = np.log(np.diagonal(self.precisions_cholesky, axis1=1, axis2=2)).sum(axis=1)
+        self.log_norm = log_det - 0.5 * n_features * np.log(2 * np.pi) + self.log_weights
+        
+        # (components x phenotypes) indicator used to pool component membership
+        component_phenotypes = self.manifest["component_phenotypes"]
+        self.component_map = np.zeros((len(component_phenotypes), len(self.phenotypes)))
+        for component, phenotype in enumerate(component_phenotypes):
+            self.component_map[component, self.phenotypes.index(phenotype)] = 1.0
+        
+        # None: every sample is assigned
+        self.noise_log_likelihood = self.manifest.get("noise_log_likelihood")
+        
+        # Artifacts from before the cutoff existed fall back to HDBSCAN itself
+        self.clusterer = None
+        hdbscan_path = os.path.join(path, "hdbscan.pkl")
+        if "noise_log_likelihood" not in self.manifest and self.manifest.get("hdbscan") and os.path.exists(hdbscan_path):
+            with open(hdbscan_path, "rb") as f:
+                self.clusterer = pickle.load(f)
+    
+    def score(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Soft phenotype membership (N x phenotypes) and mixture log-likelihood (N) in one pass"""
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        diff = X[:, None, :] - self.means[None, :, :]
+        projected = np.einsum('nkd,kde->nke', diff, self.precisions_cholesky)
+        log_prob = self.log_norm - 0.5 * (projected ** 2).sum(axis=2)
+        
+        peak = log_prob.max(axis=1, keepdims=True)
+        responsibilities = np.exp(log_prob - peak)
+        total = responsibilities.sum(axis=1, keepdims=True)
+        log_likelihood = (peak + np.log(total))[:, 0]
+        return (responsibilities / total) @ self.component_map, log_likelihood
+    
+    def membership(self, X: np.ndarray) -> np.ndarray:
+        """Soft phenotype membership (N x phenotypes) from the Gaussian mixture"""
+        return self.score(X)[0]
+    
+    def predict(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Assign phenotypes to new samples
+        Returns: (phenotype names, confidence, assigned mask)
+        Samples below the noise cutoff (HDBSCAN noise, for older artifacts) are not assigned
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        membership, log_likelihood = self.score(X)
+        dominant = np.argmax(membership, axis=1)
+        confidence = membership[np.arange(X.shape[0]), dominant]
+        
+        assigned = np.ones(X.shape[0], dtype=bool)
+        if self.noise_log_likelihood is not None:
+            assigned = log_likelihood >= self.noise_log_likelihood
+        elif self.clusterer is not None:
+            import hdbscan
+            labels, _ = hdbscan.approximate_predict(self.clusterer, X)
+            assigned = labels != -1
+        
+        return np.array(self.phenotypes)[dominant], confidence, assigned
+
+
+@lru_cache(maxsize=1)
+def load_phenotype_model(model_dir: str = MODEL_DIR) -> Optional[PhenotypeModel]:
+    """Load the latest trained artifact once per process; None if none exists"""
+    latest_path = os.path.join(model_dir, LATEST_FILE)
+    if not os.path.exists(latest_path):
+        return None
+    
+    with open(latest_path) as f:
+        version = f.read().strip()
+    
+    try:
+        model = PhenotypeModel(os.path.join(model_dir, version))
+    except Exception as e:
+        print(f"Could not load phenotype model {version}: {e}")
+        return None
+    
+    if model.feature_names != FeatureEngineer.MODEL_FEATURES:
+        print(f"Phenotype model {version} was trained on different features; using rules")
+        return None
+    return model
+
+
+def load_training_matrix(db: Session) -> Tuple[np.ndarray, List[str]]:
+    """
+    Read stored feature vectors and label them with the rule-based phenotype
+    The stored Assessment.phenotype may come from a previous model, so it is
+    never used: retraining would otherwise learn from the model's own output
+    """
+    from app.services.risk_detection import PCOSRiskDetector
+    
+    detector = PCOSRiskDetector()
+    rows = db.query(Assessment.feature_values, Assessment.taken_birth_control_pills).filter(
+        Assessment.feature_values.isnot(None)
+    ).all()
+    
+    vectors = []
+    labels = []
+    for feature_values, taken_birth_control in rows:
+        if all(name in feature_values for name in FeatureEngineer.MODEL_FEATURES):
+            vectors.append([feature_values[name] for name in FeatureEngineer.MODEL_FEATURES])
+            labels.append(detector.rule_based_phenotype(feature_values, bool(taken_birth_control))[0])
+    
+    return np.array(vectors, dtype=float), labels
+
+
+def train_phenotype_model(db: Session, n_components: int = 8, min_cluster_size: int = 15,
+                          model_dir: str = MODEL_DIR) -> Dict:
+    """
+    Fit the clustering models on stored assessments and save a versioned artifact
+    KMeans seeds the Gaussian mixture; HDBSCAN's noise rate sets the outlier
+    cutoff on the mixture likelihood
+    """
+    from sklearn.cluster import KMeans
+    from sklearn.mixture import GaussianMixture
+    import hdbscan
+    from app.services.risk_detection import PCOSRiskDetector
+    
+    X, labels = load_training_matrix(db)
+    if len(X) < n_components * 5:
+        raise ValueError(
+            f"Need at least {n_components * 5} assessments with stored features, found {len(X)}"
+        )
+    
+    kmeans = KMeans(n_clusters=n_components, n_init=10, random_state=42).fit(X)
+    gmm = GaussianMixture(
+        n_components=n_components,
+        covariance_type='full',
+        means_init=kmeans.cluster_centers_,
+        reg_covar=1e-4,
+        random_state=42
+    ).fit(X)
+    clusterer = hdbscan.HDBSCAN(min_cluster_size=min_cluster_size, prediction_data=True).fit(X)
+    
+    # Serving flags the same share of samples as noise with a likelihood cutoff
+    noise_fraction = float(np.mean(clusterer.labels_ == -1))
+    noise_log_likelihood = None
+    if noise_fraction > 0:
+        noise_log_likelihood = float(np.quantile(gmm.score_samples(X), noise_fraction))
+    
+    # Name each component after the majority phenotype of its members
+    phenotypes = list(PCOSRiskDetector.PHENOTYPES)
+    components = gmm.predict(X)
+    component_phenotypes = []
+    for component in range(n_components):
+        members = [labels[i] for i in np.flatnonzero(components == component) if labels[i] in phenotypes]
+        if members:
+            component_phenotypes.append(max(phenotypes, key=members.count))
+        else:
+            component_phenotypes.append(phenotypes[0])
+    
+    version = datetime.now().strftime("v%Y%m%d%H%M%S")
+    path = os.path.join(model_dir, version)
+    os.makedirs(path, exist_ok=True)
+    
+    np.save(os.path.join(path, "means.npy"), gmm.means_)
+    np.save(os.path.join(path, "precisions_cholesky.npy"), gmm.precisions_cholesky_)
+    np.save(os.path.join(path, "weights.npy"), gmm.weights_)
+    with open(os.path.join(path, "hdbscan.pkl"), "wb") as f:
+        pickle.dump(clusterer, f)
+    
+    manifest = {
+        "version": version,
+        "created_at": datetime.now().isoformat(),
+        "feature_names": list(FeatureEngineer.MODEL_FEATURES),
+        "phenotypes": phenotypes,
+        "component_phenotypes": component_phenotypes,
+        "n_samples": int(len(X)),
+        "kmeans_inertia": float(kmeans.inertia_),
+        "hdbscan_clusters": int(clusterer.labels_.max() + 1),
+        "hdbscan": True,
+        "noise_fraction": noise_fraction,
+        "noise_log_likelihood": noise_log_likelihood
+    }
+    with open(os.path.join(path, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    
+    # Point LATEST at the new version last, so readers never see a partial artifact
+    tmp_latest = os.path.join(model_dir, LATEST_FILE + ".tmp")
+    with open(tmp_latest, "w") as f:
+        f.write(version)
+    os.replace(tmp_latest, os.path.join(model_dir, LATEST_FILE))
+    
+    load_phenotype_model.cache_clear()
+    return manifest
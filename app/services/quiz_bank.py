@@ -0,0 +1,177 @@
+"""
+Quiz Question Bank
+Process-level, read-only cache of the quiz_questions table
+"""
+import asyncio
+import json
+import os
+import random
+import time
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import QuizQuestion
+
+# How often a worker checks whether seed_quiz.py has changed the bank
+BANK_CHECK_SECONDS = float(os.getenv("QUIZ_BANK_CHECK_SECONDS", "60"))
+
+
+class BankQuestion(NamedTuple):
+    id: int
+    question: str
+    options: Tuple[str, ...]
+    correct_answer: str
+    topic: Optional[str]
+
+
+class QuizBank:
+    """Immutable snapshot of every quiz question, keyed by id"""
+    
+    def __init__(self, questions: List[BankQuestion], version: Tuple):
+        self.version = version
+        self.questions: Dict[int, BankQuestion] = {q.id: q for q in questions}
+        self.ordered_ids: Tuple[int, ...] = tuple(sorted(self.questions))
+        
+        # Lower-cased once so scoring is a dict lookup and a string compare
+        self.answer_key: Dict[int, str] = {q.id: q.correct_answer.lower() for q in questions}
+        
+        # Id arrays per topic; sampling draws positions from these, never from the table
+        topic_ids: Dict[str, List[int]] = {}
+        for question_id in self.ordered_ids:
+            topic = self.questions[question_id].topic
+            if topic:
+                topic_ids.setdefault(topic, []).append(question_id)
+        self.topic_ids: Dict[str, Tuple[int, ...]] = {topic: tuple(ids) for topic, ids in topic_ids.items()}
+        
+        # Each question serialized once per bank version; pages are joined from these
+        self.question_json: Dict[int, bytes] = {
+            q.id: json.dumps(self.public_dict(q), ensure_ascii=False).encode("utf-8") for q in questions
+        }
+    
+    @staticmethod
+    def public_dict(question: BankQuestion) -> Dict:
+        """Question as shown to users (no correct answer)"""
+        return {"id": question.id, "question": question.question, "options": list(question.options)}
+    
+    def serialize(self, question_ids) -> bytes:
+        """JSON response body for the given questions"""
+        return b"[" + b",".join(self.question_json[question_id] for question_id in question_ids) + b"]"
+    
+    def sample(self, count: int, topics: Optional[List[str]] = None,
+               exclude: Optional[Set[int]] = None) -> List[int]:
+        """
+        Random question ids without replacement, optionally limited to topics
+        Excluded ids are skipped while enough other questions remain.
+        Cost depends on count and len(exclude), not on the bank size.
+        """
+        if topics:
+            pools = [self.topic_ids.get(topic, ()) for topic in dict.fromkeys(topics)]
+        else:
+            pools = [self.ordered_ids]
+        offsets = list(accumulate(len(pool) for pool in pools))
+        total = offsets[-1] if offsets else 0
+        
+        def draw(n: int) -> List[int]:
+            # Sample positions in the virtual concatenation of the pools (range() is O(1))
+            ids = []
+            for position in random.sample(range(total), n):
+                index = bisect_right(offsets, position)
+                start = offsets[index - 1] if index else 0
+                ids.append(pools[index][position - start])
+            return ids
+        
+        count = min(count, total)
+        if not exclude:
+            return draw(count)
+        
+        # Over-draw by the number of excluded ids, then drop the seen ones
+        drawn = draw(min(total, count + len(exclude)))
+        fresh = [question_id for question_id in drawn if question_id not in exclude]
+        if len(fresh) >= count:
+            return fresh[:count]
+        
+        # Too few unseen questions left: top up with seen ones
+        seen = [question_id for question_id in drawn if question_id in exclude]
+        return fresh + seen[:count - len(fresh)]
+    
+    def grade(self, answers: Dict[int, str]) -> Dict[int, bool]:
+        """Whether each answer is correct; unknown question ids count as wrong"""
+        answer_key = self.answer_key
+        return {
+            question_id: answer_key.get(question_id) == user_answer.lower()
+            for question_id, user_answer in answers.items()
+        }
+    
+    def score(self, answers: Dict[int, str]) -> int:
+        """Number of correct answers"""
+        return sum(self.grade(answers).values())
+
+
+def parse_options(options) -> Tuple[str, ...]:
+    """seed_quiz.py stores options as a JSON string inside the JSON column"""
+    if isinstance(options, str):
+        options = json.loads(options)
+    return tuple(options)
+
+
+async def bank_version(db: AsyncSession) -> Tuple:
+    """
+    Cheap stamp that changes whenever questions are added, removed, re-seeded
+    or edited (the revision sum grows with every update)
+    """
+    row = (await db.execute(
+        select(
+            func.count(), func.max(QuizQuestion.id), func.max(QuizQuestion.created_at),
+            func.coalesce(func.sum(QuizQuestion.revision), 0)
+        )
+    )).one()
+    return tuple(row)
+
+
+async def load_quiz_bank(db: AsyncSession) -> QuizBank:
+    """Read the whole question table into a new bank"""
+    version = await bank_version(db)
+    rows = (await db.execute(
+        select(
+            QuizQuestion.id, QuizQuestion.question, QuizQuestion.options,
+            QuizQuestion.correct_answer, QuizQuestion.topic
+        )
+    )).all()
+    questions = [
+        BankQuestion(row.id, row.question, parse_options(row.options), row.correct_answer, row.topic)
+        for row in rows
+    ]
+    return QuizBank(questions, version)
+
+
+_bank: Optional[QuizBank] = None
+_checked_at = 0.0
+_lock = asyncio.Lock()
+
+
+async def get_quiz_bank(db: AsyncSession) -> QuizBank:
+    """
+    Current bank for this process
+    Re-checks the version stamp at most every BANK_CHECK_SECONDS and reloads
+    only when it has changed
+    """
+    global _bank, _checked_at
+    if _bank is not None and time.monotonic() - _checked_at < BANK_CHECK_SECONDS:
+        return _bank
+    
+    async with _lock:
+        if _bank is not None and time.monotonic() - _checked_at < BANK_CHECK_SECONDS:
+            return _bank
+        
+        if _bank is None or await bank_version(db) != _bank.version:
+            _bank = await load_quiz_bank(db)
+        _checked_at = time.monotonic()
+        return _bank
+
+
+def invalidate_quiz_bank() -> None:
+    """Force a reload on the next request"""
+    global _bank
+    _bank = None
@@ -2,40 +2,208 @@
 Quiz Engine Service
 Manages PCOS awareness quiz questions and scoring
 """
-from typing import List, Dict
-from sqlalchemy.orm import Session
-from app.models import QuizQuestion, QuizResult
+import math
+from typing import List, Dict, Optional, Set
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import dialect_insert
+from app.models import QuizResult, QuizQuestionStats, UserQuizStats
+from app.services.quiz_bank import get_quiz_bank
+
+RECENT_ATTEMPTS = 3  # Quizzes whose questions count as recently seen
 
 
 class QuizEngineService:
     """Service for quiz management and scoring"""
     
     @staticmethod
-    def get_quiz_questions(db: Session, limit: int = 10) -> List[QuizQuestion]:
-        """Get quiz questions"""
-        return db.query(QuizQuestion).limit(limit).all()
+    async def get_recently_seen(db: AsyncSession, user_id: str) -> Set[int]:
+        """Question ids from the user's last few submitted quizzes"""
+        rows = (await db.scalars(
+            select(QuizResult.question_ids).where(
+                QuizResult.user_id == user_id
+            ).order_by(QuizResult.created_at.desc()).limit(RECENT_ATTEMPTS)
+        )).all()
+        return {question_id for question_ids in rows if question_ids for question_id in question_ids}
+    
+    @staticmethod
+    async def sample_questions_payload(db: AsyncSession, count: int = 10,
+                                       topics: Optional[List[str]] = None,
+                                       user_id: Optional[str] = None) -> bytes:
+        """
+        A random set of questions as pre-serialized JSON
+        With a user_id, questions from their recent attempts are avoided
+        """
+        bank = await get_quiz_bank(db)
+        exclude = await QuizEngineService.get_recently_seen(db, user_id) if user_id else None
+        return bank.serialize(bank.sample(count, topics, exclude))
     
     @staticmethod
-    def calculate_score(db: Session, answers: Dict[int, str]) -> Dict:
+    async def calculate_score(db: AsyncSession, answers: Dict[int, str]) -> Dict:
         """Calculate quiz score based on answers"""
+        bank = await get_quiz_bank(db)
         
-        correct_count = 0
+        outcomes = bank.grade(answers)
+        correct_count = sum(outcomes.values())
         total_questions = len(answers)
         
-        for question_id, user_answer in answers.items():
-            question = db.query(QuizQuestion).filter(
-                QuizQuestion.id == question_id
-            ).first()
-            
-            if question and question.correct_answer.lower() == user_answer.lower():
-                correct_count += 1
-        
         percentage = (correct_count / total_questions * 100) if total_questions > 0 else 0
         
         return {
             "score": correct_count,
             "total_questions": total_questions,
-            "percentage": round(percentage, 1)
+            "percentage": round(percentage, 1),
+            "outcomes": outcomes
+        }
+    
+    @staticmethod
+    async def update_question_stats(db: AsyncSession, outcomes: Dict[int, bool], known_ids) -> None:
+        """
+        Fold one submission into the per-question counters (one locking read
+        once every question has a row)
+        Each question's rest score is the quiz score without that question,
+        which keeps an item from inflating its own discrimination
+        """
+        question_ids = [question_id for question_id in outcomes if question_id in known_ids]
+        if not question_ids:
+            return
+        
+        async def lock(ids):
+            return {
+                row.question_id: row for row in (await db.scalars(
+                    select(QuizQuestionStats).where(
+                        QuizQuestionStats.question_id.in_(ids)
+                    ).with_for_update().execution_options(populate_existing=True)
+                )).all()
+            }
+        
+        stats = await lock(question_ids)
+        missing = [question_id for question_id in question_ids if question_id not in stats]
+        if missing:
+            # A missing row can't be locked, so concurrent first answers would
+            # both insert it; create it race-free, then lock it like the rest
+            await db.execute(dialect_insert(db)(QuizQuestionStats).values([
+                {
+                    "question_id": question_id, "attempts": 0, "correct": 0,
+                    "rest_score_sum": 0.0, "rest_score_sq_sum": 0.0, "rest_score_correct_sum": 0.0
+                }
+                for question_id in missing
+            ]).on_conflict_do_nothing(index_elements=[QuizQuestionStats.question_id]))
+            stats.update(await lock(missing))
+        
+        total = len(outcomes)
+        score = sum(outcomes.values())
+        for question_id in question_ids:
+            row = stats[question_id]
+            correct = outcomes[question_id]
+            rest_score = (score - correct) / (total - 1) if total > 1 else 0.0
+            row.attempts += 1
+            row.rest_score_sum += rest_score
+            row.rest_score_sq_sum += rest_score ** 2
+            if correct:
+                row.correct += 1
+                row.rest_score_correct_sum += rest_score
+    
+    @staticmethod
+    async def update_user_quiz_stats(db: AsyncSession, user_id: str, percentage: float,
+                                     awareness_level: str) -> None:
+        """Fold one submission into the user's awareness summary"""
+        stats = await db.get(UserQuizStats, user_id, with_for_update=True, populate_existing=True)
+        if stats is None:
+            # First quiz: create the row race-free (a concurrent first submission
+            # may win and set first_percentage), then lock it
+            await db.execute(dialect_insert(db)(UserQuizStats).values(
+                user_id=user_id, attempts=0, first_percentage=percentage, best_percentage=percentage
+            ).on_conflict_do_nothing(index_elements=[UserQuizStats.user_id]))
+            stats = await db.get(UserQuizStats, user_id, with_for_update=True, populate_existing=True)
+        
+        stats.attempts += 1
+        stats.best_percentage = max(stats.best_percentage, percentage)
+        stats.latest_percentage = percentage
+        stats.latest_awareness_level = awareness_level
+    
+    @staticmethod
+    def question_analytics(stats: QuizQuestionStats) -> Dict:
+        """
+        Difficulty (share answered correctly) and discrimination (point-biserial
+        correlation between answering correctly and the rest-of-quiz score)
+        Both come straight from the running sums
+        """
+        n = stats.attempts
+        c = stats.correct
+        if not n:
+            return {"attempts": 0, "correct": 0, "difficulty": None, "discrimination": None}
+        
+        p = c / n
+        discrimination = None
+        mean = stats.rest_score_sum / n
+        variance = stats.rest_score_sq_sum / n - mean ** 2
+        if 0 < c < n and variance > 1e-12:
+            mean_correct = stats.rest_score_correct_sum / c
+            mean_incorrect = (stats.rest_score_sum - stats.rest_score_correct_sum) / (n - c)
+            discrimination = round((mean_correct - mean_incorrect) / math.sqrt(variance) * math.sqrt(p * (1 - p)), 3)
+        
+        return {
+            "attempts": n,
+            "correct": c,
+            "difficulty": round(p, 3),
+            "discrimination": discrimination
+        }
+    
+    @staticmethod
+    async def get_question_analytics(db: AsyncSession, question_id: Optional[int] = None) -> List[Dict]:
+        """Analytics for one question, or for every question with answers"""
+        bank = await get_quiz_bank(db)
+        if question_id is not None:
+            row = await db.get(QuizQuestionStats, question_id)
+            rows = [row] if row else []
+        else:
+            rows = (await db.scalars(select(QuizQuestionStats))).all()
+        
+        analytics = []
+        for row in rows:
+            question = bank.questions.get(row.question_id)
+            if question is None:
+                continue
+            analytics.append({
+                "question_id": row.question_id,
+                "question": question.question,
+                "topic": question.topic,
+                **QuizEngineService.question_analytics(row)
+            })
+        return analytics
+    
+    @staticmethod
+    async def get_user_history(db: AsyncSession, user_id: str, limit: int = 50) -> Dict:
+        """User's awareness summary plus their most recent quiz results"""
+        stats = await db.get(UserQuizStats, user_id)
+        results = (await db.execute(
+            select(
+                QuizResult.id, QuizResult.created_at, QuizResult.score,
+                QuizResult.total_questions, QuizResult.percentage, QuizResult.awareness_level
+            ).where(
+                QuizResult.user_id == user_id
+            ).order_by(QuizResult.created_at.desc(), QuizResult.id.desc()).limit(limit)
+        )).all()
+        
+        return {
+            "user_id": user_id,
+            "attempts": stats.attempts if stats else 0,
+            "first_percentage": stats.first_percentage if stats else None,
+            "best_percentage": stats.best_percentage if stats else None,
+            "latest_percentage": stats.latest_percentage if stats else None,
+            "latest_awareness_level": stats.latest_awareness_level if stats else None,
+            "history": [
+                {
+                    "quiz_id": row.id,
+                    "created_at": row.created_at,
+                    "score": row.score,
+                    "total_questions": row.total_questions,
+                    "percentage": row.percentage,
+                    "awareness_level": row.awareness_level
+                }
+                for row in results
+            ]
         }
     
     @staticmethod
@@ -85,11 +253,11 @@ class QuizEngineService:
         return tips.get(awareness_level, tips["Beginner"])
     
     @staticmethod
-    def submit_quiz(db: Session, user_id: str, answers: Dict[int, str]) -> Dict:
+    async def submit_quiz(db: AsyncSession, user_id: str, answers: Dict[int, str]) -> Dict:
         """Submit quiz and save results"""
         
         # Calculate score
-        score_data = QuizEngineService.calculate_score(db, answers)
+        score_data = await QuizEngineService.calculate_score(db, answers)
         
         # Determine awareness level
         awareness_level = QuizEngineService.get_awareness_level(score_data["percentage"])
@@ -97,15 +265,24 @@ class QuizEngineService:
         # Get health tips
         health_tips = QuizEngineService.get_health_tips(awareness_level, score_data["percentage"])
         
-        # Save result
+        # Save result with one outcome flag per answered question
+        outcomes = score_data["outcomes"]
         quiz_result = QuizResult(
             user_id=user_id,
             score=score_data["score"],
-            total_questions=score_data["total_questions"]
+            total_questions=score_data["total_questions"],
+            question_ids=list(outcomes),
+            outcomes="".join("1" if correct else "0" for correct in outcomes.values()),
+            percentage=score_data["percentage"],
+            awareness_level=awareness_level
         )
         db.add(quiz_result)
-        db.commit()
-        db.refresh(quiz_result)
+        
+        bank = await get_quiz_bank(db)
+        await QuizEngineService.update_question_stats(db, outcomes, bank.questions)
+        await QuizEngineService.update_user_quiz_stats(db, user_id, score_data["percentage"], awareness_level)
+        await db.commit()
+        await db.refresh(quiz_result)
         
         return {
             "score": score_data["score"],
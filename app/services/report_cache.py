@@ -0,0 +1,142 @@
+"""
+PDF Report Cache
+Rendered assessment reports keyed by (assessment_id, template_version).
+Assessments never change after they are stored, so a report only needs to be
+rendered again when the template does.
+"""
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ovasense_reports"))
+REPORT_CACHE_MAX_MB = int(os.getenv("REPORT_CACHE_MAX_MB", "512"))  # On-disk cap, shared by all workers
+REPORT_MEMORY_CACHE_MB = int(os.getenv("REPORT_MEMORY_CACHE_MB", "32"))  # Per-process cap
+
+
+class PDFReportCache:
+    """In-memory LRU in front of a size-capped directory of rendered PDFs"""
+    
+    def __init__(self, directory: str = REPORT_CACHE_DIR, max_disk_bytes: int = REPORT_CACHE_MAX_MB * 1024 * 1024,
+                 max_memory_bytes: int = REPORT_MEMORY_CACHE_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        
+        # key -> PDF bytes; least recently used evicted first
+        self._memory: "OrderedDict[Tuple[int, int], bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes: Optional[int] = None  # Estimate; recounted whenever it passes the cap
+    
+    def path_for(self, key: Tuple[int, int]) -> str:
+        assessment_id, template_version = key
+        return os.path.join(self.directory, f"assessment_{assessment_id}_v{template_version}.pdf")
+    
+    def get_bytes(self, key: Tuple[int, int]) -> Optional[bytes]:
+        """PDF from this process's memory cache"""
+        pdf = self._memory.get(key)
+        if pdf is not None:
+            self._memory.move_to_end(key)
+        return pdf
+    
+    def get_path(self, key: Tuple[int, int]) -> Optional[str]:
+        """Path of the cached file, marked as recently used, or None"""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+    
+    def read(self, key: Tuple[int, int], remember: bool = True) -> Optional[bytes]:
+        """
+        PDF from memory, else read from disk right away, or None
+        Reading here (rather than handing out the path) means another
+        worker's eviction can't delete the file under a response in flight
+        """
+        pdf = self.get_bytes(key)
+        if pdf is not None:
+            return pdf
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                pdf = f.read()
+        except FileNotFoundError:
+            return None  # Evicted since the lookup
+        if remember:
+            self._remember(key, pdf)
+        return pdf
+    
+    def put(self, key: Tuple[int, int], pdf: bytes) -> None:
+        """Store a freshly rendered PDF in memory and on disk"""
+        self._remember(key, pdf)
+        
+        os.makedirs(self.directory, exist_ok=True)
+        # Write to a temp file and rename, so concurrent readers never see a partial PDF
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(pdf)
+            os.replace(temp_path, self.path_for(key))
+        except OSError:
+            os.unlink(temp_path)
+            raise
+        
+        if self._disk_bytes is None:
+            self._disk_bytes = self.disk_usage()
+        else:
+            self._disk_bytes += len(pdf)
+        if self._disk_bytes > self.max_disk_bytes:
+            self.evict()
+    
+    def _remember(self, key: Tuple[int, int], pdf: bytes) -> None:
+        if len(pdf) > self.max_memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = pdf
+        self._memory_bytes += len(pdf)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+    
+    def _files(self):
+        """(mtime, size, path) for every cached PDF"""
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(".pdf"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue  # Evicted by another worker
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+    
+    def disk_usage(self) -> int:
+        return sum(size for _, size, _ in self._files())
+    
+    def evict(self) -> None:
+        """Delete least recently used files until the directory is back under 90% of the cap"""
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        target = self.max_disk_bytes * 0.9
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._disk_bytes = total
+    
+    def clear_memory(self) -> None:
+        self._memory.clear()
+        self._memory_bytes = 0
+
+
+report_cache = PDFReportCache()
@@ -0,0 +1,123 @@
+"""
+Bulk Report Export Service
+Streams many assessment PDFs as one ZIP archive, built incrementally while
+rows are read through a server-side cursor and rendered on the report pool
+"""
+import asyncio
+import os
+import zipfile
+from collections import deque
+from datetime import date, datetime, time
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Assessment
+from app.services import report_renderer
+from app.services.report_cache import report_cache
+from app.services.report_generator import ReportGenerator
+
+# Reports rendered ahead of the one being written; bounds memory per export
+EXPORT_WINDOW = int(os.getenv("REPORT_EXPORT_WINDOW", str(report_renderer.MAX_CONCURRENT_RENDERS * 2)))
+ROW_BATCH_SIZE = 100
+
+
+class ZipChunkBuffer:
+    """
+    Write-only file object for zipfile
+    It has no seek/tell, so zipfile writes data descriptors and never goes
+    back; whatever was written since the last drain can be sent right away
+    """
+    
+    def __init__(self):
+        self._chunks: List[bytes] = []
+    
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self) -> None:
+        pass
+    
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ReportExportService:
+    """Service for bulk PDF exports"""
+    
+    @staticmethod
+    def export_query(assessment_ids: Optional[List[int]] = None, user_id: Optional[str] = None,
+                     from_date: Optional[date] = None, to_date: Optional[date] = None):
+        """Assessments matching the ids and/or user/date filter, in id order"""
+        query = select(Assessment)
+        if assessment_ids:
+            query = query.where(Assessment.id.in_(assessment_ids))
+        if user_id:
+            query = query.where(Assessment.user_id == user_id)
+        if from_date:
+            query = query.where(Assessment.created_at >= datetime.combine(from_date, time.min))
+        if to_date:
+            query = query.where(Assessment.created_at <= datetime.combine(to_date, time.max))
+        return query.order_by(Assessment.id)
+    
+    @staticmethod
+    async def pdf_for(assessment_id: int, report_data: Dict[str, Any]) -> bytes:
+        """
+        Cached PDF, or a fresh render on the report pool
+        Exports don't fill the cache, so one large export can't evict the
+        reports users are downloading individually
+        """
+        pdf = report_cache.read((assessment_id, ReportGenerator.TEMPLATE_VERSION), remember=False)
+        if pdf is not None:
+            return pdf
+        return await report_renderer.render(report_data)
+    
+    @staticmethod
+    async def write_next(archive: zipfile.ZipFile, pending: Deque[Tuple[int, asyncio.Future]],
+                         failed: List[str]) -> None:
+        """Wait for the oldest pending render and add it to the archive"""
+        assessment_id, task = pending.popleft()
+        try:
+            pdf = await task
+        except Exception as e:
+            failed.append(f"{assessment_id}: {e}")
+            return
+        archive.writestr(f"ovasense_report_{assessment_id}.pdf", pdf)
+    
+    @classmethod
+    async def stream_zip(cls, db: AsyncSession, query,
+                         build_report_data: Callable[[Assessment], Dict[str, Any]]) -> AsyncIterator[bytes]:
+        """
+        ZIP archive of every matching assessment's report, yielded in chunks
+        At most EXPORT_WINDOW renders are in flight; reports that fail to
+        render are listed in errors.txt instead of aborting the download
+        """
+        buffer = ZipChunkBuffer()
+        pending: Deque[Tuple[int, asyncio.Future]] = deque()
+        failed: List[str] = []
+        
+        try:
+            # PDFs are already compressed, so entries are stored as-is
+            with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED) as archive:
+                rows = await db.stream(query.execution_options(yield_per=ROW_BATCH_SIZE))
+                async for assessment in rows.scalars():
+                    report_data = build_report_data(assessment)
+                    pending.append((assessment.id, asyncio.ensure_future(cls.pdf_for(assessment.id, report_data))))
+                    if len(pending) >= EXPORT_WINDOW:
+                        await cls.write_next(archive, pending, failed)
+                        yield buffer.drain()
+                
+                while pending:
+                    await cls.write_next(archive, pending, failed)
+                    yield buffer.drain()
+                
+                if failed:
+                    archive.writestr("errors.txt", "\n".join(failed) + "\n")
+            # Closing the archive writes the central directory
+            yield buffer.drain()
+        finally:
+            # Client went away mid-download: don't keep rendering for nobody
+            for _, task in pending:
+                task.cancel()
@@ -6,59 +6,40 @@ from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 from typing import Dict, Any
 from datetime import datetime
+from functools import lru_cache
 import io
 
-class ReportGenerator:
-    """Generate PDF reports for assessments"""
-    
-    @staticmethod
-    def generate_pdf(assessment_data: Dict[str, Any], output_path: str = None) -> bytes:
-        """
-        Generate a PDF report from assessment data
-        Returns bytes if output_path is None, otherwise saves to file
-        """
-        buffer = io.BytesIO() if output_path is None else None
-        doc = SimpleDocTemplate(
-            buffer if buffer else output_path,
-            pagesize=letter,
-            rightMargin=72,
-            leftMargin=72,
-            topMargin=72,
-            bottomMargin=18
-        )
-        
-        # Container for the 'Flowable' objects
-        elements = []
-        
-        # Define styles
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
+
+@lru_cache(maxsize=1)
+def report_styles() -> Dict[str, ParagraphStyle]:
+    """Sample stylesheet plus the report's custom styles, built once per process"""
+    styles = getSampleStyleSheet()
+    return {
+        'Normal': styles['Normal'],
+        'CustomTitle': ParagraphStyle(
             'CustomTitle',
             parent=styles['Heading1'],
             fontSize=24,
             textColor=colors.HexColor('#2C3E50'),
             spaceAfter=30,
             alignment=TA_CENTER
-        )
-        
-        heading_style = ParagraphStyle(
+        ),
+        'CustomHeading': ParagraphStyle(
             'CustomHeading',
             parent=styles['Heading2'],
             fontSize=16,
             textColor=colors.HexColor('#34495E'),
             spaceAfter=12,
             spaceBefore=12
-        )
-        
-        body_style = ParagraphStyle(
+        ),
+        'CustomBody': ParagraphStyle(
             'CustomBody',
             parent=styles['BodyText'],
             fontSize=11,
             leading=14,
             alignment=TA_JUSTIFY
-        )
-        
-        disclaimer_style = ParagraphStyle(
+        ),
+        'Disclaimer': ParagraphStyle(
             'Disclaimer',
             parent=styles['BodyText'],
             fontSize=10,
@@ -68,14 +49,48 @@ class ReportGenerator:
             backColor=colors.HexColor('#FADBD8'),
             borderPadding=10
         )
+    }
+
+
+class ReportGenerator:
+    """Generate PDF reports for assessments"""
+    
+    # Bump whenever the layout or wording changes; cached PDFs are keyed by it
+    TEMPLATE_VERSION = 1
+    
+    @staticmethod
+    def generate_pdf(assessment_data: Dict[str, Any], output_path: str = None) -> bytes:
+        """
+        Generate a PDF report from assessment data
+        Returns bytes if output_path is None, otherwise saves to file
+        """
+        buffer = io.BytesIO() if output_path is None else None
+        doc = SimpleDocTemplate(
+            buffer if buffer else output_path,
+            pagesize=letter,
+            rightMargin=72,
+            leftMargin=72,
+            topMargin=72,
+            bottomMargin=18
+        )
+        
+        # Container for the 'Flowable' objects
+        elements = []
+        
+        styles = report_styles()
+        title_style = styles['CustomTitle']
+        heading_style = styles['CustomHeading']
+        body_style = styles['CustomBody']
+        disclaimer_style = styles['Disclaimer']
         
         # Title
         elements.append(Paragraph("OvaSense AI Assessment Report", title_style))
         elements.append(Spacer(1, 0.2*inch))
         
-        # Date
-        date_str = datetime.now().strftime("%B %d, %Y")
-        elements.append(Paragraph(f"<i>Generated on: {date_str}</i>", styles['Normal']))
+        # Date of the assessment, so the same assessment always renders the same document
+        report_date = assessment_data.get('assessment_date') or datetime.now()
+        date_str = report_date.strftime("%B %d, %Y")
+        elements.append(Paragraph(f"<i>Assessment date: {date_str}</i>", styles['Normal']))
         elements.append(Spacer(1, 0.3*inch))
         
         # IMPORTANT DISCLAIMER
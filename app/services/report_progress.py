@@ -2,15 +2,135 @@
 Monthly Progress Report Service
 Generates comprehensive monthly progress reports
 """
-from typing import Dict, List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.models import Assessment, PeriodLog, MentalHealthLog
-from app.services.health_score_engine import HealthScoreEngine
-from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import select, func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from app.models import Assessment, PeriodLog, MentalHealthLog, MentalHealthDailyRollup, HealthScoreSnapshot, MonthlyReport
+from app.services.health_score_engine import HealthScoreEngine, UserHealthContext
+from datetime import datetime, date, timedelta, timezone
 import calendar
 
 
+def as_utc(moment: datetime) -> datetime:
+    """Timezone-aware UTC time; naive values are taken as server local time"""
+    return moment.astimezone(timezone.utc)
+
+
+class MonthlyReportData:
+    """Everything a monthly report needs, loaded with one query per table"""
+    
+    REPORT_WINDOW_DAYS = 30
+    WEIGHT_WINDOW_DAYS = 60
+    
+    def __init__(self, user_id: str, now: datetime, assessments: List[Assessment], period_logs: List[PeriodLog],
+                 mental_days: List, score_series: List[int]):
+        self.user_id = user_id
+        self.now = now
+        self.assessments = assessments  # Last 60 days plus the latest one, oldest first
+        self.period_logs = period_logs  # Health score window (6 months), ordered by start_date
+        self.mental_days = mental_days  # Daily mental health rollups, oldest first (narrow rows)
+        self.score_series = score_series  # Daily health scores over the last 30 days
+    
+    @classmethod
+    def statements(cls, user_ids: List[str], now: datetime) -> Tuple:
+        """
+        One select per table for a set of users: assessments, period logs,
+        daily mental health rollups and score snapshots
+        """
+        latest = aliased(Assessment)
+        latest_assessment_id = select(latest.id).where(
+            latest.user_id == Assessment.user_id
+        ).order_by(latest.created_at.desc()).limit(1).correlate(Assessment).scalar_subquery()
+        assessments = select(Assessment).where(
+            Assessment.user_id.in_(user_ids),
+            or_(
+                Assessment.created_at >= now - timedelta(days=cls.WEIGHT_WINDOW_DAYS),
+                Assessment.id == latest_assessment_id
+            )
+        ).order_by(Assessment.created_at)
+        
+        period_logs = select(PeriodLog).where(
+            PeriodLog.user_id.in_(user_ids),
+            PeriodLog.created_at >= now - timedelta(days=UserHealthContext.PERIOD_WINDOW_DAYS)
+        ).order_by(PeriodLog.start_date)
+        
+        # At most one row per user per day instead of every log; the window
+        # starts at midnight, so it can take in a few more hours than 30 days
+        mental_days = select(
+            MentalHealthDailyRollup.user_id,
+            MentalHealthDailyRollup.log_count,
+            MentalHealthDailyRollup.stress_sum,
+            MentalHealthDailyRollup.sleep_sum
+        ).where(
+            MentalHealthDailyRollup.user_id.in_(user_ids),
+            MentalHealthDailyRollup.period_start >= (now - timedelta(days=cls.REPORT_WINDOW_DAYS)).date(),
+            MentalHealthDailyRollup.log_count > 0
+        ).order_by(MentalHealthDailyRollup.period_start)
+        
+        score_series = select(HealthScoreSnapshot.user_id, HealthScoreSnapshot.health_score).where(
+            HealthScoreSnapshot.user_id.in_(user_ids),
+            HealthScoreSnapshot.snapshot_date >= now.date() - timedelta(days=cls.REPORT_WINDOW_DAYS)
+        ).order_by(HealthScoreSnapshot.snapshot_date)
+        
+        return assessments, period_logs, mental_days, score_series
+    
+    @classmethod
+    def from_results(cls, user_ids: List[str], now: datetime, results: List) -> Dict[str, "MonthlyReportData"]:
+        """Split the results of `statements` into one snapshot per user (order is preserved)"""
+        assessments, period_logs, mental_days, score_series = results
+        data = {user_id: cls(user_id, now, [], [], [], []) for user_id in user_ids}
+        for assessment in assessments.scalars():
+            data[assessment.user_id].assessments.append(assessment)
+        for log in period_logs.scalars():
+            data[log.user_id].period_logs.append(log)
+        for row in mental_days:
+            data[row.user_id].mental_days.append(row)
+        for row in score_series:
+            data[row.user_id].score_series.append(row.health_score)
+        return data
+    
+    @classmethod
+    async def load(cls, db: AsyncSession, user_id: str) -> "MonthlyReportData":
+        """Fetch assessments, period logs, daily mental health rollups and score snapshots (4 queries)"""
+        now = datetime.now()
+        results = [await db.execute(statement) for statement in cls.statements([user_id], now)]
+        return cls.from_results([user_id], now, results)[user_id]
+    
+    @property
+    def latest_assessment(self) -> Optional[Assessment]:
+        return self.assessments[-1] if self.assessments else None
+    
+    @property
+    def recent_assessments(self) -> List[Assessment]:
+        """Assessments from the weight-trend window"""
+        cutoff = as_utc(self.now - timedelta(days=self.WEIGHT_WINDOW_DAYS))
+        return [a for a in self.assessments if a.created_at and as_utc(a.created_at) >= cutoff]
+    
+    @property
+    def period_count(self) -> int:
+        """Period logs created in the report window"""
+        cutoff = as_utc(self.now - timedelta(days=self.REPORT_WINDOW_DAYS))
+        return sum(1 for log in self.period_logs if log.created_at and as_utc(log.created_at) >= cutoff)
+    
+    @property
+    def mental_count(self) -> int:
+        """Mental health logs in the report window"""
+        return sum(day.log_count for day in self.mental_days)
+    
+    def health_context(self) -> UserHealthContext:
+        """Health score inputs, with the month's mental health averages taken from the rollup sums"""
+        count = self.mental_count
+        if not count:
+            return UserHealthContext(self.latest_assessment, self.period_logs)
+        return UserHealthContext(
+            self.latest_assessment, self.period_logs,
+            sum(day.stress_sum for day in self.mental_days) / count,
+            sum(day.sleep_sum for day in self.mental_days) / count
+        )
+
+
 class ProgressReportService:
     """Service for generating monthly progress reports"""
     
@@ -20,68 +140,61 @@ class ProgressReportService:
         return f"{calendar.month_name[month]} {year}"
     
     @staticmethod
-    def analyze_health_score_trend(db: Session, user_id: str) -> Dict[str, float]:
-        """Analyze health score trend over the month"""
-        
-        # Get health scores from different weeks
-        now = datetime.now()
-        
-        scores = {}
-        
-        # Current score
-        current_score = HealthScoreEngine.calculate_health_score(db, user_id)
-        scores["current"] = current_score["health_score"]
-        
-        # Note: In a real implementation, you'd store historical health scores
-        # For now, we'll return current score
-        scores["trend"] = "stable"  # Would calculate based on historical data
+    def summarize_score_series(current: int, series: List[int]) -> Dict[str, Any]:
+        """Summarize a chronological list of daily health scores"""
+        scores = {"current": current, "data_points": len(series)}
+        
+        if len(series) < 2:
+            scores["trend"] = "stable"
+            return scores
+        
+        change = series[-1] - series[0]
+        scores["start"] = series[0]
+        scores["change"] = change
+        scores["average"] = round(sum(series) / len(series), 1)
+        
+        if change >= 5:
+            scores["trend"] = "improving"
+        elif change <= -5:
+            scores["trend"] = "declining"
+        else:
+            scores["trend"] = "stable"
         
         return scores
     
     @staticmethod
-    def analyze_cycle_regularity(db: Session, user_id: str) -> Optional[str]:
+    def analyze_cycle_regularity(period_count: int) -> Optional[str]:
         """Analyze cycle regularity changes"""
-        
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        
-        recent_logs = db.query(PeriodLog).filter(
-            PeriodLog.user_id == user_id,
-            PeriodLog.created_at >= thirty_days_ago
-        ).count()
-        
-        if recent_logs == 0:
+        if period_count == 0:
             return "No period data logged this month"
-        elif recent_logs == 1:
+        elif period_count == 1:
             return "One period logged - continue tracking for trend analysis"
         else:
             return "Regular tracking maintained - good progress!"
     
     @staticmethod
-    def analyze_stress_trend(db: Session, user_id: str) -> Optional[str]:
-        """Analyze stress trend"""
-        
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        
-        logs = db.query(MentalHealthLog).filter(
-            MentalHealthLog.user_id == user_id,
-            MentalHealthLog.created_at >= thirty_days_ago
-        ).order_by(MentalHealthLog.created_at).all()
-        
-        if not logs:
+    def analyze_stress_trend(days: List) -> Optional[str]:
+        """Analyze stress trend from the month's daily rollups, oldest first"""
+        count = sum(day.log_count for day in days)
+        if not count:
             return "No mental health data logged this month"
         
-        if len(logs) < 3:
+        if count < 3:
             return "Limited data - continue logging for better insights"
         
-        # Split into halves
-        mid = len(logs) // 2
-        first_half = logs[:mid]
-        second_half = logs[mid:]
-        
-        avg_first = sum(log.stress_level for log in first_half) / len(first_half)
-        avg_second = sum(log.stress_level for log in second_half) / len(second_half)
+        # Split the logs into an older and a newer half; a day that straddles
+        # the middle is shared between them at its average stress
+        older_count = count // 2
+        older_sum = newer_sum = 0.0
+        remaining = older_count
+        for day in days:
+            older = min(day.log_count, remaining)
+            remaining -= older
+            average = day.stress_sum / day.log_count
+            older_sum += average * older
+            newer_sum += average * (day.log_count - older)
         
-        diff = avg_second - avg_first
+        diff = newer_sum / (count - older_count) - older_sum / older_count
         
         if diff < -1:
             return "Stress levels decreased - excellent progress!"
@@ -91,17 +204,8 @@ class ProgressReportService:
             return "Stress levels stable"
     
     @staticmethod
-    def analyze_weight_trend(db: Session, user_id: str) -> Optional[str]:
-        """Analyze weight trend"""
-        
-        # Get assessments from last 60 days
-        sixty_days_ago = datetime.now() - timedelta(days=60)
-        
-        assessments = db.query(Assessment).filter(
-            Assessment.user_id == user_id,
-            Assessment.created_at >= sixty_days_ago
-        ).order_by(Assessment.created_at).all()
-        
+    def analyze_weight_trend(assessments: List[Assessment]) -> Optional[str]:
+        """Analyze weight trend across assessments, oldest first"""
         if len(assessments) < 2:
             return "Not enough data to track weight trend"
         
@@ -118,37 +222,23 @@ class ProgressReportService:
             return f"Weight increased by {diff:.1f} kg"
     
     @staticmethod
-    def generate_key_achievements(db: Session, user_id: str) -> List[str]:
+    def generate_key_achievements(period_count: int, mh_count: int, health_score: int) -> List[str]:
         """Generate list of key achievements"""
-        
         achievements = []
         
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        
         # Check period tracking
-        period_count = db.query(PeriodLog).filter(
-            PeriodLog.user_id == user_id,
-            PeriodLog.created_at >= thirty_days_ago
-        ).count()
-        
         if period_count > 0:
             achievements.append(f"Logged {period_count} period entries this month")
         
         # Check mental health tracking
-        mh_count = db.query(MentalHealthLog).filter(
-            MentalHealthLog.user_id == user_id,
-            MentalHealthLog.created_at >= thirty_days_ago
-        ).count()
-        
         if mh_count >= 20:
             achievements.append("Consistently tracked mental health (20+ entries)")
         elif mh_count >= 10:
             achievements.append("Good mental health tracking (10+ entries)")
         
         # Check health score
-        health_score = HealthScoreEngine.calculate_health_score(db, user_id)
-        if health_score["health_score"] >= 70:
-            achievements.append(f"Maintained good health score: {health_score['health_score']}/100")
+        if health_score >= 70:
+            achievements.append(f"Maintained good health score: {health_score}/100")
         
         if not achievements:
             achievements.append("Started your health tracking journey")
@@ -156,33 +246,18 @@ class ProgressReportService:
         return achievements
     
     @staticmethod
-    def generate_recommendations(db: Session, user_id: str) -> List[str]:
+    def generate_recommendations(period_count: int, mh_count: int, health_score: int) -> List[str]:
         """Generate personalized recommendations"""
-        
         recommendations = []
         
-        # Get health score
-        health_score = HealthScoreEngine.calculate_health_score(db, user_id)
-        
-        if health_score["health_score"] < 60:
+        if health_score < 60:
             recommendations.append("Focus on improving your health score through better sleep and stress management")
         
         # Check period tracking
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        period_count = db.query(PeriodLog).filter(
-            PeriodLog.user_id == user_id,
-            PeriodLog.created_at >= thirty_days_ago
-        ).count()
-        
         if period_count == 0:
             recommendations.append("Start tracking your periods for better cycle insights")
         
         # Check mental health tracking
-        mh_count = db.query(MentalHealthLog).filter(
-            MentalHealthLog.user_id == user_id,
-            MentalHealthLog.created_at >= thirty_days_ago
-        ).count()
-        
         if mh_count < 10:
             recommendations.append("Log your mental health daily for better pattern recognition")
         
@@ -193,28 +268,107 @@ class ProgressReportService:
         return recommendations
     
     @staticmethod
-    def generate_monthly_report(db: Session, user_id: str) -> Dict:
-        """Generate comprehensive monthly progress report"""
-        
-        now = datetime.now()
-        period = ProgressReportService.get_month_name(now.month, now.year)
-        
-        # Gather all metrics
-        health_score_trend = ProgressReportService.analyze_health_score_trend(db, user_id)
-        cycle_regularity = ProgressReportService.analyze_cycle_regularity(db, user_id)
-        stress_trend = ProgressReportService.analyze_stress_trend(db, user_id)
-        weight_trend = ProgressReportService.analyze_weight_trend(db, user_id)
-        achievements = ProgressReportService.generate_key_achievements(db, user_id)
-        recommendations = ProgressReportService.generate_recommendations(db, user_id)
+    def build_report(data: MonthlyReportData) -> Dict:
+        """Derive every report section from one loaded month of data (no queries)"""
+        now = data.now
+        health_score = HealthScoreEngine.score_context(data.health_context())["health_score"]
+        period_count = data.period_count
+        mh_count = data.mental_count
         
         return {
-            "user_id": user_id,
-            "period": period,
-            "health_score_trend": health_score_trend,
-            "cycle_regularity_change": cycle_regularity,
-            "stress_trend": stress_trend,
-            "weight_trend": weight_trend,
+            "user_id": data.user_id,
+            "period": ProgressReportService.get_month_name(now.month, now.year),
+            "health_score_trend": ProgressReportService.summarize_score_series(health_score, data.score_series),
+            "cycle_regularity_change": ProgressReportService.analyze_cycle_regularity(period_count),
+            "stress_trend": ProgressReportService.analyze_stress_trend(data.mental_days),
+            "weight_trend": ProgressReportService.analyze_weight_trend(data.recent_assessments),
             "symptom_reduction": None,  # Would require historical symptom tracking
-            "key_achievements": achievements,
-            "recommendations": recommendations
+            "key_achievements": ProgressReportService.generate_key_achievements(period_count, mh_count, health_score),
+            "recommendations": ProgressReportService.generate_recommendations(period_count, mh_count, health_score)
         }
+    
+    @staticmethod
+    async def generate_monthly_report(db: AsyncSession, user_id: str) -> Dict:
+        """Generate comprehensive monthly progress report"""
+        data = await MonthlyReportData.load(db, user_id)
+        return ProgressReportService.build_report(data)
+
+
+class MonthlyReportStore:
+    """
+    Stored monthly reports (one row per user per month)
+    A stored report is served until the user's assessments or logs change
+    """
+    
+    STAMP_MODELS = (Assessment, PeriodLog, MentalHealthLog)
+    
+    @staticmethod
+    def month_start(now: datetime) -> date:
+        return date(now.year, now.month, 1)
+    
+    @classmethod
+    async def source_stamp(cls, db: AsyncSession, user_id: str) -> List:
+        """Latest id and row count per source table, in one query"""
+        subqueries = []
+        for model in cls.STAMP_MODELS:
+            subqueries.append(select(func.max(model.id)).where(model.user_id == user_id).scalar_subquery())
+            subqueries.append(select(func.count()).select_from(model).where(model.user_id == user_id).scalar_subquery())
+        return list((await db.execute(select(*subqueries))).one())
+    
+    @classmethod
+    def source_stamp_statements(cls, user_ids: List[str]) -> List:
+        """Grouped equivalent of `source_stamp` for a chunk of users (one select per table)"""
+        return [
+            select(model.user_id, func.max(model.id), func.count()).where(
+                model.user_id.in_(user_ids)
+            ).group_by(model.user_id)
+            for model in cls.STAMP_MODELS
+        ]
+    
+    @classmethod
+    def source_stamps(cls, user_ids: List[str], results: List) -> Dict[str, List]:
+        """Per-user stamps from the results of `source_stamp_statements`"""
+        stamps = {user_id: [None, 0] * len(cls.STAMP_MODELS) for user_id in user_ids}
+        for index, result in enumerate(results):
+            for user_id, max_id, count in result:
+                stamps[user_id][2 * index:2 * index + 2] = [max_id, count]
+        return stamps
+    
+    @staticmethod
+    def store(stored: Optional[MonthlyReport], user_id: str, month: date, report: Dict, stamp: List,
+              now: datetime) -> MonthlyReport:
+        """Create or overwrite a user's stored report; the caller adds and commits"""
+        if stored is None:
+            stored = MonthlyReport(user_id=user_id, month=month)
+        stored.report = report
+        stored.source_stamp = stamp
+        stored.generated_at = now
+        return stored
+    
+    @classmethod
+    async def get_report(cls, db: AsyncSession, user_id: str) -> Dict:
+        """
+        This month's report for a user
+        Served from monthly_reports (2 queries) unless newer logs exist;
+        otherwise rebuilt and stored
+        """
+        now = datetime.now()
+        month = cls.month_start(now)
+        stored = await db.scalar(
+            select(MonthlyReport).where(
+                MonthlyReport.user_id == user_id,
+                MonthlyReport.month == month
+            )
+        )
+        stamp = await cls.source_stamp(db, user_id)
+        if stored is not None and stored.source_stamp == stamp:
+            return stored.report
+        
+        report = await ProgressReportService.generate_monthly_report(db, user_id)
+        db.add(cls.store(stored, user_id, month, report, stamp, now))
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Another request stored this month's report first
+            await db.rollback()
+        return report
@@ -0,0 +1,166 @@
+"""
+Report Rendering Service
+Runs ReportLab off the event loop on a bounded process pool, and tracks
+background render jobs for the report-jobs API
+"""
+import asyncio
+import multiprocessing
+import os
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+from app.services.report_cache import report_cache
+from app.services.report_generator import ReportGenerator
+
+RENDER_WORKERS = int(os.getenv("REPORT_RENDER_WORKERS", "2"))
+# Renders allowed in the pool at once; the rest wait without holding a worker
+MAX_CONCURRENT_RENDERS = int(os.getenv("REPORT_MAX_CONCURRENT_RENDERS", str(RENDER_WORKERS)))
+# Background jobs queued or running before new ones are refused
+MAX_PENDING_JOBS = int(os.getenv("REPORT_MAX_PENDING_JOBS", "100"))
+MAX_TRACKED_JOBS = 1000
+
+
+class RenderQueueFull(Exception):
+    """Too many report jobs are already waiting"""
+
+
+def render_pdf(report_data: Dict[str, Any]) -> bytes:
+    """Runs in a pool worker"""
+    return ReportGenerator.generate_pdf(report_data)
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_render_slots: Optional[asyncio.Semaphore] = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Process pool, started on first render (spawned workers import only ReportLab)"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def render(report_data: Dict[str, Any], started: Optional[Callable[[], None]] = None) -> bytes:
+    """
+    Render a PDF in the pool, waiting for a free slot while
+    MAX_CONCURRENT_RENDERS are busy; `started` is called once a slot is taken
+    """
+    global _render_slots
+    if _render_slots is None:
+        _render_slots = asyncio.Semaphore(MAX_CONCURRENT_RENDERS)
+    async with _render_slots:
+        if started is not None:
+            started()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(get_executor(), render_pdf, report_data)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed): start a fresh pool for the next render
+            shutdown_executor()
+            raise
+
+
+async def render_cached(assessment_id: int, report_data: Dict[str, Any],
+                        started: Optional[Callable[[], None]] = None) -> bytes:
+    """Render and store in the PDF cache"""
+    pdf = await render(report_data, started)
+    report_cache.put((assessment_id, ReportGenerator.TEMPLATE_VERSION), pdf)
+    return pdf
+
+
+class ReportJob:
+    """A background render of one assessment's report"""
+    
+    def __init__(self, assessment_id: int):
+        self.job_id = uuid.uuid4().hex
+        self.assessment_id = assessment_id
+        self.status = "queued"  # queued, running, done, failed
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+    
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "assessment_id": self.assessment_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "error": self.error
+        }
+
+
+class ReportJobService:
+    """
+    In-process registry of render jobs
+    Results live in the PDF cache, so a finished report can be downloaded
+    from any worker even if the job itself was tracked by another one
+    """
+    
+    # job_id -> job; oldest finished jobs are forgotten first
+    _jobs: "OrderedDict[str, ReportJob]" = OrderedDict()
+    
+    @classmethod
+    def pending(cls) -> int:
+        return sum(1 for job in cls._jobs.values() if job.status in ("queued", "running"))
+    
+    @classmethod
+    def submit(cls, assessment_id: int, report_data: Dict[str, Any]) -> ReportJob:
+        """Start rendering in the background; raises RenderQueueFull when the queue is at its cap"""
+        if cls.pending() >= MAX_PENDING_JOBS:
+            raise RenderQueueFull(f"{MAX_PENDING_JOBS} report jobs are already pending")
+        
+        job = ReportJob(assessment_id)
+        job.task = asyncio.create_task(cls.run(job, report_data))
+        cls._jobs[job.job_id] = job
+        cls.forget_finished()
+        return job
+    
+    @classmethod
+    def done_job(cls, assessment_id: int) -> ReportJob:
+        """Job record for a report that is already cached"""
+        job = ReportJob(assessment_id)
+        job.status = "done"
+        job.finished_at = job.created_at
+        cls._jobs[job.job_id] = job
+        cls.forget_finished()
+        return job
+    
+    @staticmethod
+    async def run(job: ReportJob, report_data: Dict[str, Any]) -> None:
+        def started():
+            job.status = "running"
+        
+        try:
+            await render_cached(job.assessment_id, report_data, started)
+            job.status = "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now()
+            job.task = None
+    
+    @classmethod
+    def get(cls, job_id: str) -> Optional[ReportJob]:
+        return cls._jobs.get(job_id)
+    
+    @classmethod
+    def forget_finished(cls) -> None:
+        """Drop the oldest finished jobs once more than MAX_TRACKED_JOBS are tracked"""
+        excess = len(cls._jobs) - MAX_TRACKED_JOBS
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in cls._jobs.items() if job.finished_at][:excess]:
+            del cls._jobs[job_id]
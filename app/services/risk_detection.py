@@ -1,10 +1,12 @@
-import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.mixture import GaussianMixture
-import hdbscan
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Union, TYPE_CHECKING
 from app.services.feature_engineering import FeatureEngineer
 
+if TYPE_CHECKING:
+    import numpy as np
+
+# NumPy and the phenotype model are imported on first use (or in warmup()),
+# so importing the API doesn't pay for the ML stack.
+
 class PCOSRiskDetector:
     """Hybrid rule-based + ML clustering for PCOS risk detection"""
     
@@ -15,12 +17,72 @@ class PCOSRiskDetector:
         "Post-Pill PCOS"
     ]
     
+    RISK_LEVELS = ["Low", "Moderate", "High"]
+    RISK_LEVEL_BOUNDS = [30, 60]
+    
+    # Linear scores as (feature weights, intercept); mirrors rule_based_screening
+    # and cluster_phenotype. (1 - x) terms are folded into the intercept.
+    LINEAR_SCORES = [
+        ("initial_risk", {
+            'cycle_irregularity': 0.3, 'hyperandrogenism': 0.25, 'metabolic_risk': 0.2,
+            'ovulation_risk': 0.15, 'lifestyle_risk': 0.1
+        }, 0.0),
+        ("Insulin-resistant PCOS", {
+            'metabolic_risk': 0.4, 'bmi': 0.3, 'cycle_irregularity': 0.2, 'ovulation_risk': 0.1
+        }, 0.0),
+        ("Inflammatory PCOS", {
+            'hyperandrogenism': 0.4, 'metabolic_risk': 0.3, 'lifestyle_risk': 0.3
+        }, 0.0),
+        ("Adrenal PCOS", {
+            'lifestyle_risk': 0.5, 'cycle_irregularity': 0.3, 'ovulation_risk': 0.2
+        }, 0.0),
+        ("Post-Pill PCOS", {
+            'cycle_irregularity': 0.3, 'metabolic_risk': -0.2, 'hyperandrogenism': -0.2,
+            'ovulation_risk': 0.1, 'lifestyle_risk': -0.2
+        }, 0.6),
+        ("Post-Pill PCOS (birth control)", {
+            'cycle_irregularity': 0.5, 'ovulation_risk': 0.3, 'metabolic_risk': -0.1,
+            'hyperandrogenism': -0.1
+        }, 0.2)
+    ]
+    
     def __init__(self):
-        self.feature_names = [
-            'bmi', 'cycle_irregularity', 'ovulation_risk', 'hyperandrogenism',
-            'metabolic_risk', 'lifestyle_risk', 'cycle_length_norm',
-            'family_history', 'age_norm', 'cycles_completeness', 'missed_periods_norm'
-        ]
+        self.feature_names = list(FeatureEngineer.MODEL_FEATURES)
+        self._coefficient_matrix = None
+        self._phenotype_model = None
+        self._phenotype_model_loaded = False
+    
+    @property
+    def phenotype_model(self):
+        """Pretrained clustering artifact (train_phenotype_model.py); None = rules only"""
+        if not self._phenotype_model_loaded:
+            from app.services.phenotype_model import load_phenotype_model
+            self._phenotype_model = load_phenotype_model()
+            self._phenotype_model_loaded = True
+        return self._phenotype_model
+    
+    def warmup(self) -> None:
+        """Load NumPy, the coefficient matrix and the phenotype model ahead of the first request"""
+        self.coefficient_matrix()
+        _ = self.phenotype_model
+    
+    def coefficient_matrix(self) -> Tuple['np.ndarray', 'np.ndarray']:
+        """The (features x scores) weight matrix and intercept vector, built once"""
+        if self._coefficient_matrix is None:
+            self._coefficient_matrix = self._build_coefficient_matrix()
+        return self._coefficient_matrix
+    
+    def _build_coefficient_matrix(self) -> Tuple['np.ndarray', 'np.ndarray']:
+        """Build the (features x scores) weight matrix and intercept vector"""
+        import numpy as np
+        
+        coefficients = np.zeros((len(self.feature_names), len(self.LINEAR_SCORES)))
+        intercepts = np.zeros(len(self.LINEAR_SCORES))
+        for col, (_, weights, intercept) in enumerate(self.LINEAR_SCORES):
+            for name, weight in weights.items():
+                coefficients[self.feature_names.index(name), col] = weight
+            intercepts[col] = intercept
+        return coefficients, intercepts
     
     def rule_based_screening(self, features: Dict[str, float]) -> Tuple[bool, float]:
         """
@@ -49,15 +111,29 @@ class PCOSRiskDetector:
     def cluster_phenotype(self, features: Dict[str, float], taken_birth_control: bool = False) -> Tuple[str, float]:
         """
         Step 2: Unsupervised ML clustering
-        Uses HDBSCAN, KMeans, and Gaussian Mixture for phenotype identification
+        Assigns the sample to the pretrained Gaussian mixture (KMeans-seeded, with
+        HDBSCAN outlier detection); confidence is the soft membership.
+        Falls back to rule-based scores when no model is trained, the sample is
+        an outlier, or birth control history points to Post-Pill PCOS (which the
+        feature space can't express).
         Returns: (phenotype_type, confidence_score)
         """
-        # Convert features to array
-        feature_vector = np.array([features[name] for name in self.feature_names]).reshape(1, -1)
+        post_pill_override = taken_birth_control and features['cycle_irregularity'] > 0.4
         
-        # For single sample, we need to use a different approach
-        # We'll use a rule-based phenotype assignment based on feature patterns
+        if self.phenotype_model is not None and not post_pill_override:
+            import numpy as np
+            feature_vector = np.array([features[name] for name in self.feature_names]).reshape(1, -1)
+            phenotypes, confidences, assigned = self.phenotype_model.predict(feature_vector)
+            if assigned[0]:
+                return str(phenotypes[0]), max(float(confidences[0]), 0.5)
         
+        return self.rule_based_phenotype(features, taken_birth_control)
+    
+    def rule_based_phenotype(self, features: Dict[str, float], taken_birth_control: bool = False) -> Tuple[str, float]:
+        """
+        Rule-based phenotype assignment based on feature patterns
+        Returns: (phenotype_type, confidence_score)
+        """
         # Calculate phenotype scores based on medical PCOS types
         # 1. Insulin-resistant PCOS (most common)
         insulin_resistant_score = (
@@ -149,3 +225,53 @@ class PCOSRiskDetector:
             'high_suspicion': high_suspicion
         }
 
+    
+    def detect_risk_batch(self, features: 'np.ndarray',
+                          taken_birth_control: Union[bool, 'np.ndarray'] = False) -> Dict[str, 'np.ndarray']:
+        """
+        Vectorized detect_risk for an (N, 11) feature matrix in feature_names order
+        (see FeatureEngineer.engineer_features_batch)
+        Returns a dict of length-N arrays with the same keys as detect_risk
+        """
+        import numpy as np
+        
+        X = np.atleast_2d(np.asarray(features, dtype=float))
+        n_samples = X.shape[0]
+        birth_control = np.broadcast_to(np.asarray(taken_birth_control, dtype=bool), (n_samples,))
+        
+        # All linear scores in one matmul
+        coefficients, intercepts = self.coefficient_matrix()
+        scores = X @ coefficients + intercepts
+        initial_risk = scores[:, 0] * 100
+        
+        cycle_irregularity = X[:, self.feature_names.index('cycle_irregularity')]
+        hyperandrogenism = X[:, self.feature_names.index('hyperandrogenism')]
+        high_suspicion = (cycle_irregularity > 0.5) & (hyperandrogenism > 0.4)
+        
+        # Post-pill score depends on birth control history
+        post_pill = np.where(birth_control, scores[:, 5], scores[:, 4])
+        boosted = birth_control & (cycle_irregularity > 0.4)
+        post_pill = np.where(boosted, np.minimum(post_pill * 1.5, 1.0), post_pill)
+        
+        phenotype_scores = np.column_stack([scores[:, 1], scores[:, 2], scores[:, 3], post_pill])
+        dominant = np.argmax(phenotype_scores, axis=1)
+        phenotype = np.array(self.PHENOTYPES)[dominant]
+        confidence = np.maximum(phenotype_scores[np.arange(n_samples), dominant], 0.5)
+        
+        # Pretrained clustering where available (same fallbacks as cluster_phenotype)
+        if self.phenotype_model is not None:
+            model_phenotype, model_confidence, assigned = self.phenotype_model.predict(X)
+            use_model = assigned & ~boosted
+            phenotype = np.where(use_model, model_phenotype, phenotype)
+            confidence = np.where(use_model, np.maximum(model_confidence, 0.5), confidence)
+        
+        final_risk_score = initial_risk * confidence
+        level_index = np.digitize(final_risk_score, self.RISK_LEVEL_BOUNDS)
+        
+        return {
+            'risk_level': np.array(self.RISK_LEVELS)[level_index],
+            'phenotype': phenotype,
+            'confidence_score': confidence,
+            'risk_score': final_risk_score,
+            'high_suspicion': high_suspicion
+        }
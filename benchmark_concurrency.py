@@ -0,0 +1,180 @@
+"""
+Concurrency benchmark for the tracker endpoints
+Run this against a running backend to measure latency under mixed load.
+
+Usage:
+  python benchmark_concurrency.py --label before --output before.json   (on the old build)
+  python benchmark_concurrency.py --label after --output after.json     (on the new build)
+  python benchmark_concurrency.py --compare before.json after.json
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import requests
+
+BASE_URL = "http://localhost:8000"
+
+# (name, method, path template, weight): reads dominate, with some writes mixed in
+MIXED_LOAD = [
+    ("health-score", "GET", "/api/v1/health-score/{user_id}", 3),
+    ("period-history", "GET", "/api/v1/period/history/{user_id}", 2),
+    ("period-prediction", "GET", "/api/v1/period/prediction/{user_id}", 2),
+    ("mental-insights", "GET", "/api/v1/mental-health/insights/{user_id}", 2),
+    ("monthly-report", "GET", "/api/v1/report/monthly/{user_id}", 1),
+    ("quiz-questions", "GET", "/api/v1/quiz/questions", 2),
+    ("mental-add", "POST", "/api/v1/mental-health/add", 1),
+    ("health", "GET", "/health", 1),
+]
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def seed_users(base_url: str, users: list) -> None:
+    """Give each benchmark user a few period and mental health logs"""
+    for user_id in users:
+        start = date.today() - timedelta(days=120)
+        for i in range(4):
+            requests.post(f"{base_url}/api/v1/period/add", json={
+                "user_id": user_id,
+                "start_date": (start + timedelta(days=29 * i)).isoformat(),
+                "flow_type": "normal",
+                "pain_level": 4,
+                "mood": "normal"
+            })
+        for _ in range(10):
+            requests.post(f"{base_url}/api/v1/mental-health/add", json=mental_log(user_id))
+
+
+def mental_log(user_id: str) -> dict:
+    return {
+        "user_id": user_id,
+        "stress_level": random.randint(1, 10),
+        "mood_type": random.choice(["happy", "calm", "anxious", "irritable"]),
+        "sleep_hours": round(random.uniform(5, 9), 1),
+        "energy_level": random.randint(1, 10)
+    }
+
+
+def run_benchmark(base_url: str, concurrency: int, duration: float, users: list) -> dict:
+    """Hammer the API with a weighted endpoint mix and record per-request latency"""
+    latencies = {name: [] for name, _, _, _ in MIXED_LOAD}
+    errors = {name: 0 for name, _, _, _ in MIXED_LOAD}
+    lock = threading.Lock()
+    weights = [weight for _, _, _, weight in MIXED_LOAD]
+    deadline = time.perf_counter() + duration
+    
+    def worker():
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            name, method, path, _ = random.choices(MIXED_LOAD, weights=weights)[0]
+            user_id = random.choice(users)
+            url = base_url + path.format(user_id=user_id)
+            start = time.perf_counter()
+            try:
+                if method == "POST":
+                    response = session.post(url, json=mental_log(user_id))
+                else:
+                    response = session.get(url)
+                ok = response.status_code < 500
+            except requests.RequestException:
+                ok = False
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies[name].append(elapsed_ms)
+                if not ok:
+                    errors[name] += 1
+    
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    
+    all_latencies = [ms for values in latencies.values() for ms in values]
+    summary = {
+        name: {
+            "requests": len(values),
+            "errors": errors[name],
+            "p50_ms": percentile(values, 50),
+            "p95_ms": percentile(values, 95),
+            "p99_ms": percentile(values, 99)
+        }
+        for name, values in latencies.items()
+    }
+    summary["overall"] = {
+        "requests": len(all_latencies),
+        "errors": sum(errors.values()),
+        "p50_ms": percentile(all_latencies, 50),
+        "p95_ms": percentile(all_latencies, 95),
+        "p99_ms": percentile(all_latencies, 99),
+        "throughput_rps": len(all_latencies) / duration
+    }
+    return summary
+
+
+def print_summary(label: str, summary: dict) -> None:
+    print(f"\n{label}")
+    print(f"{'endpoint':<20}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in summary.items():
+        print(f"{name:<20}{stats['requests']:>10}{stats['errors']:>8}"
+              f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+
+
+def compare(before_path: str, after_path: str) -> None:
+    """Print p99 latency before vs after for each endpoint"""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    
+    print(f"{'endpoint':<20}{'before p99':>12}{'after p99':>12}{'change':>10}")
+    for name in before["results"]:
+        if name not in after["results"]:
+            continue
+        old = before["results"][name]["p99_ms"]
+        new = after["results"][name]["p99_ms"]
+        change = f"{(new - old) / old * 100:+.0f}%" if old else "n/a"
+        print(f"{name:<20}{old:>12.1f}{new:>12.1f}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mixed-load latency benchmark")
+    parser.add_argument("--url", default=BASE_URL)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    args = parser.parse_args()
+    
+    if args.compare:
+        compare(*args.compare)
+        return
+    
+    users = [f"bench-user-{i}" for i in range(args.users)]
+    print(f"Seeding {len(users)} users...")
+    seed_users(args.url, users)
+    
+    print(f"Running {args.concurrency} clients for {args.duration:.0f}s against {args.url}...")
+    summary = run_benchmark(args.url, args.concurrency, args.duration, users)
+    print_summary(args.label, summary)
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"label": args.label, "concurrency": args.concurrency, "results": summary}, f, indent=2)
+        print(f"\n✓ Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Pre-generate monthly progress reports
+Schedule this at the start of each month (e.g. cron `0 2 1 * *`) so the
+/report/monthly endpoint serves stored reports instead of recomputing them
+for every user at once. Safe to re-run: existing rows are overwritten.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from app.database import SessionLocal, engine, Base
+from app.models import Assessment, PeriodLog, MentalHealthLog, MonthlyReport
+from app.services.report_progress import MonthlyReportData, MonthlyReportStore, ProgressReportService
+from sqlalchemy import select, union
+
+# Create the monthly_reports table if it doesn't exist yet
+Base.metadata.create_all(bind=engine)
+
+CHUNK_SIZE = 500
+ACTIVE_DAYS = 60  # Users with an assessment or log this recent get a report
+WORKERS = int(os.getenv("REPORT_WORKERS", os.cpu_count() or 1))
+
+
+def active_user_ids(db, now: datetime):
+    """Users with recent assessments, period logs or mental health logs"""
+    since = now - timedelta(days=ACTIVE_DAYS)
+    users = union(*(
+        select(model.user_id).where(model.created_at >= since)
+        for model in (Assessment, PeriodLog, MentalHealthLog)
+    )).subquery()
+    return db.scalars(select(users.c.user_id).order_by(users.c.user_id)).all()
+
+
+def generate_chunk(db, pool: ProcessPoolExecutor, user_ids, now: datetime) -> None:
+    """Load a chunk of users with `IN` queries, build reports in the pool and store them"""
+    data = MonthlyReportData.from_results(
+        user_ids, now, [db.execute(statement) for statement in MonthlyReportData.statements(user_ids, now)]
+    )
+    stamps = MonthlyReportStore.source_stamps(
+        user_ids, [db.execute(statement) for statement in MonthlyReportStore.source_stamp_statements(user_ids)]
+    )
+    reports = pool.map(ProgressReportService.build_report, [data[user_id] for user_id in user_ids],
+                       chunksize=max(1, len(user_ids) // (WORKERS * 4)))
+    
+    month = MonthlyReportStore.month_start(now)
+    stored = {
+        report.user_id: report for report in db.scalars(
+            select(MonthlyReport).where(
+                MonthlyReport.user_id.in_(user_ids),
+                MonthlyReport.month == month
+            )
+        )
+    }
+    for user_id, report in zip(user_ids, reports):
+        db.add(MonthlyReportStore.store(stored.get(user_id), user_id, month, report, stamps[user_id], now))
+    db.commit()
+
+
+def generate_monthly_reports():
+    """Build and store this month's report for every active user"""
+    db = SessionLocal()
+    now = datetime.now()
+    
+    try:
+        user_ids = active_user_ids(db, now)
+        users = 0
+        with ProcessPoolExecutor(max_workers=WORKERS) as pool:
+            for start in range(0, len(user_ids), CHUNK_SIZE):
+                chunk = user_ids[start:start + CHUNK_SIZE]
+                generate_chunk(db, pool, chunk, now)
+                users += len(chunk)
+                print(f"  ... {users}/{len(user_ids)} users")
+        
+        print(f"✓ Generated monthly reports for {users} users")
+    
+    except Exception as e:
+        print(f"❌ Error generating monthly reports: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("🔄 Generating Monthly Progress Reports...")
+    print("=" * 50)
+    generate_monthly_reports()
+    print("=" * 50)
+    print("✓ Done!")
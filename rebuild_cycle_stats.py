@@ -0,0 +1,54 @@
+"""
+Rebuild per-user cycle statistics
+Run this once after upgrading (and any time period_logs are edited by hand)
+to recompute the user_cycle_stats table from existing period logs.
+"""
+
+from itertools import groupby
+from app.database import SessionLocal, engine, Base
+from app.models import PeriodLog
+from app.services.period_tracker import CycleStatistics
+from sqlalchemy import select
+
+# Create the user_cycle_stats table if it doesn't exist yet
+Base.metadata.create_all(bind=engine)
+
+BATCH_SIZE = 1000
+
+
+def rebuild_cycle_stats():
+    """Recompute running cycle stats for every user with period logs"""
+    db = SessionLocal()
+    
+    try:
+        rows = db.execute(
+            select(PeriodLog.user_id, PeriodLog.start_date)
+            .order_by(PeriodLog.user_id, PeriodLog.start_date)
+            .execution_options(yield_per=BATCH_SIZE)
+        )
+        
+        users = 0
+        for user_id, user_rows in groupby(rows, key=lambda row: row.user_id):
+            start_dates = [row.start_date for row in user_rows]
+            db.merge(CycleStatistics.accumulate(user_id, start_dates))
+            users += 1
+            if users % BATCH_SIZE == 0:
+                db.flush()
+                print(f"  ... {users} users")
+        
+        db.commit()
+        print(f"✓ Rebuilt cycle stats for {users} users")
+        
+    except Exception as e:
+        print(f"❌ Error rebuilding cycle stats: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("🔄 Rebuilding Cycle Statistics...")
+    print("=" * 50)
+    rebuild_cycle_stats()
+    print("=" * 50)
+    print("✓ Done!")
@@ -0,0 +1,56 @@
+"""
+Rebuild mental health rollups
+Run this once after upgrading (and any time mental_health_logs are edited by
+hand) to recompute the daily and weekly rollup tables from existing logs.
+"""
+
+from itertools import groupby
+from app.database import SessionLocal, engine, Base
+from app.models import MentalHealthLog, MentalHealthDailyRollup, MentalHealthWeeklyRollup
+from app.services.mental_health_rollups import MentalHealthRollupService
+from sqlalchemy import select, delete
+
+# Create the rollup tables if they don't exist yet
+Base.metadata.create_all(bind=engine)
+
+BATCH_SIZE = 1000
+
+
+def rebuild_mental_health_rollups():
+    """Recompute daily and weekly rollups for every user with mental health logs"""
+    db = SessionLocal()
+    
+    try:
+        db.execute(delete(MentalHealthDailyRollup))
+        db.execute(delete(MentalHealthWeeklyRollup))
+        
+        logs = db.scalars(
+            select(MentalHealthLog)
+            .order_by(MentalHealthLog.user_id, MentalHealthLog.created_at)
+            .execution_options(yield_per=BATCH_SIZE)
+        )
+        
+        users = 0
+        for user_id, user_logs in groupby(logs, key=lambda log: log.user_id):
+            db.add_all(MentalHealthRollupService.accumulate(user_id, user_logs))
+            users += 1
+            if users % BATCH_SIZE == 0:
+                db.flush()
+                print(f"  ... {users} users")
+        
+        db.commit()
+        print(f"✓ Rebuilt mental health rollups for {users} users")
+        
+    except Exception as e:
+        print(f"❌ Error rebuilding mental health rollups: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("🔄 Rebuilding Mental Health Rollups...")
+    print("=" * 50)
+    rebuild_mental_health_rollups()
+    print("=" * 50)
+    print("✓ Done!")
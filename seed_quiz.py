@@ -14,22 +14,26 @@ QUIZ_QUESTIONS = [
     {
         "question": "What does PCOS stand for?",
         "options": ["Polycystic Ovary Syndrome", "Polycystic Ovarian System", "Poly Cystic Organ Syndrome", "Polycystic Ovulation Syndrome"],
-        "correct_answer": "Polycystic Ovary Syndrome"
+        "correct_answer": "Polycystic Ovary Syndrome",
+        "topic": "basics"
     },
     {
         "question": "Which hormone imbalance is most commonly associated with PCOS?",
         "options": ["Estrogen", "Progesterone", "Androgens (male hormones)", "Thyroid hormones"],
-        "correct_answer": "Androgens (male hormones)"
+        "correct_answer": "Androgens (male hormones)",
+        "topic": "basics"
     },
     {
         "question": "What percentage of women of reproductive age are affected by PCOS?",
         "options": ["1-3%", "5-10%", "15-20%", "25-30%"],
-        "correct_answer": "5-10%"
+        "correct_answer": "5-10%",
+        "topic": "basics"
     },
     {
         "question": "Which of the following is NOT a common symptom of PCOS?",
         "options": ["Irregular periods", "Excessive hair growth", "Weight gain", "Frequent headaches"],
-        "correct_answer": "Frequent headaches"
+        "correct_answer": "Frequent headaches",
+        "topic": "symptoms"
     },
     {
         "question": "What is insulin resistance in relation to PCOS?",
@@ -39,27 +43,32 @@ QUIZ_QUESTIONS = [
             "When insulin levels are too low",
             "When the pancreas stops working"
         ],
-        "correct_answer": "When cells don't respond properly to insulin"
+        "correct_answer": "When cells don't respond properly to insulin",
+        "topic": "symptoms"
     },
     {
         "question": "Which lifestyle change is most recommended for managing PCOS?",
         "options": ["Increasing sugar intake", "Regular exercise and balanced diet", "Avoiding all carbohydrates", "Taking vitamin supplements only"],
-        "correct_answer": "Regular exercise and balanced diet"
+        "correct_answer": "Regular exercise and balanced diet",
+        "topic": "management"
     },
     {
         "question": "Can PCOS affect fertility?",
         "options": ["No, it has no effect", "Yes, it can make it harder to conceive", "Only in severe cases", "It improves fertility"],
-        "correct_answer": "Yes, it can make it harder to conceive"
+        "correct_answer": "Yes, it can make it harder to conceive",
+        "topic": "health_risks"
     },
     {
         "question": "What is the Rotterdam criteria used for?",
         "options": ["Treating PCOS", "Diagnosing PCOS", "Preventing PCOS", "Curing PCOS"],
-        "correct_answer": "Diagnosing PCOS"
+        "correct_answer": "Diagnosing PCOS",
+        "topic": "diagnosis"
     },
     {
         "question": "Which type of diet is often recommended for PCOS management?",
         "options": ["High sugar diet", "Low glycemic index diet", "High fat diet", "Liquid diet only"],
-        "correct_answer": "Low glycemic index diet"
+        "correct_answer": "Low glycemic index diet",
+        "topic": "management"
     },
     {
         "question": "Is PCOS curable?",
@@ -69,7 +78,8 @@ QUIZ_QUESTIONS = [
             "No, but symptoms can be managed",
             "Yes, it goes away on its own"
         ],
-        "correct_answer": "No, but symptoms can be managed"
+        "correct_answer": "No, but symptoms can be managed",
+        "topic": "management"
     },
     {
         "question": "What role does stress play in PCOS?",
@@ -79,12 +89,14 @@ QUIZ_QUESTIONS = [
             "It cures PCOS",
             "It only affects mood"
         ],
-        "correct_answer": "It can worsen symptoms"
+        "correct_answer": "It can worsen symptoms",
+        "topic": "management"
     },
     {
         "question": "Which specialist should you consult for PCOS?",
         "options": ["Cardiologist", "Dermatologist", "Gynecologist or Endocrinologist", "Neurologist"],
-        "correct_answer": "Gynecologist or Endocrinologist"
+        "correct_answer": "Gynecologist or Endocrinologist",
+        "topic": "diagnosis"
     },
     {
         "question": "Can PCOS increase the risk of other health conditions?",
@@ -94,7 +106,8 @@ QUIZ_QUESTIONS = [
             "Only in older women",
             "Only if untreated for 10+ years"
         ],
-        "correct_answer": "Yes, including diabetes and heart disease"
+        "correct_answer": "Yes, including diabetes and heart disease",
+        "topic": "health_risks"
     },
     {
         "question": "What is hirsutism?",
@@ -104,7 +117,8 @@ QUIZ_QUESTIONS = [
             "Premature graying",
             "Brittle hair"
         ],
-        "correct_answer": "Excessive hair growth in a male pattern"
+        "correct_answer": "Excessive hair growth in a male pattern",
+        "topic": "symptoms"
     },
     {
         "question": "Which blood test is commonly used to diagnose PCOS?",
@@ -114,7 +128,8 @@ QUIZ_QUESTIONS = [
             "Cholesterol test",
             "Liver function test"
         ],
-        "correct_answer": "Hormone level tests"
+        "correct_answer": "Hormone level tests",
+        "topic": "diagnosis"
     }
 ]
 
@@ -144,7 +159,8 @@ def seed_quiz_questions():
             question = QuizQuestion(
                 question=q_data["question"],
                 options=json.dumps(q_data["options"]),  # Store as JSON string
-                correct_answer=q_data["correct_answer"]
+                correct_answer=q_data["correct_answer"],
+                topic=q_data["topic"]
             )
             db.add(question)
         
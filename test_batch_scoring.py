@@ -0,0 +1,135 @@
+"""
+Parity checks for the vectorized batch scoring path
+Run this to verify batch results match the single-assessment path
+"""
+
+import json
+import os
+import random
+import tempfile
+import numpy as np
+import pandas as pd
+from app.services.feature_engineering import FeatureEngineer
+from app.services.phenotype_model import PhenotypeModel
+from app.services.risk_detection import PCOSRiskDetector
+
+
+def make_cohort(size: int = 500, seed: int = 42) -> list:
+    """Generate random raw assessment inputs covering every branch"""
+    rng = random.Random(seed)
+    cohort = []
+    for _ in range(size):
+        cohort.append({
+            "age": rng.randint(13, 60),
+            "height_cm": rng.uniform(140, 190),
+            "weight_kg": rng.uniform(35, 130),
+            "family_history_pcos": rng.random() < 0.3,
+            "cycle_length_avg": rng.choice([18, 21, 22, 24, 28, 32, 33, 35, 40, rng.uniform(15, 60)]),
+            "cycles_last_12_months": rng.randint(0, 12),
+            "missed_period_frequency": rng.randint(0, 15),
+            "taken_birth_control_pills": rng.random() < 0.4,
+            "acne_severity": rng.randint(0, 5),
+            "facial_hair_growth": rng.randint(0, 5),
+            "hair_thinning": rng.randint(0, 5),
+            "dark_patches_skin": rng.random() < 0.3,
+            "sudden_weight_gain": rng.random() < 0.3,
+            "fatigue_level": rng.randint(0, 5),
+            "sugar_cravings": rng.randint(0, 5),
+            "stress_level": rng.randint(0, 10),
+            "sleep_hours": rng.choice([5, 6, 6.5, 7, 8, 9, 9.5, 10, 11, rng.uniform(3, 12)]),
+            "exercise_days_per_week": rng.randint(0, 7),
+        })
+    return cohort
+
+
+def test_feature_batch_matches_scalar():
+    """Batch feature matrix must match engineer_features row by row"""
+    cohort = make_cohort()
+    
+    expected = np.array([
+        [FeatureEngineer.engineer_features(row)[name] for name in FeatureEngineer.MODEL_FEATURES]
+        for row in cohort
+    ])
+    batch = FeatureEngineer.engineer_features_batch(pd.DataFrame(cohort))
+    
+    assert batch.shape == (len(cohort), len(FeatureEngineer.MODEL_FEATURES))
+    np.testing.assert_allclose(batch, expected, rtol=1e-12, atol=0)
+    
+    # Columnar numpy input gives the same result as a DataFrame
+    columns = {key: np.array([row[key] for row in cohort]) for key in cohort[0]}
+    np.testing.assert_array_equal(FeatureEngineer.engineer_features_batch(columns), batch)
+
+
+def test_risk_batch_matches_scalar():
+    """detect_risk_batch must agree with detect_risk for every sample"""
+    cohort = make_cohort()
+    detector = PCOSRiskDetector()
+    
+    birth_control = np.array([row["taken_birth_control_pills"] for row in cohort])
+    batch = detector.detect_risk_batch(
+        FeatureEngineer.engineer_features_batch(pd.DataFrame(cohort)),
+        taken_birth_control=birth_control
+    )
+    
+    for i, row in enumerate(cohort):
+        expected = detector.detect_risk(
+            FeatureEngineer.engineer_features(row),
+            taken_birth_control=row["taken_birth_control_pills"]
+        )
+        assert batch['phenotype'][i] == expected['phenotype']
+        assert batch['risk_level'][i] == expected['risk_level']
+        assert batch['high_suspicion'][i] == expected['high_suspicion']
+        assert abs(batch['confidence_score'][i] - expected['confidence_score']) < 1e-9
+        assert abs(batch['risk_score'][i] - expected['risk_score']) < 1e-9
+
+
+def test_phenotype_model_noise_cutoff():
+    """Outliers are the samples whose mixture likelihood falls below the trained cutoff"""
+    n_features = len(FeatureEngineer.MODEL_FEATURES)
+    means = np.stack([np.full(n_features, 0.2), np.full(n_features, 0.8)])
+    precisions_cholesky = np.stack([np.eye(n_features) * 10, np.eye(n_features) * 10])
+    weights = np.array([0.5, 0.5])
+    
+    def log_likelihood(x):
+        densities = [
+            w * np.exp(-0.5 * np.sum(((x - m) * 10) ** 2)) * 10 ** n_features / (2 * np.pi) ** (n_features / 2)
+            for m, w in zip(means, weights)
+        ]
+        return np.log(sum(densities))
+    
+    near, far = np.full(n_features, 0.25), np.full(n_features, 0.5)
+    with tempfile.TemporaryDirectory() as path:
+        np.save(os.path.join(path, "means.npy"), means)
+        np.save(os.path.join(path, "precisions_cholesky.npy"), precisions_cholesky)
+        np.save(os.path.join(path, "weights.npy"), weights)
+        with open(os.path.join(path, "manifest.json"), "w") as f:
+            json.dump({
+                "version": "test",
+                "feature_names": list(FeatureEngineer.MODEL_FEATURES),
+                "phenotypes": PCOSRiskDetector.PHENOTYPES,
+                "component_phenotypes": PCOSRiskDetector.PHENOTYPES[:2],
+                "hdbscan": True,
+                "noise_log_likelihood": float((log_likelihood(near) + log_likelihood(far)) / 2)
+            }, f)
+        model = PhenotypeModel(path)
+        
+        membership, scores = model.score(np.stack([near, far]))
+        assert np.allclose(scores, [log_likelihood(near), log_likelihood(far)])
+        phenotypes, _, assigned = model.predict(np.stack([near, far]))
+        assert phenotypes[0] == PCOSRiskDetector.PHENOTYPES[0]
+        assert assigned.tolist() == [True, False]
+        assert model.clusterer is None
+
+
+if __name__ == "__main__":
+    print("Testing batch feature engineering...")
+    test_feature_batch_matches_scalar()
+    print("✅ Batch features match the scalar path")
+    
+    print("Testing batch risk detection...")
+    test_risk_batch_matches_scalar()
+    print("✅ Batch risk detection matches the scalar path")
+    
+    print("Testing phenotype model outlier cutoff...")
+    test_phenotype_model_noise_cutoff()
+    print("✅ Outliers flagged by the likelihood cutoff")
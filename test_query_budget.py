@@ -0,0 +1,576 @@
+"""
+Query-count regression checks
+Runs service calls against an in-memory SQLite database and pins how many
+SQL statements each one issues.
+"""
+
+import asyncio
+import json
+import os
+from datetime import date, datetime, timedelta, timezone
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+from app.models import Assessment, PeriodLog, MentalHealthLog, QuizQuestion, HealthScoreSnapshot, UserCycleStats
+from app.services.health_score_engine import HealthScoreEngine
+from app.services.mental_health_tracker import MentalHealthTrackerService
+from app.services.mental_health_rollups import MentalHealthRollupService
+from app.services.cycle_phase import CyclePhaseEngine
+from app.services.period_tracker import PeriodTrackerService, CycleStatistics
+from app.services.quiz_engine import QuizEngineService
+from app.services import quiz_bank
+from app.services.diet_personalizer import DietPersonalizerService
+from app.services import meal_planner
+from app.services.report_progress import ProgressReportService, MonthlyReportData, MonthlyReportStore
+
+USER_ID = "budget-user"
+
+
+class QueryCounter:
+    """Counts statements sent to the database"""
+    
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+    
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+async def make_database():
+    """Fresh in-memory database with all tables"""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, async_sessionmaker(engine, expire_on_commit=False)
+
+
+async def seed_user(db, user_id: str = USER_ID) -> None:
+    """One assessment, a few period logs and two weeks of mental health logs with their rollups"""
+    now = datetime.now()
+    db.add(Assessment(
+        user_id=user_id, created_at=now, age=28, height_cm=165, weight_kg=70,
+        family_history_pcos=False, cycle_length_avg=32, cycles_last_12_months=10,
+        missed_period_frequency=2, period_flow_type="normal", taken_birth_control_pills=False,
+        acne_severity=2, facial_hair_growth=1, hair_thinning=1, dark_patches_skin=False,
+        sudden_weight_gain=False, fatigue_level=3, sugar_cravings=2, stress_level=6,
+        sleep_hours=7, exercise_days_per_week=3, diet_type="vegetarian",
+        risk_level="Moderate", phenotype="Insulin-resistant PCOS",
+        confidence_score=0.6, risk_score=40.0
+    ))
+    for i in range(4):
+        db.add(PeriodLog(
+            user_id=user_id, created_at=now - timedelta(days=10 * i),
+            start_date=date.today() - timedelta(days=30 * i),
+            flow_type="normal", pain_level=4, mood="normal"
+        ))
+    logs = [
+        MentalHealthLog(
+            user_id=user_id, created_at=now - timedelta(days=i),
+            stress_level=3 + i % 6, mood_type="calm", sleep_hours=6 + i % 3, energy_level=5
+        )
+        for i in range(14)
+    ]
+    db.add_all(logs)
+    db.add_all(MentalHealthRollupService.accumulate(user_id, logs))
+    await db.commit()
+
+
+async def count_queries(call) -> tuple:
+    """Seed a user, then run `call(db)` and return (result, statements issued)"""
+    engine, Session = await make_database()
+    try:
+        async with Session() as db:
+            await seed_user(db)
+            counter = QueryCounter(engine)
+            result = await call(db)
+        return result, counter.count
+    finally:
+        await engine.dispose()
+
+
+def test_health_score_query_budget():
+    """The health score endpoint loads its data in exactly three queries"""
+    result, queries = asyncio.run(count_queries(
+        lambda db: HealthScoreEngine.calculate_health_score(db, USER_ID)
+    ))
+    assert result["health_score"] > 0
+    assert queries == 3, f"health score issued {queries} queries"
+
+
+def test_health_snapshot_upsert():
+    """Refreshing today's snapshot overwrites a row another request already wrote, in one statement"""
+    
+    async def refresh(db):
+        # Written by a concurrent request this session has never seen
+        db.add(HealthScoreSnapshot(user_id=USER_ID, snapshot_date=date.today(), health_score=1, status="Low"))
+        await db.commit()
+        db.expunge_all()
+        
+        counter = QueryCounter(db.bind)
+        result = await HealthScoreEngine.refresh_snapshot(db, USER_ID)
+        await db.commit()
+        statements = counter.count
+        rows = (await db.scalars(select(HealthScoreSnapshot).where(HealthScoreSnapshot.user_id == USER_ID))).all()
+        return result, statements, rows
+    
+    (result, statements, rows), _ = asyncio.run(count_queries(refresh))
+    assert statements == 3 + 1, f"snapshot refresh issued {statements} statements"
+    assert len(rows) == 1
+    assert rows[0].health_score == result["health_score"] and rows[0].status == result["status"]
+
+
+def test_snapshot_updates_changed_components():
+    """A new log rescores only the components it feeds, and lands where a full recompute would"""
+    
+    async def update(db):
+        await HealthScoreEngine.refresh_snapshot(db, USER_ID)
+        await db.commit()
+        
+        counter = QueryCounter(db.bind)
+        statements = {}
+        for changed, log in (
+            ("mental", MentalHealthLog(
+                user_id=USER_ID, created_at=datetime.now(),
+                stress_level=10, mood_type="anxious", sleep_hours=4, energy_level=2
+            )),
+            ("period", PeriodLog(
+                user_id=USER_ID, start_date=date.today() + timedelta(days=45),
+                flow_type="normal", pain_level=4, mood="normal"
+            ))
+        ):
+            db.add(log)
+            await db.flush()
+            counter.count = 0
+            await HealthScoreEngine.refresh_snapshot(db, USER_ID, changed=changed)
+            await db.commit()
+            statements[changed] = counter.count
+        
+        stored = await db.scalar(select(HealthScoreSnapshot).where(HealthScoreSnapshot.user_id == USER_ID))
+        return HealthScoreEngine.snapshot_to_dict(stored), statements, await HealthScoreEngine.calculate_health_score(db, USER_ID)
+    
+    (stored, statements, full), _ = asyncio.run(count_queries(update))
+    assert stored == full
+    assert statements == {"mental": 3, "period": 3}, f"component updates issued {statements}"
+
+
+def test_bulk_snapshot_refresh():
+    """Bulk writes upsert every affected user's snapshot in a fixed number of statements"""
+    
+    async def refresh(db):
+        await seed_user(db, "batch-user")
+        db.add(HealthScoreSnapshot(user_id=USER_ID, snapshot_date=date.today(), health_score=1, status="Low"))
+        await db.commit()
+        
+        counter = QueryCounter(db.bind)
+        await HealthScoreEngine.refresh_snapshots(db, [USER_ID, "batch-user", "no-assessment-user"])
+        await db.commit()
+        statements = counter.count
+        
+        rows = (await db.scalars(select(HealthScoreSnapshot).order_by(HealthScoreSnapshot.user_id))).all()
+        expected = [await HealthScoreEngine.calculate_health_score(db, user_id) for user_id in ("batch-user", USER_ID)]
+        return rows, expected, statements
+    
+    (rows, expected, statements), _ = asyncio.run(count_queries(refresh))
+    assert statements == 3 + 1, f"bulk snapshot refresh issued {statements} statements"
+    assert [HealthScoreEngine.snapshot_to_dict(row) for row in rows] == expected
+    assert all(row.snapshot_date == date.today() for row in rows)
+
+
+def test_cycle_stats_created_race_free():
+    """The first period log creates the stats row; a row another request created first is kept"""
+    
+    async def log_periods(db):
+        await PeriodTrackerService.add_period_log(db, USER_ID, date.today() + timedelta(days=28), None, "normal", 3, "normal")
+        stats = await db.get(UserCycleStats, USER_ID)
+        start_dates = (await db.scalars(
+            select(PeriodLog.start_date).where(PeriodLog.user_id == USER_ID).order_by(PeriodLog.start_date)
+        )).all()
+        expected = CycleStatistics.accumulate(USER_ID, start_dates)
+        
+        # Created by a concurrent request after this one found no row
+        db.add(UserCycleStats(user_id="race-user", log_count=5, cycle_count=0, cycle_mean=0.0, cycle_m2=0.0))
+        await db.commit()
+        raced = await PeriodTrackerService.rebuild_cycle_stats(db, "race-user")
+        return stats, expected, raced
+    
+    (stats, expected, raced), _ = asyncio.run(count_queries(log_periods))
+    assert (stats.log_count, stats.cycle_count) == (expected.log_count, expected.cycle_count) == (5, 4)
+    assert abs(stats.cycle_mean - expected.cycle_mean) < 1e-9 and abs(stats.cycle_m2 - expected.cycle_m2) < 1e-9
+    assert raced.log_count == 5
+
+
+def test_mental_health_insights_query_budget():
+    """Insights read the 30-day window once; cycle phase averages are cached between logs"""
+    CyclePhaseEngine._cache.clear()
+    
+    async def insights_twice(db):
+        counter = QueryCounter(db.bind)
+        first = await MentalHealthTrackerService.generate_insights(db, USER_ID)
+        cold = counter.count
+        await MentalHealthTrackerService.generate_insights(db, USER_ID)
+        return first, cold, counter.count - cold
+    
+    (result, cold, warm), _ = asyncio.run(count_queries(insights_twice))
+    assert result["sleep_quality"] != "unknown"
+    assert cold == 4, f"mental health insights issued {cold} queries on a cold cache"
+    assert warm == 2, f"mental health insights issued {warm} queries on a warm cache"
+
+
+def test_cycle_phase_labels():
+    """Days are labelled by their position between period starts"""
+    starts = [date(2024, 1, 1), date(2024, 1, 29)]
+    days = [date(2023, 12, 30), date(2024, 1, 3), date(2024, 1, 10), date(2024, 1, 20),
+            date(2024, 1, 26), date(2024, 2, 22)]
+    labels = CyclePhaseEngine.label_days(starts, days, 28)
+    assert labels == [
+        None,
+        (3, "menstrual"),
+        (10, "follicular"),
+        (20, "luteal"),
+        (26, "pre-menstrual"),
+        (25, "pre-menstrual")
+    ]
+
+
+def test_cycle_phase_long_open_cycle():
+    """Days long after the last logged period are not forced into the pre-menstrual phase"""
+    last_start = date(2024, 1, 1)
+    days = [last_start + timedelta(days=offset) for offset in (25, 29, 34, 35, 60, 90, 120)]
+    labels = CyclePhaseEngine.label_days([last_start], days, 28)
+    assert labels == [
+        (26, "pre-menstrual"),
+        (30, "pre-menstrual"),  # A little late: still within the tolerance
+        (35, "pre-menstrual"),
+        None,
+        None,
+        None,
+        None
+    ]
+    
+    # Rollups from the unlogged months don't count towards any phase
+    rollups = [(day, 1, 9.0, 6.0, 4.0) for day in days]
+    profile = CyclePhaseEngine.phase_profile([last_start], rollups)
+    assert profile["labelled_logs"] == 3
+    assert profile["phases"]["pre-menstrual"]["log_count"] == 3
+
+
+def test_mental_health_aggregates_match_rows():
+    """SQL-side averages and trend halves agree with the row-by-row versions"""
+    async def compare(db):
+        logs = await MentalHealthTrackerService.get_mental_health_history(db, USER_ID)
+        aggregate = await MentalHealthTrackerService.aggregate_window(db, USER_ID)
+        averages = await MentalHealthTrackerService.calculate_averages(db, USER_ID)
+        trend = await MentalHealthTrackerService.analyze_stress_trend(db, USER_ID)
+        insights = await MentalHealthTrackerService.generate_insights(db, USER_ID)
+        return logs, aggregate, averages, trend, insights
+    
+    (logs, aggregate, averages, trend, insights), _ = asyncio.run(count_queries(compare))
+    assert averages == {
+        "average_stress": round(sum(log.stress_level for log in logs) / len(logs), 1),
+        "average_sleep": round(sum(log.sleep_hours for log in logs) / len(logs), 1),
+        "average_energy": round(sum(log.energy_level for log in logs) / len(logs), 1)
+    }
+    assert insights["sleep_quality"] == MentalHealthTrackerService.classify_sleep(averages["average_sleep"])
+    
+    # logs are newest first
+    mid = len(logs) // 2
+    recent, older = MentalHealthTrackerService.stress_halves(aggregate, newest_first=True)
+    assert recent == sum(log.stress_level for log in logs[:mid]) / mid
+    assert older == sum(log.stress_level for log in logs[mid:]) / (len(logs) - mid)
+    assert trend == insights["stress_trend"] == MentalHealthTrackerService.classify_stress_change(recent - older)
+    first, second = MentalHealthTrackerService.stress_halves(aggregate, newest_first=False)
+    chronological = logs[::-1]
+    assert first == sum(log.stress_level for log in chronological[:mid]) / mid
+    assert second == sum(log.stress_level for log in chronological[mid:]) / (len(logs) - mid)
+
+
+def test_mental_health_averages_single_query():
+    """Averages come back as one aggregate row"""
+    result, queries = asyncio.run(count_queries(
+        lambda db: MentalHealthTrackerService.calculate_averages(db, USER_ID)
+    ))
+    assert result["average_stress"] is not None
+    assert queries == 1, f"mental health averages issued {queries} queries"
+
+
+def test_mental_health_series_from_rollups():
+    """Logged entries land in the rollups and a range is served in one query"""
+    async def log_then_read(db):
+        for stress, mood in ((4, "calm"), (8, "anxious"), (6, "calm")):
+            await MentalHealthTrackerService.add_mental_health_log(db, "series-user", stress, mood, 7.0, 5)
+        counter = QueryCounter(db.bind)
+        series = await MentalHealthRollupService.get_series(
+            db, "series-user", date.today() - timedelta(days=365), date.today()
+        )
+        return series, counter.count
+    
+    (series, queries), _ = asyncio.run(count_queries(log_then_read))
+    assert series["resolution"] == "weekly"
+    latest = series["points"][-1]
+    assert latest["log_count"] == 3
+    assert (latest["min_stress"], latest["max_stress"], latest["average_stress"]) == (4, 8, 6.0)
+    assert latest["mood_counts"] == {"calm": 2, "anxious": 1}
+    assert queries == 1, f"mental health series issued {queries} queries"
+
+
+def test_quiz_scoring_uses_cached_bank():
+    """Once the bank is loaded, scoring and sampling a question page issue no queries"""
+    quiz_bank.invalidate_quiz_bank()
+    
+    async def score(db):
+        for i in range(12):
+            db.add(QuizQuestion(
+                question=f"Question {i}",
+                options=json.dumps([f"A{i}", f"B{i}"]),  # As stored by seed_quiz.py
+                correct_answer=f"B{i}",
+                topic="basics"
+            ))
+        await db.commit()
+        ids = (await quiz_bank.get_quiz_bank(db)).ordered_ids[:3]
+        
+        counter = QueryCounter(db.bind)
+        payload = await QuizEngineService.sample_questions_payload(db)
+        result = await QuizEngineService.calculate_score(
+            db, {ids[0]: "b0", ids[1]: "A1", ids[2]: "B2", 99999: "B0"}
+        )
+        return payload, result, counter.count
+    
+    (payload, result, queries), _ = asyncio.run(count_queries(score))
+    questions = json.loads(payload)
+    assert len({question["id"] for question in questions}) == 10
+    for question in questions:
+        number = question["question"].split()[-1]
+        assert question["options"] == [f"A{number}", f"B{number}"]
+        assert "correct_answer" not in question
+    assert (result["score"], result["total_questions"]) == (2, 4)
+    assert queries == 0, f"quiz scoring issued {queries} queries"
+
+
+def test_quiz_bank_reloads_edited_questions():
+    """Editing a question in place changes the version stamp, so grading uses the new answer"""
+    quiz_bank.invalidate_quiz_bank()
+    
+    async def edit(db):
+        question = QuizQuestion(question="Question", options=["A", "B"], correct_answer="A")
+        db.add(question)
+        await db.commit()
+        before = await QuizEngineService.calculate_score(db, {question.id: "B"})
+        
+        question.correct_answer = "B"
+        await db.commit()
+        quiz_bank._checked_at = 0.0  # Skip the check interval
+        after = await QuizEngineService.calculate_score(db, {question.id: "B"})
+        return before, after
+    
+    (before, after), _ = asyncio.run(count_queries(edit))
+    assert (before["score"], after["score"]) == (0, 1)
+
+
+def test_quiz_submission_updates_counters():
+    """Submissions keep per-question and per-user counters in step"""
+    quiz_bank.invalidate_quiz_bank()
+    
+    async def submit(db):
+        for i in range(4):
+            db.add(QuizQuestion(question=f"Question {i}", options=["A", "B"], correct_answer="A"))
+        await db.commit()
+        ids = (await quiz_bank.get_quiz_bank(db)).ordered_ids[:4]
+        
+        # Strong users get the last question right, weak ones don't
+        for answers in (["A", "A", "A", "A"], ["A", "A", "B", "A"], ["A", "B", "B", "B"], ["B", "B", "B", "B"]):
+            await QuizEngineService.submit_quiz(db, USER_ID, dict(zip(ids, answers)))
+        
+        db.expunge_all()
+        counter = QueryCounter(db.bind)
+        analytics = await QuizEngineService.get_question_analytics(db, ids[3])
+        history = await QuizEngineService.get_user_history(db, USER_ID)
+        return analytics, history, counter.count
+    
+    (analytics, history, queries), _ = asyncio.run(count_queries(submit))
+    item = analytics[0]
+    assert (item["attempts"], item["correct"], item["difficulty"]) == (4, 2, 0.5)
+    assert item["discrimination"] > 0.5
+    assert history["attempts"] == 4
+    assert (history["first_percentage"], history["best_percentage"], history["latest_percentage"]) == (100.0, 100.0, 0.0)
+    assert history["history"][0]["awareness_level"] == "Beginner"
+    assert queries == 3, f"quiz analytics and history issued {queries} queries"
+
+
+def test_quiz_bank_sampling():
+    """Samples are distinct, respect topics and avoid recently seen questions"""
+    topics = ["basics", "symptoms", "diagnosis"]
+    bank = quiz_bank.QuizBank([
+        quiz_bank.BankQuestion(i, f"Question {i}", ("A", "B"), "A", topics[i % 3]) for i in range(300)
+    ], version=(300,))
+    
+    ids = bank.sample(10)
+    assert len(set(ids)) == 10
+    
+    ids = bank.sample(20, topics=["symptoms", "diagnosis"])
+    assert len(set(ids)) == 20
+    assert all(bank.questions[i].topic in ("symptoms", "diagnosis") for i in ids)
+    
+    seen = set(range(0, 300, 3))  # Every "basics" question
+    ids = bank.sample(10, topics=["basics", "symptoms"], exclude=seen)
+    assert len(set(ids)) == 10 and not seen & set(ids)
+    
+    # Not enough unseen questions: fill up with seen ones
+    ids = bank.sample(10, topics=["basics"], exclude=set(range(0, 291, 3)))
+    assert len(set(ids)) == 10 and {291, 294, 297} <= set(ids)
+
+
+def planned_contents(weekly_meal_plan) -> set:
+    """Content tags of every food in a weekly plan"""
+    contents = {food[0]: food[2] for food in meal_planner.FOODS}
+    tags = set()
+    for meals in weekly_meal_plan.values():
+        for meal in meals[:-1]:
+            name = meal.split(": ", 1)[1].rsplit(" (", 1)[0]
+            tags.update(contents[name])
+    return tags
+
+
+def test_diet_plan_single_narrow_query():
+    """The diet plan is one narrow query and a memoized payload"""
+    payload, queries = asyncio.run(count_queries(
+        lambda db: DietPersonalizerService.get_diet_plan_payload(db, USER_ID)
+    ))
+    plan = json.loads(payload)
+    # The detector's "Insulin-resistant PCOS" must get the phenotype-specific meal plan
+    assert plan["phenotype"] == "Insulin-resistant PCOS"
+    assert len(plan["weekly_meal_plan"]) == 7
+    # The seeded user is vegetarian: no meat or fish anywhere in the week
+    assert planned_contents(plan["weekly_meal_plan"]) <= {meal_planner.EGG, meal_planner.DAIRY}
+    assert abs(plan["daily_averages"]["calories"] - plan["nutrition_targets"]["calories"]) <= 100
+    assert plan["bmi_category"] == "Overweight"
+    assert queries == 1, f"diet plan issued {queries} queries"
+    assert DietPersonalizerService.normalize_phenotype("Insulin-Resistant PCOS") == "Insulin-resistant PCOS"
+
+
+def test_meal_plans_respect_diet_exclusions():
+    """Each diet only gets foods without its excluded contents; unknown diets get the strictest plan"""
+    M, F, E, D = meal_planner.MEAT, meal_planner.FISH, meal_planner.EGG, meal_planner.DAIRY
+    allowed = {
+        "vegan": set(),
+        "vegetarian": {E, D},
+        "Lacto Vegetarian": {D},
+        "ovo-vegetarian": {E},
+        "pescatarian": {F, E, D},
+        "non-vegetarian": {M, F, E, D},
+        "other": set(),
+        None: set()
+    }
+    for diet_type, tags in allowed.items():
+        targets = meal_planner.calculate_targets(28, 165, 70, 3, "Overweight", "Insulin-resistant PCOS", diet_type)
+        plan, _ = meal_planner.build_weekly_plan(targets)
+        assert planned_contents(plan) <= tags, diet_type
+
+
+def test_monthly_report_query_budget():
+    """The monthly report loads each table once and derives every section from that"""
+    report, queries = asyncio.run(count_queries(
+        lambda db: ProgressReportService.generate_monthly_report(db, USER_ID)
+    ))
+    score, _ = asyncio.run(count_queries(
+        lambda db: HealthScoreEngine.calculate_health_score(db, USER_ID)
+    ))
+    assert queries == 4, f"monthly report issued {queries} queries"
+    assert report["health_score_trend"]["current"] == score["health_score"]
+    assert report["cycle_regularity_change"] == "Regular tracking maintained - good progress!"
+    assert report["weight_trend"] == "Not enough data to track weight trend"
+    assert "Logged 3 period entries this month" in report["key_achievements"]
+    assert "Good mental health tracking (10+ entries)" in report["key_achievements"]
+    assert report["stress_trend"] == "Stress levels stable"
+
+
+def test_monthly_report_windows_compare_in_utc():
+    """Timezone-aware timestamps are placed in the report window by instant, not wall clock"""
+    now = datetime.now()
+    ahead, behind = timezone(timedelta(hours=14)), timezone(timedelta(hours=-12))
+    logs = [
+        # Outside the window, though its wall clock reads 30 days minus 8 hours ago
+        PeriodLog(created_at=(now - timedelta(days=30, hours=6)).astimezone(ahead)),
+        # Inside the window, though its wall clock reads 30 days plus 6 hours ago
+        PeriodLog(created_at=(now - timedelta(days=29, hours=18)).astimezone(behind)),
+        PeriodLog(created_at=now)
+    ]
+    data = MonthlyReportData(USER_ID, now, [], logs, [], [])
+    assert data.period_count == 2
+
+
+def test_stored_monthly_report_served_until_new_logs():
+    """A stored report costs 2 queries; a new log makes the next request rebuild it"""
+    
+    async def serve(db):
+        await seed_user(db, "other-user")
+        counter = QueryCounter(db.bind)
+        first = await MonthlyReportStore.get_report(db, USER_ID)
+        counter.count = 0
+        await MonthlyReportStore.get_report(db, USER_ID)
+        warm = counter.count
+        
+        await MentalHealthTrackerService.add_mental_health_log(db, USER_ID, 5, "calm", 7, 5)
+        counter.count = 0
+        rebuilt = await MonthlyReportStore.get_report(db, USER_ID)
+        recomputed = counter.count
+        
+        # The batch job's chunked IN queries give the same reports as the endpoint
+        now = datetime.now()
+        user_ids = [USER_ID, "other-user"]
+        results = [await db.execute(statement) for statement in MonthlyReportData.statements(user_ids, now)]
+        batch = MonthlyReportData.from_results(user_ids, now, results)
+        stamps = MonthlyReportStore.source_stamps(
+            user_ids, [await db.execute(statement) for statement in MonthlyReportStore.source_stamp_statements(user_ids)]
+        )
+        assert ProgressReportService.build_report(batch[USER_ID]) == rebuilt
+        assert stamps[USER_ID] == await MonthlyReportStore.source_stamp(db, USER_ID)
+        return first, warm, recomputed
+    
+    (first, warm, recomputed), _ = asyncio.run(count_queries(serve))
+    assert warm == 2, f"stored monthly report issued {warm} queries"
+    assert recomputed > 2
+    assert "Good mental health tracking (10+ entries)" in first["key_achievements"]
+
+
+if __name__ == "__main__":
+    print("Checking query budgets...")
+    test_health_score_query_budget()
+    print("✅ Health score: 3 queries")
+    test_health_snapshot_upsert()
+    print("✅ Health snapshot: 1 upsert")
+    test_snapshot_updates_changed_components()
+    print("✅ Snapshot component update: 3 statements")
+    test_bulk_snapshot_refresh()
+    print("✅ Bulk snapshot refresh: 4 statements")
+    test_cycle_stats_created_race_free()
+    print("✅ Cycle stats row created race-free")
+    test_mental_health_insights_query_budget()
+    print("✅ Mental health insights: 4 queries cold, 2 warm")
+    test_cycle_phase_labels()
+    test_cycle_phase_long_open_cycle()
+    test_mental_health_aggregates_match_rows()
+    test_mental_health_averages_single_query()
+    print("✅ Mental health averages: 1 aggregate query")
+    test_mental_health_series_from_rollups()
+    print("✅ Mental health series: 1 rollup query")
+    test_quiz_scoring_uses_cached_bank()
+    print("✅ Quiz scoring: no queries with a loaded bank")
+    test_quiz_bank_reloads_edited_questions()
+    test_quiz_submission_updates_counters()
+    print("✅ Quiz counters")
+    test_quiz_bank_sampling()
+    print("✅ Quiz sampling")
+    test_diet_plan_single_narrow_query()
+    print("✅ Diet plan: 1 query")
+    test_meal_plans_respect_diet_exclusions()
+    print("✅ Meal plans respect diet exclusions")
+    test_monthly_report_query_budget()
+    print("✅ Monthly report: 4 queries")
+    test_monthly_report_windows_compare_in_utc()
+    test_stored_monthly_report_served_until_new_logs()
+    print("✅ Stored monthly report: 2 queries")
@@ -0,0 +1,167 @@
+"""
+PDF report cache checks
+Renders a report once, then verifies repeat lookups come from memory or
+disk, that the directory stays under its size cap, that background render
+jobs finish into the cache, and that bulk exports stream a valid ZIP.
+"""
+
+import asyncio
+import io
+import os
+import tempfile
+import zipfile
+from datetime import datetime
+from app.services import report_renderer
+from app.services.report_cache import PDFReportCache, report_cache
+from app.services.report_export import ReportExportService
+from app.services.report_generator import ReportGenerator, report_styles
+from test_query_budget import make_database, seed_user
+
+REPORT_DATA = {
+    'risk_level': 'Moderate',
+    'phenotype': 'Insulin-resistant PCOS',
+    'confidence_score': 0.6,
+    'risk_score': 40.0,
+    'key_drivers': ['Irregular cycles'],
+    'remedies': {'diet': ['Choose low glycemic foods'], 'exercise': ['Walk daily']},
+    'next_steps': ['Consult a gynecologist'],
+    'explanation': 'Cycle and metabolic markers point to insulin resistance.',
+    'assessment_date': datetime(2026, 1, 15)
+}
+
+
+def test_report_render_is_stable():
+    """Styles are built once and the same assessment renders the same page text"""
+    first = ReportGenerator.generate_pdf(REPORT_DATA)
+    second = ReportGenerator.generate_pdf(REPORT_DATA)
+    assert first.startswith(b"%PDF")
+    assert report_styles.cache_info().misses == 1
+    assert abs(len(first) - len(second)) < 64  # Only the embedded timestamps differ
+
+
+def test_report_cache_memory_then_disk():
+    """A put is served from memory, then from disk once memory is cleared"""
+    pdf = ReportGenerator.generate_pdf(REPORT_DATA)
+    with tempfile.TemporaryDirectory() as directory:
+        cache = PDFReportCache(directory)
+        key = (1, ReportGenerator.TEMPLATE_VERSION)
+        assert cache.get_bytes(key) is None and cache.get_path(key) is None
+        
+        cache.put(key, pdf)
+        assert cache.get_bytes(key) == pdf
+        
+        cache.clear_memory()
+        assert cache.get_bytes(key) is None
+        with open(cache.get_path(key), "rb") as f:
+            assert f.read() == pdf
+        
+        # A new template version is a different key
+        assert cache.get_path((1, ReportGenerator.TEMPLATE_VERSION + 1)) is None
+
+
+def test_report_cache_disk_cap():
+    """Least recently used files are evicted once the directory passes its cap"""
+    pdf = b"%PDF" + b"x" * 996
+    with tempfile.TemporaryDirectory() as directory:
+        cache = PDFReportCache(directory, max_disk_bytes=5000, max_memory_bytes=2000)
+        for assessment_id in range(4):
+            cache.put((assessment_id, 1), pdf)
+            os.utime(cache.path_for((assessment_id, 1)), (assessment_id, assessment_id))
+        cache.get_path((0, 1))  # Touch the oldest so it survives
+        for assessment_id in range(4, 6):
+            cache.put((assessment_id, 1), pdf)
+        
+        assert cache.disk_usage() <= 5000
+        assert cache.get_path((0, 1)) is not None
+        assert cache.get_path((1, 1)) is None
+        assert cache._memory_bytes <= 2000
+
+
+def test_report_cache_read_survives_eviction():
+    """A file evicted between the lookup and the read is a miss, not an error"""
+    class EvictingCache(PDFReportCache):
+        def get_path(self, key):
+            path = super().get_path(key)
+            if path is not None:
+                os.remove(path)  # Another worker evicts it right after the lookup
+            return path
+    
+    pdf = b"%PDF" + b"x" * 96
+    with tempfile.TemporaryDirectory() as directory:
+        cache = EvictingCache(directory)
+        cache.put((1, 1), pdf)
+        assert cache.read((1, 1)) == pdf  # Memory hit
+        
+        cache.clear_memory()
+        assert cache.read((1, 1)) is None
+
+
+def test_report_job_renders_into_cache():
+    """A report job renders on the process pool and leaves the PDF in the cache"""
+    
+    async def run_job():
+        job = report_renderer.ReportJobService.submit(42, REPORT_DATA)
+        assert report_renderer.ReportJobService.get(job.job_id) is job
+        await job.task
+        return job
+    
+    directory = report_cache.directory
+    with tempfile.TemporaryDirectory() as temp_dir:
+        report_cache.directory = temp_dir
+        try:
+            job = asyncio.run(run_job())
+            assert job.status == "done", job.error
+            assert job.finished_at is not None
+            pdf = report_cache.get_bytes((42, ReportGenerator.TEMPLATE_VERSION))
+            assert pdf.startswith(b"%PDF")
+            assert report_cache.get_path((42, ReportGenerator.TEMPLATE_VERSION)) is not None
+        finally:
+            report_cache.directory = directory
+            report_cache.clear_memory()
+            report_renderer.shutdown_executor()
+
+
+def test_bulk_export_streams_zip():
+    """Exports stream one stored PDF per matching assessment, in several chunks"""
+    
+    async def export(query_args):
+        engine, Session = await make_database()
+        try:
+            async with Session() as db:
+                for user_id in ("clinic-a", "clinic-b", "clinic-c"):
+                    await seed_user(db, user_id)
+                query = ReportExportService.export_query(**query_args)
+                return [
+                    chunk async for chunk in ReportExportService.stream_zip(
+                        db, query, lambda assessment: dict(REPORT_DATA, assessment_date=assessment.created_at)
+                    )
+                ]
+        finally:
+            await engine.dispose()
+    
+    try:
+        chunks = asyncio.run(export({"assessment_ids": [1, 3, 99]}))
+        assert sum(1 for chunk in chunks if chunk) > 1
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+            assert archive.namelist() == ["ovasense_report_1.pdf", "ovasense_report_3.pdf"]
+            assert archive.testzip() is None
+            assert archive.read("ovasense_report_3.pdf").startswith(b"%PDF")
+        
+        chunks = asyncio.run(export({"user_id": "clinic-b", "from_date": datetime.now().date()}))
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+            assert archive.namelist() == ["ovasense_report_2.pdf"]
+    finally:
+        report_renderer.shutdown_executor()
+
+
+if __name__ == "__main__":
+    print("Checking PDF report cache...")
+    test_report_render_is_stable()
+    test_report_cache_memory_then_disk()
+    test_report_cache_disk_cap()
+    test_report_cache_read_survives_eviction()
+    print("✅ PDF report cache")
+    test_report_job_renders_into_cache()
+    print("✅ Report job")
+    test_bulk_export_streams_zip()
+    print("✅ Bulk export")
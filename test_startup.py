@@ -0,0 +1,79 @@
+"""
+Startup-time budget check
+Measures `import app.main` time and peak RSS in a fresh interpreter and
+fails when either goes over budget or the ML stack is imported eagerly.
+
+Budgets can be configured with environment variables:
+  STARTUP_IMPORT_BUDGET_MS (default 2000)
+  STARTUP_RSS_BUDGET_MB    (default 200)
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+IMPORT_BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "2000"))
+RSS_BUDGET_MB = float(os.getenv("STARTUP_RSS_BUDGET_MB", "200"))
+RUNS = int(os.getenv("STARTUP_RUNS", "3"))
+
+# Only needed by assessment scoring, loaded on first use or by warmup
+HEAVY_MODULES = ["numpy", "pandas", "scipy", "sklearn", "hdbscan", "shap"]
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import app.main
+elapsed_ms = (time.perf_counter() - start) * 1000
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+print(json.dumps({
+    "import_ms": elapsed_ms,
+    "peak_rss_mb": peak_mb,
+    "heavy_modules": [m for m in %r if m in sys.modules]
+}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_startup() -> dict:
+    """Import app.main in a fresh interpreter and report time, RSS and heavy imports"""
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite://")
+    env["ML_WARMUP"] = "false"
+    
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_startup_budget():
+    """Fail if cold import time, peak RSS or eager ML imports exceed the budget"""
+    runs = [measure_startup() for _ in range(RUNS)]
+    best_ms = min(run["import_ms"] for run in runs)
+    peak_mb = max(run["peak_rss_mb"] for run in runs)
+    heavy = runs[-1]["heavy_modules"]
+    
+    print(f"  import app.main: {best_ms:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)")
+    print(f"  peak RSS: {peak_mb:.1f} MB (budget {RSS_BUDGET_MB:.0f} MB)")
+    print(f"  heavy modules loaded: {', '.join(heavy) or 'none'}")
+    
+    assert not heavy, f"ML modules imported at startup: {heavy}"
+    assert best_ms <= IMPORT_BUDGET_MS, f"import took {best_ms:.0f} ms > {IMPORT_BUDGET_MS:.0f} ms"
+    assert peak_mb <= RSS_BUDGET_MB, f"peak RSS {peak_mb:.1f} MB > {RSS_BUDGET_MB:.0f} MB"
+
+
+if __name__ == "__main__":
+    print("Measuring API startup...")
+    print("=" * 50)
+    try:
+        test_startup_budget()
+        print("✅ Startup within budget")
+    except AssertionError as e:
+        print(f"❌ Startup over budget: {e}")
+        sys.exit(1)
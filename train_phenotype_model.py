@@ -0,0 +1,44 @@
+"""
+Train the phenotype clustering model
+Run this offline to fit clustering models on stored assessment features.
+The API loads the newest artifact once per worker at startup.
+"""
+
+import argparse
+from app.database import SessionLocal
+from app.services.phenotype_model import train_phenotype_model, MODEL_DIR
+
+
+def main():
+    """Fit and save a new versioned phenotype model artifact"""
+    parser = argparse.ArgumentParser(description="Train the OvaSense phenotype clustering model")
+    parser.add_argument("--components", type=int, default=8, help="Gaussian mixture components")
+    parser.add_argument("--min-cluster-size", type=int, default=15, help="HDBSCAN min_cluster_size")
+    parser.add_argument("--output", default=MODEL_DIR, help="Artifact directory")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        manifest = train_phenotype_model(
+            db,
+            n_components=args.components,
+            min_cluster_size=args.min_cluster_size,
+            model_dir=args.output
+        )
+        print(f"✓ Trained phenotype model {manifest['version']} on {manifest['n_samples']} assessments")
+        print(f"  Components: {', '.join(manifest['component_phenotypes'])}")
+        print(f"  HDBSCAN clusters: {manifest['hdbscan_clusters']}")
+        print(f"  Saved to: {args.output}")
+    except Exception as e:
+        print(f"❌ Error training phenotype model: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("🧠 Training Phenotype Clustering Model...")
+    print("=" * 50)
+    main()
+    print("=" * 50)
+    print("✓ Done!")